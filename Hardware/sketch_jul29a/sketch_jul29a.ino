@@ -6,8 +6,16 @@
 const char* ssid = "Galaxy M12 4B52";
 const char* password = "tess7430";
 
+// Station this device serves. It must be the same id the kiosk page uses
+// (opened once with ?station=<id>); "" is the default station, which is also
+// what a kiosk uses when no station was set. With several booths give each
+// device and its kiosk their own id (letters, digits, - and _) so booths
+// don't take each other's scans.
+const char* STATION = "";
+
 // Django API endpoints
-const char* TRIGGER_URL = "http://10.248.175.134:8000/api/scan-trigger/";
+// Long poll: the server holds the request for up to 25 s until a trigger appears.
+const String TRIGGER_URL = String("http://10.248.175.134:8000/api/scan-trigger/?wait=25&station=") + STATION;
 const char* UPLOAD_URL  = "http://10.248.175.134:8000/api/upload-template/";
 const char* MATCH_URL   = "http://10.248.175.134:8000/api/match-template/";
 const char* MARK_USED_URL = "http://10.248.175.134:8000/api/mark-trigger-used/";
@@ -176,6 +184,7 @@ bool pollForScanTrigger(String &voter_id_out, String &action_out, int &trigger_i
 
   HTTPClient http;
   http.begin(TRIGGER_URL);
+  http.setTimeout(30000);  // longer than the ?wait=25 long poll
 
   Serial.print("📡 Sending HTTP GET to: ");
   Serial.println(TRIGGER_URL);
@@ -311,8 +320,7 @@ void loop() {
   }
 
   if (trigger_id == -1) {
-    delay(3000); // no trigger found, wait and poll again
-    return;
+    return; // long poll timed out without a trigger, poll again right away
   }
 
   Serial.printf("⚡ Trigger received: id=%d voter_id=%s action=%s\n", trigger_id, voter_id.c_str(), action.c_str());
@@ -3,6 +3,13 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Long-lived endpoints such as the scan result stream (/api/scan-result/stream/)
+are async views; serve them with an ASGI server, e.g.
+``uvicorn core.asgi:application``, so waiting clients don't tie up threads.
+
+WebSocket connections to STATION_WEBSOCKET_PATH are handed to the ESP32
+station protocol in voting/websocket.py; everything else goes to Django.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +20,23 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup because the station protocol uses the ORM
+from django.conf import settings  # noqa: E402
+from voting.retention import start_purge_thread  # noqa: E402
+from voting.websocket import station_websocket  # noqa: E402
+
+# Periodic purge of expired triggers and temporary templates, if
+# RETENTION_PURGE_INTERVAL is set; only server processes run it
+start_purge_thread()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        if scope['path'] == getattr(settings, 'STATION_WEBSOCKET_PATH', '/ws/station/'):
+            return await station_websocket(scope, receive, send)
+        # Refuse websocket connections to any other path
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 4404})
+    return await django_application(scope, receive, send)
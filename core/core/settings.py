@@ -81,6 +81,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take SQLite's write lock when a transaction starts, so concurrent
+        # ballots queue for it (select_for_update is a no-op on SQLite)
+        # instead of failing with "database is locked"
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        # A file rather than the default in-memory database, so tests with
+        # concurrent writers see the same locking as the server
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -159,3 +166,75 @@ REST_FRAMEWORK = {
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 
+
+# Fingerprint matching
+# 'numpy' scores the whole gallery in one vectorized pass (voting/matching.py),
+# 'python' uses the original one-template-at-a-time loop.
+FINGERPRINT_MATCH_ENGINE = 'numpy'
+# The gallery cache (voting/gallery.py) is kept current by model signals within
+# one process. With several worker processes, reload it every N seconds.
+FINGERPRINT_GALLERY_RELOAD_INTERVAL = None
+# Two-stage matching: rank the whole gallery with a cheap XOR/popcount
+# prefilter ('byte_hamming' or 'bit_hamming') and re-score only the best
+# FINGERPRINT_PREFILTER_TOP_K templates with the full formula. 0 disables it.
+FINGERPRINT_PREFILTER_TOP_K = 256
+FINGERPRINT_PREFILTER_METRIC = 'byte_hamming'
+# Worker processes used to score gallery shards in parallel (voting/parallel.py).
+# 0 or 1 matches in the request process, which is what tests should use.
+FINGERPRINT_MATCH_WORKERS = 0
+# Optional gallery file written by `manage.py export_gallery`. Worker processes
+# memory-map it read-only instead of loading every template from the database.
+FINGERPRINT_GALLERY_FILE = None
+# Maximum number of scans accepted by /api/match-template/batch/ per request.
+FINGERPRINT_MATCH_BATCH_LIMIT = 200
+# Enrollment duplicate check: upload_template searches the gallery for the new
+# template and treats scores >= FINGERPRINT_DUPLICATE_THRESHOLD on another voter's
+# template as the same finger. 'reject' refuses the upload, 'flag' stores it with
+# FingerprintTemplate.duplicate_of set for review. None disables the check.
+FINGERPRINT_DUPLICATE_THRESHOLD = 85.0
+FINGERPRINT_DUPLICATE_ACTION = 'reject'
+# Long polling on /api/scan-trigger/?wait=N: the longest a station may wait for a
+# trigger, and how often a waiting request re-checks the database in case the
+# trigger was created by another worker process (None relies on in-process wake-ups).
+SCAN_TRIGGER_MAX_WAIT = 30
+SCAN_TRIGGER_RECHECK_INTERVAL = None
+# /api/scan-result/stream/ (Server-Sent Events): how long a kiosk waits for a scan
+# result, and how often a comment line is sent to keep the connection open.
+SCAN_RESULT_STREAM_TIMEOUT = 120
+SCAN_RESULT_KEEPALIVE = 15
+# Persistent WebSocket channel for ESP32 stations (voting/websocket.py), routed by
+# core/asgi.py. Only available when the project runs under an ASGI server.
+STATION_WEBSOCKET_PATH = '/ws/station/'
+# A trigger handed to a station device is hidden from other devices for this many
+# seconds; if it hasn't been used by then it is handed out again.
+SCAN_TRIGGER_LEASE_SECONDS = 60
+# Retention (voting/retention.py, `manage.py purge_expired`): used scan triggers and
+# templates uploaded without a voter are deleted once older than these many hours,
+# RETENTION_BATCH_SIZE rows per transaction. Set RETENTION_PURGE_INTERVAL (seconds)
+# to also purge from a background thread in each server process (core/asgi.py,
+# core/wsgi.py) and to pace `manage.py purge_expired --loop`.
+SCAN_TRIGGER_RETENTION_HOURS = 24
+TEMPORARY_TEMPLATE_RETENTION_HOURS = 24
+RETENTION_BATCH_SIZE = 500
+RETENTION_PURGE_INTERVAL = None
+# Posts and candidates are cached per process (voting/ballot.py) and invalidated by
+# model signals. With several worker processes, reload them every N seconds.
+BALLOT_CACHE_RELOAD_INTERVAL = None
+# Counter rows per candidate in the live tallies (voting/tally.py). Each ballot
+# increments one at random, so concurrent ballots rarely wait on the same row lock.
+TALLY_SHARDS = 8
+# Audit log (voting/audit.py): 'async' queues ActivityLog entries and writes them
+# from a background thread every AUDIT_LOG_BATCH_SIZE entries or
+# AUDIT_LOG_FLUSH_INTERVAL_MS milliseconds; 'sync' writes each one immediately.
+AUDIT_LOG_MODE = 'async'
+AUDIT_LOG_BATCH_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL_MS = 200
+# Votes are sealed onto the vote hash chain (voting/chain.py) by a background
+# thread, at most once every CHAIN_SEAL_INTERVAL_MS milliseconds.
+CHAIN_SEAL_INTERVAL_MS = 200
+# Where `manage.py archive_activity` writes old ActivityLog entries (voting/audit_archive.py).
+AUDIT_ARCHIVE_DIR = BASE_DIR / 'audit_archive'
+# Streaming exports (voting/export.py): rows fetched per database round trip, and
+# characters buffered before each piece of the response is sent.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
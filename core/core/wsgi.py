@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Periodic purge of expired triggers and temporary templates, if
+# RETENTION_PURGE_INTERVAL is set; only server processes run it
+from voting.retention import start_purge_thread  # noqa: E402
+
+start_purge_thread()
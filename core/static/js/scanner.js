@@ -4,8 +4,16 @@ document.addEventListener('DOMContentLoaded', function () {
   const proceedContainer = document.getElementById('proceed-container');
   const proceedBtn = document.getElementById('proceed-btn');
   let pollInterval = null;
+  let resultStream = null;
   let matchedVoterId = null;
 
+  // Which ESP32 station this kiosk drives: open the page once with
+  // ?station=<id> and it is remembered for this browser. Must match the
+  // device's STATION ('' = default station, as the sketch ships)
+  const station = new URLSearchParams(window.location.search).get('station')
+    ?? localStorage.getItem('scanStation') ?? '';
+  localStorage.setItem('scanStation', station);
+
   scanBtn.addEventListener('click', function () {
     scanBtn.disabled = true;
     statusDiv.innerHTML = `<div class="text-info">Creating scan trigger...</div>`;
@@ -28,14 +36,14 @@ document.addEventListener('DOMContentLoaded', function () {
         'Content-Type': 'application/json',
         'X-CSRFToken': getCSRFToken(),
       },
-      body: JSON.stringify({ action: 'match' })
+      body: JSON.stringify({ action: 'match', station: station })
     })
       .then(response => response.json())
       .then(data => {
         if (data.status === 'success') {
           const triggerId = data.trigger_id;
           statusDiv.innerHTML = `<div class="text-success">Trigger created. Please scan your finger on the device. (Trigger ID: ${triggerId})</div>`;
-          startPolling(triggerId);
+          waitForResult(triggerId);
         } else {
           statusDiv.innerHTML = `<div class="text-danger">Failed to create trigger: ${data.error || data.message || 'Unknown error'}</div>`;
           scanBtn.disabled = false;
@@ -48,6 +56,37 @@ document.addEventListener('DOMContentLoaded', function () {
       });
   });
 
+  function waitForResult(triggerId) {
+    // The server pushes the result as soon as the ESP32 reports it;
+    // fall back to polling on browsers without EventSource
+    if (!window.EventSource) {
+      startPolling(triggerId);
+      return;
+    }
+    if (resultStream) resultStream.close();
+
+    statusDiv.innerHTML = `<div class="text-info">Waiting for fingerprint match...</div>`;
+    resultStream = new EventSource(`/api/scan-result/stream/?trigger_id=${triggerId}`);
+
+    resultStream.addEventListener('result', event => {
+      resultStream.close();
+      showResult(triggerId, JSON.parse(event.data));
+    });
+
+    resultStream.addEventListener('timeout', () => {
+      // Nobody scanned yet; open a fresh stream and keep waiting
+      resultStream.close();
+      waitForResult(triggerId);
+    });
+
+    resultStream.onerror = () => {
+      // Don't let EventSource reconnect on its own; poll instead
+      console.warn('Scan result stream failed, falling back to polling');
+      resultStream.close();
+      startPolling(triggerId);
+    };
+  }
+
   function startPolling(triggerId) {
     if (pollInterval) clearInterval(pollInterval);
 
@@ -57,25 +96,9 @@ document.addEventListener('DOMContentLoaded', function () {
         .then(data => {
           if (data.status === 'pending') {
             statusDiv.innerHTML = `<div class="text-info">Waiting for fingerprint match...</div>`;
-          } else if (data.status === 'success') {
-            clearInterval(pollInterval);
-            matchedVoterId = data.voter_id;
-            statusDiv.innerHTML = `<div class="text-success">Fingerprint matched: ${data.voter_name} (Score: ${data.score.toFixed(2)})</div>`;
-            proceedContainer.style.display = 'block';
-          } else if (data.status === 'already_voted') {
-            clearInterval(pollInterval);
-            statusDiv.innerHTML = `<div class="text-warning">Already Voted: ${data.voter_name || 'This voter has already cast their vote'}</div>`;
-            scanBtn.disabled = false;
-            // Redirect to already voted page after a short delay
-            setTimeout(() => {
-              window.location.href = '/already-voted/';
-            }, 2000);
-          } else if (data.status === 'error') {
-            clearInterval(pollInterval);
-            statusDiv.innerHTML = `<div class="text-danger">No match: ${data.message || 'Fingerprint not registered or unmatched'}</div>`;
-            scanBtn.disabled = false;
           } else {
-            console.warn('Unknown status from scan result:', data.status);
+            clearInterval(pollInterval);
+            showResult(triggerId, data);
           }
         })
         .catch(err => {
@@ -87,6 +110,32 @@ document.addEventListener('DOMContentLoaded', function () {
     }, 2000);
   }
 
+  function showResult(triggerId, data) {
+    if (data.status === 'success') {
+      matchedVoterId = data.voter_id;
+      statusDiv.innerHTML = `<div class="text-success">Fingerprint matched: ${data.voter_name} (Score: ${data.score.toFixed(2)})</div>`;
+      proceedContainer.style.display = 'block';
+    } else if (data.status === 'already_voted') {
+      statusDiv.innerHTML = `<div class="text-warning">Already Voted: ${data.voter_name || 'This voter has already cast their vote'}</div>`;
+      scanBtn.disabled = false;
+      // scan-result stores the voter in the session for the already voted page
+      // (a stream can't), so call it once before redirecting
+      fetch(`/api/scan-result/?trigger_id=${triggerId}`)
+        .catch(error => console.log('Session update failed (non-critical):', error))
+        .finally(() => {
+          // Redirect to already voted page after a short delay
+          setTimeout(() => {
+            window.location.href = '/already-voted/';
+          }, 2000);
+        });
+    } else if (data.status === 'error') {
+      statusDiv.innerHTML = `<div class="text-danger">No match: ${data.message || 'Fingerprint not registered or unmatched'}</div>`;
+      scanBtn.disabled = false;
+    } else {
+      console.warn('Unknown status from scan result:', data.status);
+    }
+  }
+
   proceedBtn.addEventListener('click', function () {
     if (matchedVoterId) {
       window.location.href = `/voter-home/${matchedVoterId}/`;
@@ -1,6 +1,11 @@
 document.addEventListener('DOMContentLoaded', function () {
     const startScanBtn = document.getElementById('startScanBtn');
     const currentVoterId = document.getElementById('voter_id_field')?.value;
+    // ESP32 station used for enrollment: ?station=<id> once, then remembered.
+    // Must match the device's STATION ('' = default station, as the sketch ships)
+    const station = new URLSearchParams(window.location.search).get('station')
+        ?? localStorage.getItem('scanStation') ?? '';
+    localStorage.setItem('scanStation', station);
 
     startScanBtn.addEventListener('click', function () {
         console.log('🔘 Start Scan Button clicked');
@@ -19,7 +24,8 @@ document.addEventListener('DOMContentLoaded', function () {
             },
             body: JSON.stringify({
                 voter_id: currentVoterId,
-                action: 'register'
+                action: 'register',
+                station: station
             })
         })
         .then(response => response.json())
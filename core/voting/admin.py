@@ -4,7 +4,11 @@ from django.http import JsonResponse
 from django.utils.html import format_html
 from .models import Voter, Post, Candidate, Vote, VotingSession, ActivityLog, FingerprintTemplate
 
-admin.site.register(FingerprintTemplate)
+@admin.register(FingerprintTemplate)
+class FingerprintTemplateAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'duplicate_of', 'duplicate_score', 'created_at')
+    list_filter = (('duplicate_of', admin.EmptyFieldListFilter), 'created_at')
+    exclude = ('template',)
 
 @admin.register(Voter)
 class VoterAdmin(admin.ModelAdmin):
@@ -64,5 +68,11 @@ class VotingSessionAdmin(admin.ModelAdmin):
 
 @admin.register(ActivityLog)
 class ActivityLogAdmin(admin.ModelAdmin):
-    list_display = ('action', 'timestamp')
-    search_fields = ('action',)
+    list_display = ('action', 'event_type', 'outcome', 'voter', 'station', 'score', 'timestamp')
+    # Filters and exact voter/station lookups use the indexed columns instead
+    # of a LIKE scan over `action`
+    list_filter = ('event_type', 'outcome', 'timestamp')
+    search_fields = ('=voter__voter_id', '=station')
+    list_select_related = ('voter',)
+    date_hierarchy = 'timestamp'
+    raw_id_fields = ('voter',)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class VotingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'voting'
+
+    def ready(self):
+        # Keep the in-memory fingerprint gallery in sync with the database
+        from . import signals  # noqa: F401
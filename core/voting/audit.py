@@ -0,0 +1,166 @@
+"""
+Audit log writer.
+
+Views record ActivityLog entries with ``log_activity`` instead of
+``ActivityLog.objects.create``. In the default 'async' mode
+(AUDIT_LOG_MODE) the entry is queued in memory and a background thread
+writes queued entries with one bulk_create every AUDIT_LOG_BATCH_SIZE
+entries or AUDIT_LOG_FLUSH_INTERVAL_MS milliseconds, whichever comes
+first, so requests don't wait for audit writes. 'sync' writes each entry
+immediately, which is what tests and scripts that read the log back
+should use.
+
+Entries are queued when the surrounding transaction commits (at once
+outside a transaction), so log lines of a rolled back transaction are
+dropped just as before. Each entry keeps the time it was logged, not the
+time it was written. After every batch the writer seals the new entries
+onto the activity log hash chain (voting/chain.py), in the order they
+were written; in 'sync' mode each entry is sealed once its transaction
+commits. The queue is flushed when the process exits; entries still
+queued when a process is killed are lost.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .chain import seal
+from .models import ActivityLog
+
+
+class AuditLogWriter:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queue = []
+        self._thread = None
+        self._stopping = False
+        # Entries taken off the queue but not written yet
+        self._writing = 0
+        # Set by flush to write the queue without waiting for the interval
+        self._flushing = False
+
+    @property
+    def batch_size(self):
+        return max(1, getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100))
+
+    @property
+    def interval(self):
+        return getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL_MS', 200) / 1000
+
+    def enqueue(self, entry):
+        with self._condition:
+            self._queue.append(entry)
+            if self._thread is None or not self._thread.is_alive():
+                self._start()
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+
+    def _start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    deadline = time.monotonic() + self.interval
+                    while len(self._queue) < self.batch_size and not (self._stopping or self._flushing):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    batch, self._queue = self._queue, []
+                    self._writing = len(batch)
+                    self._flushing = False
+                    stopping = self._stopping
+                self._write(batch)
+                with self._condition:
+                    self._writing = 0
+                    self._condition.notify_all()
+                if stopping and not self._queue:
+                    return
+        finally:
+            close_old_connections()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        close_old_connections()
+        try:
+            ActivityLog.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception as e:
+            print(f"❌ Audit log write of {len(batch)} entries failed: {str(e)}")
+            # Retry one by one so a single bad entry (e.g. a voter deleted
+            # meanwhile) doesn't hold back the rest
+            for entry in batch:
+                try:
+                    entry.save(force_insert=True)
+                except Exception as e:
+                    print(f"❌ Dropped audit log entry {entry.action!r}: {str(e)}")
+        _seal()
+
+    def flush(self, timeout=10):
+        """Wait until everything queued so far has been written (or ``timeout`` seconds)."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    return False
+                if self._queue:
+                    self._flushing = True
+                    self._condition.notify_all()
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Write what is left and stop the thread; called at exit."""
+        with self._condition:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        with self._condition:
+            # The thread is gone (or stuck): write leftovers from here
+            leftover, self._queue = self._queue, []
+        if leftover:
+            self._write(leftover)
+
+
+def _seal():
+    try:
+        seal('activity')
+    except Exception as e:
+        # Left unsealed; the next batch or verification picks them up
+        print(f"❌ Sealing the activity log failed: {str(e)}")
+
+
+audit_log = AuditLogWriter()
+atexit.register(audit_log.close)
+
+
+def log_activity(action, event_type='other', outcome='', voter=None, station='', score=None):
+    """
+    Record an ActivityLog entry, written asynchronously unless AUDIT_LOG_MODE
+    is 'sync'. ``voter`` is a Voter or its primary key; the other keyword
+    arguments fill the structured columns next to the ``action`` text.
+    """
+    entry = ActivityLog(
+        action=action[:255],
+        timestamp=timezone.now(),
+        event_type=event_type,
+        outcome=outcome,
+        voter_id=getattr(voter, 'pk', voter),
+        station=(station or '')[:50],
+        score=score,
+    )
+    if getattr(settings, 'AUDIT_LOG_MODE', 'async') == 'sync':
+        entry.save(force_insert=True)
+        transaction.on_commit(_seal)
+        return
+    transaction.on_commit(lambda: audit_log.enqueue(entry))
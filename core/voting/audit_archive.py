@@ -0,0 +1,241 @@
+"""
+Archiving old ActivityLog entries to compressed JSON-lines files.
+
+``python manage.py archive_activity`` moves entries older than a cut-off
+out of the table into one file per UTC hour or day under
+AUDIT_ARCHIVE_DIR, named after the partition:
+
+    activity-2026-10-18.jsonl.gz        (--partition day)
+    activity-2026-10-18T09.jsonl.zst    (--partition hour, --compression zstd)
+
+Files are only ever appended to: every run adds a new gzip member or zstd
+frame, which the readers handle transparently. Each batch is flushed and
+fsynced before its rows are deleted, so an interrupted run can leave an
+entry both archived and in the table (and archive it again next time) but
+never loses one; ``read_archive`` callers that care can de-duplicate on
+``id``.
+
+Entries carry their ``chain_seq`` and ``chain_hash`` (voting/chain.py)
+into the archive. Only a verified prefix of the activity log hash chain is
+archived, in chain order: entries up to the last ChainCheckpoint, and none
+after an entry that is still too recent to go. The ChainHead base moves
+along with every deleted batch, so full verification of the rows left
+starts where the archive ends.
+
+``read_archive`` streams entries back for a time range, opening only the
+files whose partition overlaps it and reading them line by line.
+zstd needs the optional ``zstandard`` package.
+"""
+import gzip
+import io
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .chain import last_checkpoint
+from .models import ActivityLog, ChainHead
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PARTITION_FORMATS = {
+    'day': ('%Y-%m-%d', timedelta(days=1)),
+    'hour': ('%Y-%m-%dT%H', timedelta(hours=1)),
+}
+EXTENSIONS = {'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+ARCHIVE_FILE = re.compile(r'^activity-(?P<partition>[\dT-]+)\.jsonl\.(?P<ext>gz|zst)$')
+
+ARCHIVE_FIELDS = (
+    'id', 'timestamp', 'action', 'event_type', 'outcome', 'voter_id', 'voter__voter_id', 'station', 'score',
+    'chain_seq', 'chain_hash',
+)
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise ArchiveError('zstd archives need the "zstandard" package (pip install zstandard)')
+
+
+def archive_path(directory, partition, timestamp, compression):
+    """File that entries logged at ``timestamp`` go to."""
+    pattern, _ = PARTITION_FORMATS[partition]
+    name = timestamp.astimezone(dt_timezone.utc).strftime(pattern)
+    return os.path.join(directory, f"activity-{name}{EXTENSIONS[compression]}")
+
+
+def _archive_record(row):
+    record = dict(zip(ARCHIVE_FIELDS, row))
+    record['timestamp'] = record['timestamp'].isoformat()
+    # The voter's public id outlives the row the primary key points to
+    record['voter'] = record.pop('voter__voter_id')
+    return record
+
+
+class _ArchiveWriter:
+    """Open append-mode archive files of one run, keyed by path."""
+
+    def __init__(self, compression):
+        self.compression = compression
+        self._files = {}
+
+    def _open(self, path):
+        handle = self._files.get(path)
+        if handle is None:
+            raw = open(path, 'ab')
+            if self.compression == 'zstd':
+                stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+            else:
+                stream = gzip.GzipFile(fileobj=raw, mode='ab')
+            handle = self._files[path] = (raw, stream)
+        return handle
+
+    def write(self, path, records):
+        _, stream = self._open(path)
+        for record in records:
+            stream.write((json.dumps(record, separators=(',', ':')) + '\n').encode())
+
+    def sync(self):
+        """Make everything written so far durable, before the rows are deleted."""
+        for raw, stream in self._files.values():
+            if self.compression == 'zstd':
+                stream.flush(zstandard.FLUSH_BLOCK)
+            else:
+                stream.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    def close(self):
+        for raw, stream in self._files.values():
+            stream.close()
+            if not raw.closed:
+                raw.close()
+        self._files = {}
+
+
+def archivable(before):
+    """
+    Entries that may be archived for the cut-off ``before``: the verified
+    prefix of the chain whose entries were all logged before it.
+    """
+    checkpoint = last_checkpoint('activity')
+    limit = checkpoint.last_seq if checkpoint else 0
+    newer = (
+        ActivityLog.objects.filter(timestamp__gte=before, chain_seq__isnull=False)
+        .order_by('chain_seq').values_list('chain_seq', flat=True).first()
+    )
+    if newer is not None:
+        limit = min(limit, newer - 1)
+    return ActivityLog.objects.filter(timestamp__lt=before, chain_seq__lte=limit)
+
+
+def archive_activity(before, directory, partition='day', compression='gzip', batch_size=5000, dry_run=False):
+    """
+    Move ActivityLog entries logged before ``before`` into archive files,
+    ``batch_size`` at a time. Returns {archive path: entries archived}.
+    """
+    if compression == 'zstd':
+        _require_zstd()
+    queryset = archivable(before)
+    if dry_run:
+        counts = {}
+        for timestamp in queryset.values_list('timestamp', flat=True).iterator(chunk_size=batch_size):
+            path = archive_path(directory, partition, timestamp, compression)
+            counts[path] = counts.get(path, 0) + 1
+        return counts
+
+    os.makedirs(directory, exist_ok=True)
+    writer = _ArchiveWriter(compression)
+    counts = {}
+    last_seq = 0
+    try:
+        while True:
+            rows = list(
+                queryset.filter(chain_seq__gt=last_seq).order_by('chain_seq')
+                .values_list(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            last_seq = rows[-1][-2]
+            partitions = {}
+            for row in rows:
+                path = archive_path(directory, partition, row[1], compression)
+                partitions.setdefault(path, []).append(_archive_record(row))
+            for path, records in partitions.items():
+                writer.write(path, records)
+                counts[path] = counts.get(path, 0) + len(records)
+            writer.sync()
+            with transaction.atomic():
+                ActivityLog.objects.filter(pk__in=[row[0] for row in rows]).delete()
+                ChainHead.objects.filter(chain='activity').update(base_seq=last_seq, base_hash=rows[-1][-1])
+    finally:
+        writer.close()
+    return counts
+
+
+def _partition_range(name):
+    """(start, end) in UTC covered by an archive file's partition name."""
+    for pattern, length in PARTITION_FORMATS.values():
+        try:
+            start = datetime.strptime(name, pattern).replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            continue
+        return start, start + length
+    return None
+
+
+def _open_lines(path):
+    if path.endswith('.zst'):
+        _require_zstd()
+        raw = open(path, 'rb')
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return gzip.open(path, 'rt', encoding='utf-8')
+
+
+def archive_files(directory, start=None, end=None):
+    """Archive files in ``directory`` whose partition overlaps [start, end), oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    files = []
+    for name in os.listdir(directory):
+        match = ARCHIVE_FILE.match(name)
+        covered = match and _partition_range(match.group('partition'))
+        if not covered:
+            continue
+        if (start is not None and covered[1] <= start) or (end is not None and covered[0] >= end):
+            continue
+        files.append((covered[0], os.path.join(directory, name)))
+    return [path for _, path in sorted(files)]
+
+
+def read_archive(directory, start=None, end=None, event_type=None, voter=None):
+    """
+    Yield archived entries (dicts) logged in [start, end), optionally only
+    of ``event_type`` and/or the voter with public id ``voter``. Files are
+    streamed one line at a time; entries come out file by file, in the
+    order they were archived.
+    """
+    for path in archive_files(directory, start, end):
+        with _open_lines(path) as lines:
+            for line in lines:
+                record = json.loads(line)
+                timestamp = parse_datetime(record['timestamp'])
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp >= end:
+                    continue
+                if event_type and record.get('event_type') != event_type:
+                    continue
+                if voter and record.get('voter') != voter:
+                    continue
+                yield record
@@ -0,0 +1,158 @@
+"""
+The ballot: which posts are up for election and who stands for them, and
+committing a voter's choices.
+
+The ballot definition doesn't change while an election runs, so it is
+loaded once per process into ``ballot_cache`` and shared by the ballot
+pages, the posts/candidates APIs and vote validation. Post and Candidate
+signal handlers (voting/signals.py) invalidate it by bumping its version;
+other processes only see changes after BALLOT_CACHE_RELOAD_INTERVAL
+seconds, if set.
+
+vote_view, submit_vote and cast_vote all record a ballot the same way:
+lock the voter, validate every (post, candidate) pair against the cached
+definition, insert the votes, add them to the live tallies
+(voting/tally.py) and mark the voter as having voted, in one transaction.
+A ballot of any size takes BALLOT_COMMIT_QUERIES queries (fewer if nothing
+on it is valid) once the definition is cached. The votes go onto the vote
+hash chain (voting/chain.py) after the transaction commits, from the
+sealer thread, so booths never queue on the chain head.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .chain import sealer
+from .models import Candidate, Post, Vote, Voter
+from .serializers import CandidateSerializer, PostSerializer
+from .tally import add_votes
+
+# Lock the voter, insert the votes, count them in the tallies, flip has_voted
+BALLOT_COMMIT_QUERIES = 4
+
+
+class BallotDefinition:
+    """Snapshot of the posts and candidates, tagged with the cache version it was loaded at."""
+
+    def __init__(self, version, posts, candidates):
+        self.version = version
+        # Posts with their candidates prefetched, for the ballot templates
+        self.posts = posts
+        # candidate id -> post id, every valid (post, candidate) pair
+        self.candidate_posts = {candidate.id: candidate.post_id for candidate in candidates}
+        # API representations (photo/symbol as media URLs)
+        self.posts_data = PostSerializer(posts, many=True).data
+        self.candidates_data = CandidateSerializer(candidates, many=True).data
+
+
+class BallotCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._definition = None
+        self._loaded_at = None
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def get(self):
+        """The current BallotDefinition, loaded from the database if needed."""
+        interval = getattr(settings, 'BALLOT_CACHE_RELOAD_INTERVAL', None)
+        with self._lock:
+            definition, version = self._definition, self._version
+            if definition is not None and (not interval or time.monotonic() - self._loaded_at < interval):
+                return definition
+
+        # Loaded outside the lock; an invalidation while loading makes the
+        # result stale, so it is used for this call but not kept
+        posts = list(Post.objects.prefetch_related('candidates'))
+        candidates = list(Candidate.objects.select_related('post'))
+        definition = BallotDefinition(version, posts, candidates)
+        with self._lock:
+            if self._version == version:
+                self._definition = definition
+                self._loaded_at = time.monotonic()
+        return definition
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._definition = None
+
+
+ballot_cache = BallotCache()
+
+
+class AlreadyVotedError(Exception):
+    def __init__(self, voter):
+        super().__init__(f'{voter} has already voted')
+        self.voter = voter
+
+
+def validate_ballot(votes) -> tuple:
+    """
+    Check ``votes`` ([{"post", "candidate"}, ...]) against the cached ballot.
+
+    Returns (pairs, rejected): the valid (post_id, candidate_id) pairs, one
+    per post (the first choice wins, as the one-vote-per-post constraint
+    allows no more), and (item, reason) for every item that was skipped.
+    Items without a post or candidate are skipped silently, as before.
+    """
+    items = []
+    rejected = []
+    for item in votes:
+        post_id, candidate_id = item.get('post'), item.get('candidate')
+        if not post_id or not candidate_id:
+            continue
+        try:
+            items.append((item, int(post_id), int(candidate_id)))
+        except (TypeError, ValueError):
+            rejected.append((item, 'Invalid post or candidate id'))
+
+    candidate_posts = ballot_cache.get().candidate_posts if items else {}
+
+    pairs = {}
+    for item, post_id, candidate_id in items:
+        if candidate_id not in candidate_posts:
+            rejected.append((item, f'Candidate {candidate_id} does not exist'))
+        elif candidate_posts[candidate_id] != post_id:
+            rejected.append((item, f'Candidate {candidate_id} is not standing for post {post_id}'))
+        elif post_id in pairs:
+            rejected.append((item, f'More than one vote for post {post_id}'))
+        else:
+            pairs[post_id] = candidate_id
+    return list(pairs.items()), rejected
+
+
+def commit_ballot(voter, votes) -> tuple:
+    """
+    Record ``votes`` for ``voter`` and mark them as having voted.
+
+    Runs in its own transaction (or savepoint) with the voter row locked,
+    so two concurrent submissions can't both get through. Raises
+    AlreadyVotedError if the voter has already voted. Returns
+    (voter, created votes, rejected items) where ``voter`` is the freshly
+    locked and updated row.
+    """
+    with transaction.atomic():
+        voter = Voter.objects.select_for_update().get(pk=voter.pk)
+        if voter.has_voted:
+            raise AlreadyVotedError(voter)
+
+        pairs, rejected = validate_ballot(votes)
+        created = Vote.objects.bulk_create([
+            Vote(voter=voter, post_id=post_id, candidate_id=candidate_id) for post_id, candidate_id in pairs
+        ])
+        add_votes(candidate_id for _, candidate_id in pairs)
+
+        voter.has_voted = True
+        voter.last_vote_attempt = timezone.now()
+        voter.save(update_fields=['has_voted', 'last_vote_attempt'])
+        if created:
+            transaction.on_commit(lambda: sealer.request('vote'))
+    return voter, created, rejected
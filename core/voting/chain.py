@@ -0,0 +1,258 @@
+"""
+Hash chains over Vote and ActivityLog.
+
+Every vote and every activity log entry gets a ``chain_seq``, its position
+on the chain, and a ``chain_hash``, the SHA-256 of the previous row's
+chain_hash followed by the row's own content (see CHAINS for the fields).
+Editing, deleting or inserting a row anywhere breaks the link to the row
+after it, so tampering shows up without trusting the database.
+
+Rows are inserted unsealed, with neither set, so ballots and log writes
+never wait on each other for a shared row. ``seal`` then takes committed
+unsealed rows in primary key order, numbers and hashes them from the
+chain's ChainHead and moves the head, in batches of one short transaction
+each. It runs off the request path: ``sealer``, a background thread, seals
+the vote chain shortly after ballots commit, and the audit log writer
+seals the activity log after every batch it writes. A row that commits
+after rows with higher primary keys were sealed is simply sealed later,
+further along the chain; until a row is sealed it isn't protected.
+
+``verify_chain`` (``python manage.py verify_audit_chain``) seals what is
+pending, then walks the rows sealed since the last ChainCheckpoint and
+stores a new checkpoint when they all check out, so a daily verification
+reads only that day's rows. The checkpoint row itself is re-read, so
+rewriting the chain from an already verified row onwards is caught too;
+``full=True`` walks everything still in the table. Rows refer to their
+voter by primary key, which never changes; voters with votes or log
+entries still in the table can't be deleted (on_delete=PROTECT), as
+cascading or clearing those rows would rewrite recorded history.
+"""
+import atexit
+import hashlib
+import json
+import threading
+import time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ActivityLog, ChainCheckpoint, ChainHead, Vote
+
+GENESIS = '0' * 64
+
+# chain -> (model, fields covered by the hash, in hashing order)
+CHAINS = {
+    'vote': (Vote, ('voter_id', 'post_id', 'candidate_id', 'timestamp')),
+    'activity': (
+        ActivityLog,
+        ('timestamp', 'action', 'event_type', 'outcome', 'voter_id', 'station', 'score'),
+    ),
+}
+
+
+def _canonical(value):
+    if hasattr(value, 'isoformat'):
+        if timezone.is_aware(value):
+            value = value.astimezone(dt_timezone.utc)
+        return value.isoformat()
+    return value
+
+
+def link_hash(previous, values):
+    """chain_hash of a row with field ``values`` following a row hashed ``previous``."""
+    content = json.dumps([_canonical(value) for value in values], separators=(',', ':'))
+    return hashlib.sha256(f"{previous}\n{content}".encode()).hexdigest()
+
+
+def _head(chain, lock=False):
+    queryset = ChainHead.objects.select_for_update() if lock else ChainHead.objects
+    head, _ = queryset.get_or_create(chain=chain, defaults={'last_hash': GENESIS, 'base_hash': GENESIS})
+    return head
+
+
+def seal(chain, batch_size=1000):
+    """
+    Number and hash the committed unsealed rows of ``chain`` in primary key
+    order, ``batch_size`` per transaction. Returns how many were sealed.
+    """
+    model, fields = CHAINS[chain]
+    sealed = 0
+    while True:
+        with transaction.atomic():
+            head = _head(chain, lock=True)
+            rows = list(
+                model.objects.filter(chain_seq__isnull=True).order_by('pk')
+                .values_list('pk', *fields)[:batch_size]
+            )
+            if not rows:
+                break
+            previous, seq = head.last_hash, head.last_seq
+            objs = []
+            for pk, *values in rows:
+                seq += 1
+                previous = link_hash(previous, values)
+                objs.append(model(pk=pk, chain_seq=seq, chain_hash=previous))
+            model.objects.bulk_update(objs, ['chain_seq', 'chain_hash'])
+            ChainHead.objects.filter(chain=chain).update(last_hash=previous, last_seq=seq)
+        sealed += len(rows)
+        if len(rows) < batch_size:
+            break
+    return sealed
+
+
+class ChainSealer:
+    """
+    Background thread sealing chains on request, at most once every
+    CHAIN_SEAL_INTERVAL_MS milliseconds per chain.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = set()
+        self._thread = None
+        self._stopping = False
+        self._sealing = False
+
+    @property
+    def interval(self):
+        return getattr(settings, 'CHAIN_SEAL_INTERVAL_MS', 200) / 1000
+
+    def request(self, chain):
+        with self._condition:
+            self._pending.add(chain)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='chain-sealer', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    while not self._pending and not self._stopping:
+                        self._condition.wait()
+                    if not self._pending:
+                        return
+                    stopping = self._stopping
+                if not stopping:
+                    # Let the ballots committing around now join this round
+                    time.sleep(self.interval)
+                with self._condition:
+                    chains, self._pending = self._pending, set()
+                    self._sealing = True
+                self._seal(chains)
+                with self._condition:
+                    self._sealing = False
+                    self._condition.notify_all()
+        finally:
+            close_old_connections()
+
+    def _seal(self, chains):
+        close_old_connections()
+        for chain in sorted(chains):
+            try:
+                seal(chain)
+            except Exception as e:
+                # Left unsealed; the next request or verification picks them up
+                print(f"❌ Sealing the {chain} chain failed: {str(e)}")
+
+    def flush(self, timeout=10):
+        """Wait until every chain requested so far has been sealed (or ``timeout`` seconds)."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._sealing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Seal what was requested and stop the thread; called at exit."""
+        with self._condition:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+
+sealer = ChainSealer()
+atexit.register(sealer.close)
+
+
+def last_checkpoint(chain):
+    return ChainCheckpoint.objects.filter(chain=chain).order_by('-last_seq', '-pk').first()
+
+
+class ChainReport:
+    def __init__(self, chain, start_seq):
+        self.chain = chain
+        self.start_seq = start_seq
+        self.rows = 0
+        self.last_seq = start_seq
+        self.last_hash = None
+        # (chain_seq, expected hash, stored hash or None if the row is gone)
+        self.breaks = []
+        self.checkpoint = None
+
+    @property
+    def ok(self):
+        return not self.breaks
+
+
+def verify_chain(chain, full=False, chunk_size=2000, save_checkpoint=True, max_breaks=100):
+    """
+    Seal pending rows, then check the links of ``chain`` from its last
+    checkpoint (or, with ``full``, from the first row still in the table)
+    to its tip. Stores a new checkpoint if every link holds and there were
+    new rows. Returns a ChainReport; at most ``max_breaks`` broken links are
+    listed.
+    """
+    model, fields = CHAINS[chain]
+    seal(chain)
+    head = _head(chain)
+    # Rows sealed from here on are not part of this verification, but the
+    # tip as of now must be reached, or rows were cut off the end
+    tip = head.last_hash
+    checkpoint = None if full else last_checkpoint(chain)
+
+    if checkpoint is not None:
+        report = ChainReport(chain, checkpoint.last_seq)
+        previous = checkpoint.last_hash
+        if checkpoint.last_seq > head.base_seq:
+            stored = model.objects.filter(chain_seq=checkpoint.last_seq).values_list('chain_hash', flat=True).first()
+            if stored != checkpoint.last_hash:
+                report.breaks.append((checkpoint.last_seq, checkpoint.last_hash, stored))
+    else:
+        report = ChainReport(chain, head.base_seq)
+        previous = head.base_hash
+
+    reached_tip = previous == tip
+    rows = (
+        model.objects.filter(chain_seq__gt=report.start_seq, chain_seq__lte=head.last_seq).order_by('chain_seq')
+        .values_list('chain_seq', 'chain_hash', *fields).iterator(chunk_size=chunk_size)
+    )
+    for seq, stored, *values in rows:
+        expected = link_hash(previous, values)
+        if expected != stored and len(report.breaks) < max_breaks:
+            report.breaks.append((seq, expected, stored))
+        # Carry on from the stored hash, so every broken link is reported
+        # rather than every row after the first one
+        previous = stored
+        report.rows += 1
+        report.last_seq = seq
+        if stored == tip:
+            reached_tip = True
+    report.last_hash = previous
+    if not reached_tip:
+        report.breaks.append((None, tip, previous))
+
+    if report.ok and report.rows and save_checkpoint:
+        report.checkpoint = ChainCheckpoint.objects.create(
+            chain=chain, last_seq=report.last_seq, last_hash=report.last_hash, rows=report.rows
+        )
+    return report
@@ -0,0 +1,85 @@
+"""
+All-pairs duplicate search over enrolled templates (dedup_report command).
+
+The N x N score matrix is never built. Its upper triangle is cut into
+square blocks; each block is first pruned with matching.score_upper_bounds
+and only the pairs whose bound reaches the threshold are scored exactly,
+so a block needs a few MB of memory whatever the size of the roll.
+
+Blocks are scored by worker processes that memory-map the template matrix
+from a .npy file written by the parent. Like voting/matching.py this module
+does not import Django, so the (spawned) workers start quickly.
+"""
+import numpy as np
+
+from .matching import (
+    TemplateGallery, round_scores, score_gallery_batch, score_pairs, score_upper_bounds,
+)
+
+# Templates shared by the blocks scored in this (worker) process
+_templates = None
+
+
+def init_worker(path):
+    """ProcessPoolExecutor initializer: map the template matrix read-only."""
+    global _templates
+    _templates = np.load(path, mmap_mode='r')
+
+
+def block_ranges(rows, block_size):
+    """Yield (first, last, other_first, other_last) row ranges covering the upper triangle."""
+    starts = range(0, rows, block_size)
+    for first in starts:
+        for other_first in starts:
+            if other_first >= first:
+                yield (first, min(first + block_size, rows),
+                       other_first, min(other_first + block_size, rows))
+
+
+def block_pair_count(block):
+    """Number of distinct template pairs compared by ``block``."""
+    first, last, other_first, other_last = block
+    if first == other_first:
+        rows = last - first
+        return rows * (rows - 1) // 2
+    return (last - first) * (other_last - other_first)
+
+
+def scan_block(block, threshold):
+    """
+    Score the template pairs of one block.
+
+    Returns (pairs compared, [(row, other row, score)]) for the pairs whose
+    rounded score is at least ``threshold``; rows index the template matrix.
+    """
+    first, last, other_first, other_last = block
+    templates = np.asarray(_templates[first:last])
+    others = TemplateGallery(
+        np.asarray(_templates[other_first:other_last]),
+        np.arange(other_first, other_last),
+        [None] * (other_last - other_first),
+    )
+
+    if others.packed is not None:
+        bounds = score_upper_bounds(templates, others)
+        # Allow for the final score being rounded to 2 decimals
+        candidates = bounds >= threshold - 0.005
+    else:
+        candidates = np.ones((len(templates), len(others)), dtype=bool)
+    if first == other_first:
+        # Each pair once, and no template against itself
+        candidates &= np.triu(np.ones_like(candidates), k=1)
+
+    rows, columns = np.nonzero(candidates)
+    if others.packed is not None:
+        scores = score_pairs(templates[rows], others.templates[columns])
+    else:
+        scores = score_gallery_batch(templates, others)[rows, columns]
+    scores = round_scores(scores)
+
+    found = scores >= threshold
+    matches = [
+        (int(first + row), int(other_first + column), float(score))
+        for row, column, score in zip(rows[found], columns[found], scores[found])
+    ]
+    return block_pair_count(block), matches
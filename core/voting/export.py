@@ -0,0 +1,171 @@
+"""
+Streaming exports of votes, tallies, voters and the activity log.
+
+Each export is a ``values_list`` query read with ``.iterator(chunk_size)``
+and turned into CSV or a JSON array piece by piece, so memory use doesn't
+grow with the table and the first bytes (the CSV header or the opening
+bracket) go out before the query runs. The same generators back the
+``/export/<name>.<format>`` view and ``python manage.py export_data``.
+Output is buffered into pieces of about EXPORT_BUFFER_SIZE characters
+rather than yielded row by row.
+
+Under an ASGI server Django would read a plain generator to the end before
+sending anything, so the view wraps it with ``async_stream``, which pulls
+one piece at a time on the thread that runs the query.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ActivityLog, Candidate, Vote, Voter
+
+# Chain order; rows not sealed yet come last
+CHAIN_ORDER = (F('chain_seq').asc(nulls_last=True), 'pk')
+
+# name -> (queryset factory, [(column, lookup)])
+EXPORTS = {
+    'votes': (
+        lambda: Vote.objects.order_by(*CHAIN_ORDER),
+        [
+            ('id', 'pk'),
+            ('timestamp', 'timestamp'),
+            # The Voter primary key, as hashed into chain_hash, and the voter's public id
+            ('voter_id', 'voter_id'),
+            ('voter', 'voter__voter_id'),
+            ('post_id', 'post_id'),
+            ('post', 'post__title'),
+            ('candidate_id', 'candidate_id'),
+            ('candidate', 'candidate__name'),
+            ('chain_seq', 'chain_seq'),
+            ('chain_hash', 'chain_hash'),
+        ],
+    ),
+    'tallies': (
+        lambda: Candidate.objects.annotate(total_votes=Coalesce(Sum('tallies__votes'), 0)).order_by('post_id', 'pk'),
+        [
+            ('post_id', 'post_id'),
+            ('post', 'post__title'),
+            ('candidate_id', 'pk'),
+            ('candidate', 'name'),
+            ('votes', 'total_votes'),
+        ],
+    ),
+    'voters': (
+        lambda: Voter.objects.order_by('pk'),
+        [
+            ('voter_id', 'voter_id'),
+            ('name', 'name'),
+            ('fingerprint_id', 'fingerprint_id'),
+            ('age', 'age'),
+            ('gender', 'gender'),
+            ('has_voted', 'has_voted'),
+            ('last_vote_attempt', 'last_vote_attempt'),
+            ('created_at', 'created_at'),
+        ],
+    ),
+    'activity': (
+        lambda: ActivityLog.objects.order_by(*CHAIN_ORDER),
+        [
+            ('id', 'pk'),
+            ('timestamp', 'timestamp'),
+            ('action', 'action'),
+            ('event_type', 'event_type'),
+            ('outcome', 'outcome'),
+            # The Voter primary key, as hashed into chain_hash, and the voter's public id
+            ('voter_id', 'voter_id'),
+            ('voter', 'voter__voter_id'),
+            ('station', 'station'),
+            ('score', 'score'),
+            ('chain_seq', 'chain_seq'),
+            ('chain_hash', 'chain_hash'),
+        ],
+    ),
+}
+
+FORMATS = {'csv': 'text/csv', 'json': 'application/json'}
+
+
+def export_chunk_size():
+    return max(1, getattr(settings, 'EXPORT_CHUNK_SIZE', 2000))
+
+
+def _buffer_size():
+    return getattr(settings, 'EXPORT_BUFFER_SIZE', 64 * 1024)
+
+
+def export_rows(name, chunk_size=None):
+    """(columns, rows): the export's column names and a lazy iterator of value tuples."""
+    queryset, columns = EXPORTS[name]
+    rows = queryset().values_list(*[lookup for _, lookup in columns]).iterator(
+        chunk_size=chunk_size or export_chunk_size()
+    )
+    return [column for column, _ in columns], rows
+
+
+def csv_stream(columns, rows):
+    """Yield CSV text: the header at once, then rows in buffered pieces."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    limit = _buffer_size()
+    for row in rows:
+        if buffer.tell() >= limit:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow(row)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json_value(value):
+    # Full-precision ISO times: with the voter_id, post_id and candidate_id
+    # keys this is everything needed to recompute chain_hash from a JSON export
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def json_stream(columns, rows):
+    """Yield a JSON array of objects: the opening bracket at once, then rows in buffered pieces."""
+    encoder = json.JSONEncoder(separators=(',', ':'), default=_json_value)
+    yield '['
+    pieces = []
+    size = 0
+    limit = _buffer_size()
+    separator = '\n'
+    for row in rows:
+        piece = separator + encoder.encode(dict(zip(columns, row)))
+        separator = ',\n'
+        pieces.append(piece)
+        size += len(piece)
+        if size >= limit:
+            yield ''.join(pieces)
+            pieces, size = [], 0
+    yield ''.join(pieces) + '\n]\n'
+
+
+def export_stream(name, fmt, chunk_size=None):
+    """Text pieces of export ``name`` in format ``fmt`` ('csv' or 'json')."""
+    columns, rows = export_rows(name, chunk_size)
+    stream = csv_stream if fmt == 'csv' else json_stream
+    return stream(columns, rows)
+
+
+async def async_stream(stream):
+    """Async iterator over the pieces of the sync ``stream``, for ASGI responses."""
+    done = object()
+    next_piece = sync_to_async(next, thread_sensitive=True)
+    while True:
+        piece = await next_piece(stream, done)
+        if piece is done:
+            return
+        yield piece
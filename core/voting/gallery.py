@@ -0,0 +1,302 @@
+"""
+Process-wide cache of enrolled fingerprint templates.
+
+The cache is filled from the database once, on first use, and afterwards
+kept up to date by the FingerprintTemplate signal handlers in
+voting/signals.py. Matching reads decoded templates straight from memory,
+so a match request never scans the FingerprintTemplate table.
+
+When FINGERPRINT_GALLERY_FILE points at a file written by the
+export_gallery command, the templates in it are memory-mapped instead of
+loaded: only template ids, voter links and digests are read from the
+database, to find rows deleted, changed or added since the export.
+
+Each process has its own cache and only sees changes saved through the ORM
+in that process. Deployments running several worker processes can set
+FINGERPRINT_GALLERY_RELOAD_INTERVAL (seconds) to periodically reload it.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .gallery_file import GalleryFile
+from .matching import (
+    PATTERN_LENGTH, TemplateGallery, byte_histograms, find_best_match, find_best_matches,
+    prefilter_scores, score_gallery,
+)
+from .parallel import MIN_ROWS_PER_SHARD, get_parallel_matcher
+
+NO_VOTER = -1
+
+
+class GalleryCache:
+    """Decoded templates keyed by FingerprintTemplate id, with their voter pks."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        # Memory-mapped gallery file, which of its rows are still enrolled
+        # and their current voter pks
+        self._base = None
+        self._base_active = None
+        self._base_voters = None
+        # template id -> (template bytes, byte histogram, voter pk) for rows
+        # that are not in the gallery file
+        self._templates = {}
+        # template length -> [TemplateGallery]
+        self._galleries = {}
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            base_rows = int(self._base_active.sum()) if self._base is not None else 0
+            return base_rows + len(self._templates)
+
+    def _ensure_loaded(self):
+        interval = getattr(settings, 'FINGERPRINT_GALLERY_RELOAD_INTERVAL', None)
+        if self._loaded_at is not None:
+            if not interval or time.monotonic() - self._loaded_at < interval:
+                return
+        self._load()
+
+    def _load(self):
+        from .models import FingerprintTemplate
+
+        path = getattr(settings, 'FINGERPRINT_GALLERY_FILE', None)
+        base = GalleryFile(path) if path and os.path.exists(path) else None
+
+        templates = {}
+        if base is None:
+            for template_id, voter_pk, template in FingerprintTemplate.objects.values_list(
+                    'id', 'voter_id', 'template').iterator(chunk_size=2000):
+                templates[template_id] = self._entry(template, voter_pk)
+        else:
+            links = np.array(
+                [(template_id, NO_VOTER if voter_pk is None else voter_pk, digest)
+                 for template_id, voter_pk, digest in FingerprintTemplate.objects.values_list(
+                     'id', 'voter_id', 'digest').iterator(chunk_size=5000)],
+                dtype=np.int64,
+            ).reshape(-1, 3)
+            rows = self._base_rows(base, links[:, 0])
+            in_base = rows >= 0
+            # Rows whose template changed since the export are read from the
+            # database like new ones
+            in_base[in_base] = base.digests[rows[in_base]] == links[in_base, 2]
+            self._base_active = np.zeros(len(base), dtype=bool)
+            self._base_active[rows[in_base]] = True
+            self._base_voters = np.full(len(base), NO_VOTER, dtype=np.int64)
+            self._base_voters[rows[in_base]] = links[in_base, 1]
+
+            missing = links[~in_base, 0].tolist()
+            for start in range(0, len(missing), 500):
+                for template_id, voter_pk, template in FingerprintTemplate.objects.filter(
+                        id__in=missing[start:start + 500]).values_list('id', 'voter_id', 'template'):
+                    templates[template_id] = self._entry(template, voter_pk)
+
+        self._base = base
+        self._templates = templates
+        self._galleries = {}
+        self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _base_rows(base, template_ids):
+        """Row of each template id in the (id-sorted) gallery file, or -1."""
+        template_ids = np.asarray(template_ids, dtype=np.int64)
+        if len(base) == 0:
+            return np.full(len(template_ids), -1, dtype=np.int64)
+        rows = np.searchsorted(base.template_ids, template_ids)
+        rows[rows >= len(base)] = 0
+        return np.where(base.template_ids[rows] == template_ids, rows, -1)
+
+    @staticmethod
+    def _entry(template, voter_pk):
+        template = bytes(template)
+        histogram = byte_histograms(np.frombuffer(template, dtype=np.uint8)[None, :])[0]
+        return template, histogram, NO_VOTER if voter_pk is None else voter_pk
+
+    def galleries(self, template_length):
+        """
+        Return TemplateGalleries covering every cached template of
+        ``template_length`` bytes: the gallery file (if any) and the rows
+        held in memory. Their ``voters`` are Voter primary keys, NO_VOTER
+        for templates that are not linked to a voter yet.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            galleries = self._galleries.get(template_length)
+            if galleries is None:
+                galleries = self._build_galleries(template_length)
+                self._galleries[template_length] = galleries
+            return galleries
+
+    def _build_galleries(self, template_length):
+        galleries = []
+        if self._base is not None and self._base.template_length == template_length:
+            galleries.append(self._base.gallery(voters=self._base_voters, active=self._base_active))
+
+        # Newest templates first, like FingerprintTemplate.Meta.ordering
+        entries = sorted(
+            ((template_id, entry) for template_id, entry in self._templates.items()
+             if len(entry[0]) == template_length),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        if entries:
+            matrix = np.frombuffer(
+                b''.join(entry[0] for _, entry in entries), dtype=np.uint8
+            ).reshape(len(entries), template_length)
+            galleries.append(TemplateGallery(
+                matrix,
+                [template_id for template_id, _ in entries],
+                np.array([entry[2] for _, entry in entries], dtype=np.int64),
+                histograms=np.stack([entry[1] for _, entry in entries]),
+            ))
+        return galleries
+
+    def _base_row(self, template_id):
+        if self._base is None:
+            return -1
+        return int(self._base_rows(self._base, [template_id])[0])
+
+    def put_template(self, template_id, voter_pk, template):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            template = bytes(template)
+            row = self._base_row(template_id)
+            if row >= 0:
+                self._galleries.pop(self._base.template_length, None)
+                if self._base.templates[row].tobytes() == template:
+                    self._base_active[row] = True
+                    self._base_voters[row] = NO_VOTER if voter_pk is None else voter_pk
+                    return
+                self._base_active[row] = False
+
+            entry = self._entry(template, voter_pk)
+            old = self._templates.pop(template_id, None)
+            if old is not None:
+                self._galleries.pop(len(old[0]), None)
+            self._templates[template_id] = entry
+            self._galleries.pop(len(entry[0]), None)
+
+    def remove_template(self, template_id):
+        with self._lock:
+            row = self._base_row(template_id)
+            if row >= 0:
+                self._base_active[row] = False
+                self._galleries.pop(self._base.template_length, None)
+            old = self._templates.pop(template_id, None)
+            if old is not None:
+                self._galleries.pop(len(old[0]), None)
+
+    def clear(self):
+        """Drop everything; the next lookup reloads from the database."""
+        with self._lock:
+            self._base = None
+            self._base_active = None
+            self._base_voters = None
+            self._templates = {}
+            self._galleries = {}
+            self._loaded_at = None
+
+
+gallery_cache = GalleryCache()
+
+
+def match_gallery(incoming_template: bytes, galleries, use_pool: bool = True) -> tuple:
+    """
+    find_best_match over one or more galleries with the FINGERPRINT_*
+    settings applied: the top-K prefilter and, with
+    FINGERPRINT_MATCH_WORKERS > 1, the process pool.
+
+    Returns (gallery, row, score) of the best row, or (None, None, 0.0).
+    Ties go to the highest template id, as within a single gallery.
+
+    The pool keeps the most recently used galleries in shared memory, so
+    only pass ``use_pool=True`` for long-lived galleries such as the cached
+    ones.
+    """
+    if isinstance(galleries, TemplateGallery):
+        galleries = [galleries]
+    top_k = getattr(settings, 'FINGERPRINT_PREFILTER_TOP_K', 0)
+    metric = getattr(settings, 'FINGERPRINT_PREFILTER_METRIC', 'byte_hamming')
+    workers = getattr(settings, 'FINGERPRINT_MATCH_WORKERS', 0)
+
+    best_gallery, best_row, best_score = None, None, 0.0
+    for gallery in galleries:
+        if use_pool and workers > 1 and len(gallery) >= 2 * MIN_ROWS_PER_SHARD:
+            matcher = get_parallel_matcher(workers)
+            row, score = matcher.find_best_match(incoming_template, gallery, top_k=top_k, metric=metric)
+        else:
+            row, score = find_best_match(incoming_template, gallery, top_k=top_k, metric=metric)
+        if row is None:
+            continue
+        if (score > best_score or
+                (score == best_score and gallery.template_ids[row] > best_gallery.template_ids[best_row])):
+            best_gallery, best_row, best_score = gallery, row, score
+    return best_gallery, best_row, best_score
+
+
+def match_gallery_batch(incoming_templates, galleries) -> list:
+    """
+    match_gallery for an (M, L) array of incoming templates, scored
+    matrix-by-matrix with find_best_matches. Always runs in-process.
+
+    Returns one (gallery, row, score) tuple per incoming template.
+    """
+    if isinstance(galleries, TemplateGallery):
+        galleries = [galleries]
+    top_k = getattr(settings, 'FINGERPRINT_PREFILTER_TOP_K', 0)
+    metric = getattr(settings, 'FINGERPRINT_PREFILTER_METRIC', 'byte_hamming')
+
+    best = [(None, None, 0.0)] * len(incoming_templates)
+    for gallery in galleries:
+        matches = find_best_matches(incoming_templates, gallery, top_k=top_k, metric=metric)
+        for index, (row, score) in enumerate(matches):
+            if row is None:
+                continue
+            best_gallery, best_row, best_score = best[index]
+            if (score > best_score or
+                    (score == best_score and gallery.template_ids[row] > best_gallery.template_ids[best_row])):
+                best[index] = (gallery, row, score)
+    return best
+
+
+def find_duplicates(incoming_template: bytes, galleries, threshold: float, exclude_voters=()) -> list:
+    """
+    Templates enrolled to a voter that score at least ``threshold`` against
+    ``incoming_template``, best first, as (voter pk, template id, score).
+
+    Rows without a voter and rows of ``exclude_voters`` are ignored. Like
+    match_gallery, large galleries are narrowed down to the
+    FINGERPRINT_PREFILTER_TOP_K best prefilter candidates before scoring.
+    """
+    if isinstance(galleries, TemplateGallery):
+        galleries = [galleries]
+    if len(incoming_template) < PATTERN_LENGTH:
+        return []
+    top_k = getattr(settings, 'FINGERPRINT_PREFILTER_TOP_K', 0)
+    metric = getattr(settings, 'FINGERPRINT_PREFILTER_METRIC', 'byte_hamming')
+    excluded = np.array([NO_VOTER, *exclude_voters], dtype=np.int64)
+
+    duplicates = []
+    for gallery in galleries:
+        if len(gallery) == 0:
+            continue
+        eligible = ~np.isin(np.asarray(gallery.voters, dtype=np.int64), excluded)
+        if gallery.active is not None:
+            eligible &= gallery.active
+        rows = np.flatnonzero(eligible)
+        if top_k and len(rows) > top_k and gallery.packed is not None:
+            estimates = prefilter_scores(incoming_template, gallery, metric)[rows]
+            rows = rows[np.argpartition(-estimates, top_k - 1)[:top_k]]
+        scores = score_gallery(incoming_template, gallery, rows)
+        for row, score in zip(rows, scores):
+            score = round(float(score), 2)
+            if score >= threshold:
+                duplicates.append((int(gallery.voters[row]), int(gallery.template_ids[row]), score))
+    duplicates.sort(key=lambda duplicate: (duplicate[2], duplicate[1]), reverse=True)
+    return duplicates
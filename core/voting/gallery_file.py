@@ -0,0 +1,190 @@
+"""
+Fixed-stride on-disk gallery file that worker processes can mmap.
+
+Layout (all integers little-endian, every block 8-byte aligned)::
+
+    header      magic, format version, template length, count, capacity
+    templates   (capacity, L)   uint8   raw sensor templates
+    histograms  (capacity, 256) uint16  byte frequencies of each template
+    template_ids (capacity,)    int64   FingerprintTemplate primary keys
+    voter_pks   (capacity,)     int64   Voter primary keys, -1 if none
+    voter_ids   (capacity,)     S50     Voter.voter_id
+    digests     (capacity,)     int64   FingerprintTemplate.digest at export
+
+Only the first ``count`` rows are valid. Appends fill free rows and bump
+``count`` last, so readers never see half-written rows; when the file is
+full it is rewritten with twice the capacity and atomically replaced.
+
+A row whose template was changed in the database after the export no
+longer matches its ``digest`` there, which is how the gallery cache knows
+not to trust it (voting/gallery.py).
+
+Readers map the file read-only, so every process serving matches shares the
+same page-cache memory instead of holding its own copy of the gallery.
+"""
+import os
+import struct
+
+import numpy as np
+
+from .matching import TemplateGallery, byte_histograms
+
+MAGIC = b'DVSGAL01'
+FORMAT_VERSION = 2
+VOTER_ID_LENGTH = 50
+
+_HEADER = struct.Struct('<8sIIQQ')
+_HEADER_SIZE = 64
+
+
+def _align(offset):
+    return -(-offset // 8) * 8
+
+
+def _layout(length, capacity):
+    """Return {block: (offset, dtype, shape)} for a file of ``capacity`` rows."""
+    blocks = {}
+    offset = _HEADER_SIZE
+    for name, dtype, shape in (
+        ('templates', np.uint8, (capacity, length)),
+        ('histograms', np.dtype('<u2'), (capacity, 256)),
+        ('template_ids', np.dtype('<i8'), (capacity,)),
+        ('voter_pks', np.dtype('<i8'), (capacity,)),
+        ('voter_ids', np.dtype(f'S{VOTER_ID_LENGTH}'), (capacity,)),
+        ('digests', np.dtype('<i8'), (capacity,)),
+    ):
+        blocks[name] = (offset, dtype, shape)
+        offset = _align(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return blocks, offset
+
+
+def _read_header(handle):
+    handle.seek(0)
+    magic, version, length, count, capacity = _HEADER.unpack(handle.read(_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("Not a fingerprint gallery file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Gallery file format {version} is out of date; run export_gallery again")
+    return length, count, capacity
+
+
+def _write_header(handle, length, count, capacity):
+    handle.seek(0)
+    handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, length, count, capacity).ljust(_HEADER_SIZE, b'\0'))
+
+
+def _map_blocks(path, length, capacity, mode):
+    blocks, _ = _layout(length, capacity)
+    return {
+        name: np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+        for name, (offset, dtype, shape) in blocks.items()
+    }
+
+
+def _fill(arrays, start, templates, template_ids, voter_pks, voter_ids, digests):
+    stop = start + len(template_ids)
+    arrays['templates'][start:stop] = templates
+    arrays['histograms'][start:stop] = byte_histograms(templates)
+    arrays['template_ids'][start:stop] = template_ids
+    arrays['voter_pks'][start:stop] = voter_pks
+    arrays['voter_ids'][start:stop] = voter_ids
+    arrays['digests'][start:stop] = digests
+
+
+def write_gallery_file(path, templates, template_ids, voter_pks, voter_ids, digests, capacity=None):
+    """
+    Write a new gallery file at ``path`` (replacing any existing one).
+
+    ``templates`` is an (N, L) uint8 array, the other arguments have one
+    entry per row; use -1 in ``voter_pks`` for templates without a voter.
+    """
+    templates = np.asarray(templates, dtype=np.uint8)
+    rows, length = templates.shape
+    capacity = max(capacity or 0, rows, 1)
+    _, size = _layout(length, capacity)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as handle:
+        handle.truncate(size)
+        _write_header(handle, length, 0, capacity)
+    arrays = _map_blocks(temporary, length, capacity, 'r+')
+    _fill(arrays, 0, templates, template_ids, voter_pks, voter_ids, digests)
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    with open(temporary, 'r+b') as handle:
+        _write_header(handle, length, rows, capacity)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+def append_gallery_file(path, templates, template_ids, voter_pks, voter_ids, digests):
+    """Append rows to an existing gallery file, growing it when it is full."""
+    templates = np.asarray(templates, dtype=np.uint8)
+    if len(template_ids) == 0:
+        return
+
+    with open(path, 'rb') as handle:
+        length, count, capacity = _read_header(handle)
+    if templates.shape[1] != length:
+        raise ValueError(f"Gallery file holds {length}-byte templates, got {templates.shape[1]}")
+
+    if count + len(template_ids) > capacity:
+        existing = GalleryFile(path)
+        write_gallery_file(
+            path,
+            np.concatenate([existing.templates, templates]),
+            np.concatenate([existing.template_ids, template_ids]),
+            np.concatenate([existing.voter_pks, voter_pks]),
+            np.concatenate([existing.voter_ids, np.asarray(voter_ids, dtype=f'S{VOTER_ID_LENGTH}')]),
+            np.concatenate([existing.digests, np.asarray(digests, dtype=np.int64)]),
+            capacity=2 * (count + len(template_ids)),
+        )
+        return
+
+    arrays = _map_blocks(path, length, capacity, 'r+')
+    _fill(arrays, count, templates, template_ids, voter_pks, voter_ids, digests)
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    with open(path, 'r+b') as handle:
+        _write_header(handle, length, count + len(template_ids), capacity)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+class GalleryFile:
+    """Read-only memory map of the first ``count`` rows of a gallery file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as handle:
+            self.template_length, self.count, self.capacity = _read_header(handle)
+        arrays = _map_blocks(path, self.template_length, self.capacity, 'r')
+        self.templates = arrays['templates'][:self.count]
+        self.histograms = arrays['histograms'][:self.count]
+        self.template_ids = arrays['template_ids'][:self.count]
+        self.voter_pks = arrays['voter_pks'][:self.count]
+        self.voter_ids = arrays['voter_ids'][:self.count]
+        self.digests = arrays['digests'][:self.count]
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def max_template_id(self):
+        return int(self.template_ids.max()) if self.count else 0
+
+    def gallery(self, voters=None, active=None):
+        """
+        Return a TemplateGallery backed by the mapped file (no copy).
+
+        ``voters`` defaults to a copy of the stored voter pks.
+        """
+        if voters is None:
+            voters = np.array(self.voter_pks)
+        return TemplateGallery(
+            self.templates, self.template_ids, voters,
+            histograms=self.histograms, active=active,
+        )
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from voting.audit_archive import ArchiveError, archive_activity
+from voting.models import ActivityLog
+
+
+class Command(BaseCommand):
+    help = 'Move old ActivityLog entries into compressed JSON-lines archive files, one per hour or day'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=float,
+            default=7,
+            help='Archive entries logged more than this many days ago (default: 7)'
+        )
+        parser.add_argument(
+            '--before',
+            help='Archive entries logged before this ISO 8601 time instead (e.g. 2026-10-18T06:00:00Z)'
+        )
+        parser.add_argument(
+            '--directory',
+            default=str(getattr(settings, 'AUDIT_ARCHIVE_DIR', 'audit_archive')),
+            help='Directory of the archive files (default: AUDIT_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--partition',
+            choices=['day', 'hour'],
+            default='day',
+            help='One archive file per UTC day or hour (default: day)'
+        )
+        parser.add_argument(
+            '--compression',
+            choices=['gzip', 'zstd'],
+            default='gzip',
+            help='gzip, or zstd with the optional zstandard package (default: gzip)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Entries archived and deleted per transaction (default: 5000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many entries would go to which file'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['before']:
+            before = parse_datetime(options['before'])
+            if before is None:
+                raise CommandError('--before must be an ISO 8601 date and time')
+            if timezone.is_naive(before):
+                before = timezone.make_aware(before)
+        else:
+            before = timezone.now() - timedelta(days=options['older_than_days'])
+
+        try:
+            counts = archive_activity(
+                before,
+                options['directory'],
+                partition=options['partition'],
+                compression=options['compression'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+            )
+        except ArchiveError as e:
+            raise CommandError(str(e))
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        for path, count in sorted(counts.items()):
+            self.stdout.write(f"📦 {verb} {count} entries to {path}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {verb} {sum(counts.values())} entries logged before {before.isoformat()}"
+        ))
+        kept = ActivityLog.objects.filter(timestamp__lt=before).count() - (
+            sum(counts.values()) if options['dry_run'] else 0
+        )
+        if kept:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Kept {kept} older entries: entries are archived only up to the last "
+                f"verify_audit_chain checkpoint and the first entry newer than the cut-off"
+            ))
@@ -0,0 +1,241 @@
+import json
+import platform
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from voting.gallery import match_gallery, match_gallery_batch
+from voting.matching import TemplateGallery, byte_histograms, classify_match
+from voting.views import python_fingerprint_match
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# AS608 character files are 512 bytes
+TEMPLATE_LENGTH = 512
+MATCH_THRESHOLD = 65.0
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def synthetic_gallery(rng, size, chunk_rows=65536):
+    """Random 512-byte templates; histograms are built in chunks and kept as uint16."""
+    templates = rng.integers(0, 256, (size, TEMPLATE_LENGTH), dtype=np.uint8)
+    histograms = np.empty((size, 256), dtype=np.uint16)
+    for start in range(0, size, chunk_rows):
+        histograms[start:start + chunk_rows] = byte_histograms(templates[start:start + chunk_rows])
+    template_ids = np.arange(1, size + 1, dtype=np.int64)
+    return TemplateGallery(templates, template_ids, template_ids.copy(), histograms=histograms)
+
+
+def add_noise(rng, templates, noise):
+    """Copy ``templates`` with a ``noise`` fraction of each row's bytes replaced at random."""
+    noisy = templates.copy()
+    mask = rng.random(noisy.shape) < noise
+    noisy[mask] = rng.integers(0, 256, int(mask.sum()), dtype=np.uint8)
+    return noisy
+
+
+class Command(BaseCommand):
+    help = 'Benchmark fingerprint matching against synthetic AS608 galleries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated gallery sizes (e.g. 1000,10000,100000,1000000)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Probes per gallery size, half genuine and half impostor (default: 200)'
+        )
+        parser.add_argument(
+            '--noise',
+            type=float,
+            default=0.1,
+            help='Fraction of bytes replaced in genuine probes (default: 0.1)'
+        )
+        parser.add_argument(
+            '--engine',
+            choices=['numpy', 'python'],
+            default=getattr(settings, 'FINGERPRINT_MATCH_ENGINE', 'numpy'),
+            help='Matcher to benchmark (default: FINGERPRINT_MATCH_ENGINE)'
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            help='Override FINGERPRINT_PREFILTER_TOP_K (0 scores the whole gallery)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Override FINGERPRINT_MATCH_WORKERS'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=0,
+            help='Also time match_gallery_batch with batches of this many probes'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=608,
+            help='Random seed, so runs of different matchers see the same data'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON results to this file instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated integers')
+        if options['queries'] < 2:
+            raise CommandError('--queries must be at least 2')
+        if not 0.0 <= options['noise'] <= 1.0:
+            raise CommandError('--noise must be between 0 and 1')
+
+        overrides = {}
+        if options['top_k'] is not None:
+            overrides['FINGERPRINT_PREFILTER_TOP_K'] = options['top_k']
+        if options['workers'] is not None:
+            overrides['FINGERPRINT_MATCH_WORKERS'] = options['workers']
+
+        with override_settings(**overrides):
+            report = {
+                'timestamp': timezone.now().isoformat(),
+                'engine': options['engine'],
+                'top_k': getattr(settings, 'FINGERPRINT_PREFILTER_TOP_K', 0),
+                'prefilter_metric': getattr(settings, 'FINGERPRINT_PREFILTER_METRIC', 'byte_hamming'),
+                'workers': getattr(settings, 'FINGERPRINT_MATCH_WORKERS', 0),
+                'noise': options['noise'],
+                'queries': options['queries'],
+                'seed': options['seed'],
+                'threshold': MATCH_THRESHOLD,
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'results': [],
+            }
+            for size in sizes:
+                self.stderr.write(f"⏱️ Benchmarking {options['engine']} matcher on {size:,} templates...", style_func=str)
+                result = self.benchmark(size, options)
+                report['results'].append(result)
+                self.stderr.write(self.style.SUCCESS(
+                    f"✅ {size:,} templates: p50 {result['latency_ms']['p50']} ms, "
+                    f"p99 {result['latency_ms']['p99']} ms, {result['throughput_qps']} queries/s, "
+                    f"FAR {result['far']:.3f}, FRR {result['frr']:.3f}"
+                ))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def benchmark(self, size, options):
+        rng = np.random.default_rng([options['seed'], size])
+        build_started = time.perf_counter()
+        gallery = synthetic_gallery(rng, size)
+        build_seconds = time.perf_counter() - build_started
+
+        genuine_count = options['queries'] // 2
+        impostor_count = options['queries'] - genuine_count
+        genuine_rows = rng.choice(size, genuine_count, replace=size < genuine_count)
+        probes = np.concatenate([
+            add_noise(rng, gallery.templates[genuine_rows], options['noise']),
+            rng.integers(0, 256, (impostor_count, TEMPLATE_LENGTH), dtype=np.uint8),
+        ])
+        expected = list(gallery.template_ids[genuine_rows]) + [None] * impostor_count
+
+        if options['engine'] == 'python':
+            # Newest first, as FingerprintTemplate's default ordering returns them
+            records = [
+                SimpleNamespace(template=gallery.templates[row].tobytes(), voter=int(gallery.template_ids[row]))
+                for row in reversed(range(size))
+            ]
+            match = lambda probe: python_fingerprint_match(probe, records)[:2]
+        else:
+            def match(probe):
+                matched, row, score = match_gallery(probe, [gallery])
+                return (int(matched.voters[row]) if matched is not None else None), round(score, 2)
+
+        # Warm up (first use of the pool, page faults on the gallery)
+        match(probes[0].tobytes())
+
+        latencies = []
+        scores = []
+        false_accepts = false_rejects = 0
+        started = time.perf_counter()
+        for probe, expected_id in zip(probes, expected):
+            query_started = time.perf_counter()
+            matched_id, score = match(probe.tobytes())
+            latencies.append(time.perf_counter() - query_started)
+            scores.append(score)
+
+            accepted = matched_id is not None and score >= MATCH_THRESHOLD
+            if expected_id is None:
+                false_accepts += accepted
+            elif not accepted or matched_id != expected_id:
+                false_rejects += 1
+        elapsed = time.perf_counter() - started
+
+        latencies_ms = np.array(latencies) * 1000
+        result = {
+            'gallery_size': size,
+            'gallery_build_seconds': round(build_seconds, 3),
+            'latency_ms': {
+                'mean': round(float(latencies_ms.mean()), 3),
+                'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+                'p90': round(float(np.percentile(latencies_ms, 90)), 3),
+                'p99': round(float(np.percentile(latencies_ms, 99)), 3),
+                'max': round(float(latencies_ms.max()), 3),
+            },
+            'throughput_qps': round(len(probes) / elapsed, 1),
+            'genuine_probes': genuine_count,
+            'impostor_probes': impostor_count,
+            'far': false_accepts / impostor_count,
+            'frr': false_rejects / genuine_count,
+            # Where genuine and impostor best scores fall relative to the threshold
+            'genuine_score': {
+                'min': float(np.min(scores[:genuine_count])),
+                'p50': float(np.median(scores[:genuine_count])),
+                'match_type': classify_match(float(np.median(scores[:genuine_count]))),
+            },
+            'impostor_score': {
+                'p50': float(np.median(scores[genuine_count:])),
+                'max': float(np.max(scores[genuine_count:])),
+            },
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+        if options['batch'] and options['engine'] == 'numpy':
+            started = time.perf_counter()
+            for start in range(0, len(probes), options['batch']):
+                match_gallery_batch(probes[start:start + options['batch']], [gallery])
+            result['batch_size'] = options['batch']
+            result['batch_throughput_qps'] = round(len(probes) / (time.perf_counter() - started), 1)
+            result['peak_rss_mb'] = peak_rss_mb()
+
+        return result
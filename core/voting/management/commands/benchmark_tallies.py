@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from voting.models import Candidate, Post
+from voting.tally import add_votes, tally_counts
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent ballots for one candidate with different TALLY_SHARDS on the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shards',
+            default='1,8',
+            help='Comma-separated shard counts to compare (default: 1,8)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Concurrent committing threads, like booths (default: 8)'
+        )
+        parser.add_argument(
+            '--ballots',
+            type=int,
+            default=400,
+            help='Ballots committed per shard count (default: 400)'
+        )
+        parser.add_argument(
+            '--hold-ms',
+            type=float,
+            default=2.0,
+            help='Time each transaction stays open after the increment, standing in for '
+                 'the rest of the ballot commit (default: 2)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON results to this file instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            shard_counts = [int(shards) for shards in options['shards'].split(',') if shards.strip()]
+        except ValueError:
+            raise CommandError('--shards must be comma-separated integers')
+        if options['threads'] < 1 or options['ballots'] < 1 or min(shard_counts, default=0) < 1:
+            raise CommandError('--shards, --threads and --ballots must be at least 1')
+
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'threads': options['threads'],
+            'ballots': options['ballots'],
+            'hold_ms': options['hold_ms'],
+            'results': [],
+        }
+        for shards in shard_counts:
+            with override_settings(TALLY_SHARDS=shards):
+                result = self.benchmark(shards, options)
+            report['results'].append(result)
+            self.stderr.write(self.style.SUCCESS(
+                f"✅ {shards} shard(s): {result['ballots_per_second']} ballots/s, "
+                f"p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms, "
+                f"{result['lock_errors']} lock errors, tally {'ok' if result['tally_correct'] else 'WRONG'}"
+            ))
+        if connection.vendor == 'sqlite':
+            report['note'] = 'SQLite locks the whole database for writes, so sharding cannot help here'
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def benchmark(self, shards, options):
+        # A throwaway post and candidate; deleting the post removes the tallies too
+        post = Post.objects.create(title=f"Tally benchmark {uuid.uuid4().hex[:8]}")
+        candidate = Candidate.objects.create(name='Front-runner', post=post)
+        self.stderr.write(
+            f"⏱️ {options['threads']} threads committing {options['ballots']} ballots "
+            f"with {shards} shard(s) ({connection.vendor})...", style_func=str
+        )
+
+        lock = threading.Lock()
+        latencies = []
+        errors = {'lock': 0, 'other': 0}
+        remaining = [options['ballots']]
+        start = threading.Barrier(options['threads'])
+        hold = options['hold_ms'] / 1000
+
+        def commit_ballots():
+            close_old_connections()
+            try:
+                start.wait()
+                while True:
+                    with lock:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                    started = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            add_votes([candidate.pk])
+                            time.sleep(hold)
+                    except OperationalError as e:
+                        with lock:
+                            errors['lock' if 'lock' in str(e).lower() else 'other'] += 1
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        try:
+            threads = [threading.Thread(target=commit_ballots) for _ in range(options['threads'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            counted = tally_counts().get(candidate.pk, 0)
+        finally:
+            post.delete()
+
+        latencies_ms = np.array(latencies or [0.0]) * 1000
+        return {
+            'shards': shards,
+            'committed': len(latencies),
+            'ballots_per_second': round(len(latencies) / elapsed, 1),
+            'latency_ms': {
+                'mean': round(float(latencies_ms.mean()), 3),
+                'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+                'p99': round(float(np.percentile(latencies_ms, 99)), 3),
+                'max': round(float(latencies_ms.max()), 3),
+            },
+            'lock_errors': errors['lock'],
+            'other_errors': errors['other'],
+            # Every committed ballot is in the summed tally
+            'tally_correct': counted == len(latencies),
+        }
@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.utils import timezone
+
+from voting.models import ScanTrigger
+from voting.triggers import claim_scan_trigger
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent station pollers claiming scan triggers from the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pollers',
+            type=int,
+            default=8,
+            help='Concurrent polling threads, one device each (default: 8)'
+        )
+        parser.add_argument(
+            '--triggers',
+            type=int,
+            default=500,
+            help='Triggers created for the pollers to claim (default: 500)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['claim', 'naive'],
+            default='claim',
+            help='claim: claim_scan_trigger; naive: read the latest unused trigger, as before leases'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON results to this file instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        if options['pollers'] < 1 or options['triggers'] < 1:
+            raise CommandError('--pollers and --triggers must be at least 1')
+
+        # A station of its own, so real stations never see the benchmark triggers
+        station = f"bench-{uuid.uuid4().hex[:12]}"
+        ScanTrigger.objects.bulk_create(
+            [ScanTrigger(station=station, action='authenticate') for _ in range(options['triggers'])],
+            batch_size=500
+        )
+        self.stderr.write(
+            f"⏱️ {options['pollers']} pollers claiming {options['triggers']} triggers "
+            f"({options['mode']}, {connection.vendor})...", style_func=str
+        )
+
+        try:
+            report = self.benchmark(station, options)
+        finally:
+            ScanTrigger.objects.filter(station=station).delete()
+
+        self.stderr.write(self.style.SUCCESS(
+            f"✅ {report['claims_per_second']} claims/s, {report['duplicate_claims']} duplicate claims, "
+            f"p50 {report['latency_ms']['p50']} ms, p99 {report['latency_ms']['p99']} ms, "
+            f"{report['lock_errors']} lock errors"
+        ))
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def benchmark(self, station, options):
+        lock = threading.Lock()
+        claims = []
+        latencies = []
+        errors = Counter()
+        start = threading.Barrier(options['pollers'])
+
+        def poll(device):
+            close_old_connections()
+            try:
+                start.wait()
+                empty_polls = 0
+                while empty_polls < 3:
+                    started = time.perf_counter()
+                    try:
+                        if options['mode'] == 'claim':
+                            trigger_id = getattr(claim_scan_trigger(station, device), 'id', None)
+                        else:
+                            trigger_id = (
+                                ScanTrigger.objects.filter(station=station, used=False)
+                                .order_by('-created_at').values_list('id', flat=True).first()
+                            )
+                        if trigger_id is not None:
+                            # The station uses the trigger, as mark_trigger_used does
+                            ScanTrigger.objects.filter(pk=trigger_id).update(used=True)
+                    except OperationalError as e:
+                        with lock:
+                            errors['lock' if 'lock' in str(e).lower() else 'other'] += 1
+                        continue
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        if trigger_id is not None:
+                            claims.append(trigger_id)
+                    empty_polls = 0 if trigger_id is not None else empty_polls + 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=poll, args=(f"device-{number}",)) for number in range(options['pollers'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies_ms = np.array(latencies or [0.0]) * 1000
+        handed_out = Counter(claims)
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'mode': options['mode'],
+            'pollers': options['pollers'],
+            'triggers': options['triggers'],
+            'claims': len(claims),
+            'unique_triggers_claimed': len(handed_out),
+            # Triggers handed to more than one poller, which leases prevent
+            'duplicate_claims': len(claims) - len(handed_out),
+            'unclaimed_triggers': options['triggers'] - len(handed_out),
+            'claims_per_second': round(len(claims) / elapsed, 1),
+            'latency_ms': {
+                'mean': round(float(latencies_ms.mean()), 3),
+                'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+                'p99': round(float(np.percentile(latencies_ms, 99)), 3),
+                'max': round(float(latencies_ms.max()), 3),
+            },
+            'lock_errors': errors['lock'],
+            'other_errors': errors['other'],
+        }
@@ -0,0 +1,220 @@
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from voting import dedup
+from voting.matching import classify_match
+from voting.models import FingerprintTemplate
+
+FIELDS = ['template_a', 'voter_a', 'template_b', 'voter_b', 'score', 'match_type']
+
+
+class CsvPairWriter:
+    def __init__(self, stream):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(FIELDS)
+
+    def write(self, pair):
+        self.writer.writerow([pair[field] for field in FIELDS])
+
+    def close(self):
+        pass
+
+
+class JsonPairWriter:
+    """Writes a JSON array one pair at a time instead of building it in memory."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+        self.stream.write('[')
+
+    def write(self, pair):
+        self.stream.write(('\n  ' if self.count == 0 else ',\n  ') + json.dumps(pair))
+        self.count += 1
+
+    def close(self):
+        self.stream.write('\n]\n' if self.count else ']\n')
+
+
+class Command(BaseCommand):
+    help = 'Report every pair of enrolled fingerprint templates that match each other'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write the pairs to, "-" for stdout (default)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='Output format (default: from the --output extension, else csv)'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=65.0,
+            help='Report pairs scoring at least this much (default: 65.0, as match_template)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes scoring blocks (default: one per CPU)'
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=512,
+            help='Templates per side of a scored block (default: 512)'
+        )
+        parser.add_argument(
+            '--exclude-same-voter',
+            action='store_true',
+            help='Skip pairs of templates enrolled to the same voter'
+        )
+        parser.add_argument(
+            '--progress-interval',
+            type=float,
+            default=5.0,
+            help='Seconds between progress lines on stderr'
+        )
+
+    def handle(self, *args, **options):
+        if options['block_size'] < 1:
+            raise CommandError('--block-size must be at least 1')
+
+        output_format = options['format']
+        if output_format is None:
+            output_format = 'json' if options['output'].endswith('.json') else 'csv'
+
+        # Progress goes to stderr when the pairs are written to stdout
+        self.log_stream = self.stderr if options['output'] == '-' else self.stdout
+
+        groups = self.load_templates()
+        total_templates = sum(len(group[0]) for group in groups.values())
+        self.log(f"🔍 Checking {total_templates} templates ({len(groups)} template sizes)")
+
+        stream = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='')
+        writer = (JsonPairWriter if output_format == 'json' else CsvPairWriter)(stream)
+        workdir = tempfile.mkdtemp(prefix='dedup_report_')
+        started = time.monotonic()
+        try:
+            found, compared = 0, 0
+            for length, (template_ids, voter_ids, templates) in sorted(groups.items()):
+                path = os.path.join(workdir, f'templates_{length}.npy')
+                np.save(path, templates)
+                del templates
+                group_found, group_compared = self.scan_group(
+                    path, template_ids, voter_ids, writer, options, started, compared
+                )
+                found += group_found
+                compared += group_compared
+        finally:
+            writer.close()
+            if stream is not sys.stdout:
+                stream.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        elapsed = time.monotonic() - started
+        rate = compared / elapsed if elapsed else 0
+        self.log(self.style.SUCCESS(
+            f"✅ Compared {compared:,} pairs in {elapsed:.1f}s ({rate:,.0f} pairs/s), "
+            f"{found} pairs at or above {options['threshold']}"
+        ))
+
+    def log(self, message):
+        self.log_stream.write(message, style_func=str)
+
+    def load_templates(self):
+        """Group templates by length: {length: (ids, voter ids, (N, L) uint8 matrix)}."""
+        rows = {}
+        queryset = FingerprintTemplate.objects.order_by('id').values_list(
+            'id', 'voter__voter_id', 'template'
+        )
+        for template_id, voter_id, template in queryset.iterator(chunk_size=2000):
+            template = bytes(template)
+            if not template:
+                continue
+            group = rows.setdefault(len(template), ([], [], []))
+            group[0].append(template_id)
+            group[1].append(voter_id)
+            group[2].append(template)
+
+        return {
+            length: (
+                template_ids,
+                voter_ids,
+                np.frombuffer(b''.join(templates), dtype=np.uint8).reshape(len(templates), length),
+            )
+            for length, (template_ids, voter_ids, templates) in rows.items()
+        }
+
+    def scan_group(self, path, template_ids, voter_ids, writer, options, started, compared_before):
+        threshold = options['threshold']
+        blocks = dedup.block_ranges(len(template_ids), options['block_size'])
+        total_pairs = len(template_ids) * (len(template_ids) - 1) // 2
+        found = compared = 0
+        last_report = time.monotonic()
+
+        def report(block_compared, matches):
+            nonlocal found, compared, last_report
+            compared += block_compared
+            for row, other_row, score in matches:
+                if options['exclude_same_voter'] and voter_ids[row] and voter_ids[row] == voter_ids[other_row]:
+                    continue
+                writer.write({
+                    'template_a': template_ids[row],
+                    'voter_a': voter_ids[row] or '',
+                    'template_b': template_ids[other_row],
+                    'voter_b': voter_ids[other_row] or '',
+                    'score': score,
+                    'match_type': classify_match(score),
+                })
+                found += 1
+
+            now = time.monotonic()
+            if now - last_report >= options['progress_interval']:
+                last_report = now
+                elapsed = now - started
+                rate = (compared_before + compared) / elapsed if elapsed else 0
+                self.log(
+                    f"⏳ {compared / max(total_pairs, 1):.1%} of "
+                    f"{len(template_ids)}-template group: {compared:,}/{total_pairs:,} pairs, "
+                    f"{rate:,.0f} pairs/s, {found} found"
+                )
+
+        if options['workers'] <= 1:
+            dedup.init_worker(path)
+            for block in blocks:
+                report(*dedup.scan_block(block, threshold))
+            return found, compared
+
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=dedup.init_worker,
+            initargs=(path,),
+        ) as executor:
+            # Keep a bounded number of blocks in flight so results are
+            # written as they arrive rather than piling up
+            in_flight = set()
+            for block in blocks:
+                if len(in_flight) >= options['workers'] * 4:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(*future.result())
+                in_flight.add(executor.submit(dedup.scan_block, block, threshold))
+            for future in in_flight:
+                report(*future.result())
+        return found, compared
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.export import EXPORTS, FORMATS, export_chunk_size, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Stream votes, tallies, voters or the activity log as CSV or JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS), help='What to export')
+        parser.add_argument(
+            '--format',
+            choices=sorted(FORMATS),
+            default='csv',
+            help='Output format (default: csv)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write to this file instead of stdout'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export_chunk_size(),
+            help='Rows fetched per database round trip (default: EXPORT_CHUNK_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        stream = export_stream(options['name'], options['format'], options['chunk_size'])
+        if not options['output']:
+            for piece in stream:
+                self.stdout.write(piece, ending='')
+            return
+
+        written = 0
+        with open(options['output'], 'w', encoding='utf-8', newline='') as handle:
+            for piece in stream:
+                handle.write(piece)
+                written += len(piece)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Exported {options['name']} as {options['format']} to {options['output']} ({written} characters)"
+        ))
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.gallery_file import (
+    VOTER_ID_LENGTH, GalleryFile, append_gallery_file, write_gallery_file,
+)
+from voting.models import FingerprintTemplate
+
+
+class Command(BaseCommand):
+    help = 'Export enrolled fingerprint templates to the memory-mapped gallery file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            help='Gallery file to write (defaults to FINGERPRINT_GALLERY_FILE)'
+        )
+        parser.add_argument(
+            '--append',
+            action='store_true',
+            help='Only add templates enrolled since the file was last written'
+        )
+        parser.add_argument(
+            '--template-length',
+            type=int,
+            default=512,
+            help='Template size in bytes; templates of other sizes are skipped (default: 512)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Templates read from the database per query'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or getattr(settings, 'FINGERPRINT_GALLERY_FILE', None)
+        if not path:
+            raise CommandError('No path given and FINGERPRINT_GALLERY_FILE is not set')
+
+        length = options['template_length']
+        queryset = FingerprintTemplate.objects.order_by('id')
+
+        if options['append'] and os.path.exists(path):
+            existing = GalleryFile(path)
+            if existing.template_length != length:
+                raise CommandError(
+                    f'{path} holds {existing.template_length}-byte templates, not {length}'
+                )
+            queryset = queryset.filter(id__gt=existing.max_template_id)
+            start_count = len(existing)
+            del existing
+            target = path
+        else:
+            # Build the new file next to the old one and swap it in at the end,
+            # so processes opening the gallery never see a partial export
+            target = f'{path}.new'
+            capacity = queryset.count() * 5 // 4
+            write_gallery_file(target, np.zeros((0, length), dtype=np.uint8), [], [], [], [], capacity=capacity)
+            start_count = 0
+
+        written = skipped = 0
+        batch = []
+        rows = queryset.values_list('id', 'voter_id', 'voter__voter_id', 'template', 'digest')
+        for row in rows.iterator(chunk_size=options['batch_size']):
+            if len(row[3]) != length:
+                skipped += 1
+                continue
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                written += self._append(target, batch, length)
+                batch = []
+        if batch:
+            written += self._append(target, batch, length)
+        if target != path:
+            os.replace(target, path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {path}: {start_count + written} templates ({written} added, {skipped} skipped)'
+        ))
+
+    def _append(self, path, batch, length):
+        templates = np.frombuffer(
+            b''.join(bytes(row[3]) for row in batch), dtype=np.uint8
+        ).reshape(len(batch), length)
+        append_gallery_file(
+            path,
+            templates,
+            np.array([row[0] for row in batch], dtype=np.int64),
+            np.array([-1 if row[1] is None else row[1] for row in batch], dtype=np.int64),
+            np.array([(row[2] or '').encode()[:VOTER_ID_LENGTH] for row in batch], dtype=f'S{VOTER_ID_LENGTH}'),
+            np.array([row[4] for row in batch], dtype=np.int64),
+        )
+        return len(batch)
@@ -0,0 +1,93 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.retention import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete (or archive and delete) used scan triggers and temporary templates past their retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trigger-hours',
+            type=float,
+            default=getattr(settings, 'SCAN_TRIGGER_RETENTION_HOURS', 24),
+            help='Age in hours after which used scan triggers are purged (default: SCAN_TRIGGER_RETENTION_HOURS)'
+        )
+        parser.add_argument(
+            '--template-hours',
+            type=float,
+            default=getattr(settings, 'TEMPORARY_TEMPLATE_RETENTION_HOURS', 24),
+            help='Age in hours after which templates without a voter are purged '
+                 '(default: TEMPORARY_TEMPLATE_RETENTION_HOURS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'RETENTION_BATCH_SIZE', 500),
+            help='Rows deleted per transaction (default: RETENTION_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between batches, to leave room for station requests'
+        )
+        parser.add_argument(
+            '--archive',
+            help='Append purged rows to this JSON lines file first (restore with loaddata)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be purged'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep purging every --interval seconds until interrupted'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=getattr(settings, 'RETENTION_PURGE_INTERVAL', None),
+            help='Seconds between purges with --loop (default: RETENTION_PURGE_INTERVAL)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['trigger_hours'] < 0 or options['template_hours'] < 0:
+            raise CommandError('Retention periods must not be negative')
+        if options['loop'] and not (options['interval'] and options['interval'] > 0):
+            raise CommandError('--loop needs --interval or RETENTION_PURGE_INTERVAL')
+
+        while True:
+            self._purge(options)
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def _purge(self, options):
+        purge = lambda archive: purge_expired(
+            batch_size=options['batch_size'],
+            archive=archive,
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+            trigger_hours=options['trigger_hours'],
+            template_hours=options['template_hours'],
+        )
+        if options['archive'] and not options['dry_run']:
+            with open(options['archive'], 'a') as archive:
+                purged = purge(archive)
+        else:
+            purged = purge(None)
+
+        verb = 'Would purge' if options['dry_run'] else 'Purged'
+        for name, count in purged.items():
+            self.stdout.write(f"🧹 {verb} {count} {name.replace('_', ' ')}")
+        if options['archive'] and not options['dry_run']:
+            self.stdout.write(f"📦 Archived to {options['archive']}")
+        self.stdout.write(self.style.SUCCESS(f"✅ {verb} {sum(purged.values())} rows"))
@@ -0,0 +1,44 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from voting.audit_archive import ArchiveError, read_archive
+
+
+def parse_time(value, option):
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f'{option} must be an ISO 8601 date and time')
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class Command(BaseCommand):
+    help = 'Print archived ActivityLog entries of a time range as JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            default=str(getattr(settings, 'AUDIT_ARCHIVE_DIR', 'audit_archive')),
+            help='Directory of the archive files (default: AUDIT_ARCHIVE_DIR)'
+        )
+        parser.add_argument('--start', help='First time to include (ISO 8601)')
+        parser.add_argument('--end', help='Time to stop at, exclusive (ISO 8601)')
+        parser.add_argument('--event-type', help='Only entries of this event type (e.g. match)')
+        parser.add_argument('--voter', help='Only entries of the voter with this voter ID')
+
+    def handle(self, *args, **options):
+        start = parse_time(options['start'], '--start')
+        end = parse_time(options['end'], '--end')
+        count = 0
+        try:
+            for record in read_archive(options['directory'], start, end, options['event_type'], options['voter']):
+                self.stdout.write(json.dumps(record))
+                count += 1
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        self.stderr.write(self.style.SUCCESS(f"✅ {count} archived entries"))
@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import json
+import os
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+# Seconds to wait before reconnecting after the server closed the connection
+RECONNECT_DELAY = 2
+
+
+class Command(BaseCommand):
+    help = 'Reference client for the ESP32 station WebSocket protocol (voting/websocket.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='ws://127.0.0.1:8000/ws/station/',
+            help='Station WebSocket URL (the server must run under ASGI)'
+        )
+        parser.add_argument(
+            '--station',
+            default='',
+            help='Station id whose triggers this client receives'
+        )
+        parser.add_argument(
+            '--device',
+            default='',
+            help='Device id the triggers are claimed for (default: the client address)'
+        )
+        parser.add_argument(
+            '--template-file',
+            help='Raw template bytes to send for each trigger (default: random 512 bytes)'
+        )
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=1,
+            help='Number of triggers to handle before exiting, 0 for no limit'
+        )
+
+    def handle(self, *args, **options):
+        if websockets is None:
+            raise CommandError('The station client needs the "websockets" package (pip install websockets)')
+
+        if options['template_file']:
+            with open(options['template_file'], 'rb') as handle:
+                template = handle.read()
+        else:
+            template = os.urandom(512)
+
+        url = options['url']
+        query = {key: options[key] for key in ('station', 'device') if options[key]}
+        if query:
+            url += ('&' if '?' in url else '?') + urlencode(query)
+        asyncio.run(self.run(url, template, options['count']))
+
+    async def run(self, url, template, count):
+        template_b64 = base64.b64encode(template).decode()
+        self.handled = 0
+        while True:
+            try:
+                await self.session(url, template_b64, count)
+                break
+            except websockets.ConnectionClosedError as e:
+                # The server closes with 1011 when it can no longer push triggers
+                self.stdout.write(f"⚠️ Connection closed ({e}), reconnecting in {RECONNECT_DELAY}s...")
+                await asyncio.sleep(RECONNECT_DELAY)
+        self.stdout.write(self.style.SUCCESS(f"✅ Handled {self.handled} trigger(s)"))
+
+    async def session(self, url, template_b64, count):
+        """Handle triggers on one connection until ``count`` have been handled in all (0: forever)."""
+        async with websockets.connect(url) as socket:
+            self.stdout.write(f"📡 Connected to {url}, waiting for scan triggers...")
+            async for raw in socket:
+                message = json.loads(raw)
+                if message.get('type') != 'trigger':
+                    self.stdout.write(f"⚠️ Unexpected message: {message}")
+                    continue
+
+                self.stdout.write(f"⚡ Trigger received: {message}")
+                # Same steps the sketch performs over HTTP, on one connection
+                if message['action'] == 'register':
+                    await socket.send(json.dumps({
+                        'type': 'upload', 'voter_id': message['voter_id'], 'template': template_b64,
+                    }))
+                    self.stdout.write(f"📥 {await self.reply(socket, 'upload_result')}")
+                    await socket.send(json.dumps({'type': 'ack', 'id': message['id']}))
+                    self.stdout.write(f"✅ {await self.reply(socket, 'ack_result')}")
+                else:
+                    await socket.send(json.dumps({
+                        'type': 'match', 'trigger_id': message['id'], 'template': template_b64,
+                    }))
+                    self.stdout.write(f"🔍 {await self.reply(socket, 'match_result')}")
+
+                self.handled += 1
+                if count and self.handled >= count:
+                    break
+
+    async def reply(self, socket, reply_type):
+        """Wait for the reply to the last request, skipping trigger pushes in between."""
+        while True:
+            message = json.loads(await socket.recv())
+            if message.get('type') == reply_type:
+                return message
+            if message.get('type') == 'error':
+                raise CommandError(message.get('message'))
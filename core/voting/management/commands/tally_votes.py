@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.models import Candidate
+from voting.tally import rebuild_tallies, tally_mismatches
+
+
+class Command(BaseCommand):
+    help = 'Verify the live CandidateTally counters against the Vote table, or rebuild them from it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report candidates whose tally differs from their counted votes (exit status 1 if any)'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = tally_mismatches() if options['verify'] else rebuild_tallies()
+        names = dict(Candidate.objects.filter(pk__in=[pk for pk, _, _ in mismatches]).values_list('pk', 'name'))
+        for candidate_id, tally, counted in mismatches:
+            self.stdout.write(
+                f"⚠️ {names.get(candidate_id, candidate_id)} (id {candidate_id}): "
+                f"tally {'missing' if tally is None else tally}, counted {counted}"
+            )
+
+        if options['verify']:
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} tallies do not match the votes')
+            self.stdout.write(self.style.SUCCESS('✅ All tallies match the votes'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Tallies rebuilt, {len(mismatches)} corrected"))
@@ -1,8 +1,10 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from voting.models import Voter, Post, Candidate, Vote, VotingSession
-from django.db import transaction
+from django.db import connection, transaction
 from django.db import models
+from django.test.utils import CaptureQueriesContext
+from voting.ballot import AlreadyVotedError, BALLOT_COMMIT_QUERIES, ballot_cache, commit_ballot
 
 
 class Command(BaseCommand):
@@ -104,28 +106,41 @@ class Command(BaseCommand):
         self.stdout.write(f'Voter ID: {voter1.voter_id}, Fingerprint: {voter1.fingerprint_id}')
         self.stdout.write(f'Has voted before: {voter1.has_voted}')
         
-        # Simulate vote
-        with transaction.atomic():
-            if not voter1.has_voted:
-                # Create a vote
-                candidate = candidates.first()
-                Vote.objects.create(voter=voter1, candidate=candidate, post=candidate.post)
-                voter1.has_voted = True
-                voter1.last_vote_attempt = timezone.now()
-                voter1.save()
-                self.stdout.write(self.style.SUCCESS('✓ First vote successful'))
+        # Vote for the first candidate of every post, as the voting page does
+        if not voter1.has_voted:
+            ballot = [{'post': post.id, 'candidate': post.candidates.first().id} for post in posts]
+            # Loaded once per process, as the ballot page would have done
+            ballot_cache.get()
+            with CaptureQueriesContext(connection) as queries:
+                _, created, rejected = commit_ballot(voter1, ballot)
+            self.stdout.write(self.style.SUCCESS(f'✓ First vote successful ({len(created)} votes)'))
+            # Transaction control (BEGIN/COMMIT/SAVEPOINT) depends on the backend; count the real work
+            ballot_queries = [
+                q for q in queries.captured_queries
+                if not q['sql'].upper().startswith(('BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE SAVEPOINT'))
+            ]
+            if len(ballot_queries) <= BALLOT_COMMIT_QUERIES and not rejected:
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ {len(ballot)}-post ballot committed in {len(ballot_queries)} queries'
+                ))
             else:
-                self.stdout.write(self.style.WARNING('⚠ Voter has already voted'))
+                raise CommandError(
+                    f'✗ {len(ballot)}-post ballot took {len(ballot_queries)} queries '
+                    f'(expected {BALLOT_COMMIT_QUERIES}), rejected: {rejected}'
+                )
+        else:
+            self.stdout.write(self.style.WARNING('⚠ Voter has already voted'))
         
         # Test 2: Second vote attempt should fail
         self.stdout.write(f'\nTest 2: Second vote attempt for {voter1.name}')
         voter1.refresh_from_db()
         self.stdout.write(f'Has voted after first vote: {voter1.has_voted}')
         
-        if voter1.has_voted:
-            self.stdout.write(self.style.SUCCESS('✓ Second vote correctly prevented'))
-        else:
+        try:
+            commit_ballot(voter1, [{'post': candidates.first().post_id, 'candidate': candidates.first().id}])
             self.stdout.write(self.style.ERROR('✗ Second vote should have been prevented'))
+        except AlreadyVotedError:
+            self.stdout.write(self.style.SUCCESS('✓ Second vote correctly prevented'))
         
         # Test 3: Different voter should be able to vote
         if voters.count() > 1:
@@ -137,10 +152,7 @@ class Command(BaseCommand):
             if not voter2.has_voted:
                 # Create a vote
                 candidate = candidates.last()
-                Vote.objects.create(voter=voter2, candidate=candidate, post=candidate.post)
-                voter2.has_voted = True
-                voter2.last_vote_attempt = timezone.now()
-                voter2.save()
+                commit_ballot(voter2, [{'post': candidate.post_id, 'candidate': candidate.id}])
                 self.stdout.write(self.style.SUCCESS('✓ Different voter vote successful'))
             else:
                 self.stdout.write(self.style.WARNING('⚠ Different voter has already voted'))
@@ -148,11 +160,16 @@ class Command(BaseCommand):
         # Test 4: Check vote counts
         self.stdout.write(f'\nTest 4: Vote counts verification')
         total_votes = Vote.objects.count()
+        voters_with_votes = Vote.objects.values('voter').distinct().count()
         voters_voted = Voter.objects.filter(has_voted=True).count()
         self.stdout.write(f'Total votes in database: {total_votes}')
         self.stdout.write(f'Voters marked as voted: {voters_voted}')
         
-        if total_votes == voters_voted:
+        # Every voter with votes is marked, and nobody voted twice for a post
+        duplicate_votes = Vote.objects.values('voter', 'post').annotate(
+            count=models.Count('id')
+        ).filter(count__gt=1)
+        if voters_with_votes == voters_voted and not duplicate_votes.exists():
             self.stdout.write(self.style.SUCCESS('✓ Vote counts match'))
         else:
             self.stdout.write(self.style.ERROR('✗ Vote counts mismatch'))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.chain import CHAINS, verify_chain
+
+
+class Command(BaseCommand):
+    help = 'Verify the hash chains of the votes and the activity log since the last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chain',
+            choices=sorted(CHAINS),
+            help='Only verify this chain (default: all)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Verify every row still in the table instead of starting at the last checkpoint'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched per database round trip (default: 2000)'
+        )
+        parser.add_argument(
+            '--no-checkpoint',
+            action='store_true',
+            help="Don't store a checkpoint after a successful verification"
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        chains = [options['chain']] if options['chain'] else sorted(CHAINS)
+
+        broken = 0
+        for chain in chains:
+            report = verify_chain(
+                chain,
+                full=options['full'],
+                chunk_size=options['chunk_size'],
+                save_checkpoint=not options['no_checkpoint'],
+            )
+            self.stdout.write(
+                f"🔗 {chain}: {report.rows} rows verified after #{report.start_seq}, "
+                f"up to #{report.last_seq} ({report.last_hash})"
+            )
+            for seq, expected, stored in report.breaks:
+                if seq is None:
+                    self.stdout.write(self.style.ERROR(
+                        f"❌ {chain}: chain ends at {stored} but its head is {expected} (rows removed from the end)"
+                    ))
+                elif stored is None:
+                    self.stdout.write(self.style.ERROR(f"❌ {chain} #{seq}: checkpointed row is missing"))
+                else:
+                    self.stdout.write(self.style.ERROR(
+                        f"❌ {chain} #{seq}: expected hash {expected}, stored {stored or '(none)'}"
+                    ))
+            if report.checkpoint:
+                self.stdout.write(f"📌 {chain}: checkpoint stored at #{report.checkpoint.last_seq}")
+            broken += len(report.breaks)
+
+        if broken:
+            raise CommandError(f'{broken} broken links found; no checkpoint stored for the affected chains')
+        self.stdout.write(self.style.SUCCESS(f"✅ {', '.join(chains)} chain(s) intact"))
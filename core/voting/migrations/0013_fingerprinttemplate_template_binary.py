@@ -0,0 +1,56 @@
+from django.db import migrations, models
+
+
+def hex_to_binary(apps, schema_editor):
+    FingerprintTemplate = apps.get_model('voting', 'FingerprintTemplate')
+    batch = []
+    for template in FingerprintTemplate.objects.only('id', 'template_hex').iterator(chunk_size=500):
+        try:
+            template.template = bytes.fromhex(template.template_hex)
+        except ValueError:
+            template.template = b''
+        batch.append(template)
+        if len(batch) >= 500:
+            FingerprintTemplate.objects.bulk_update(batch, ['template'])
+            batch = []
+    if batch:
+        FingerprintTemplate.objects.bulk_update(batch, ['template'])
+
+
+def binary_to_hex(apps, schema_editor):
+    FingerprintTemplate = apps.get_model('voting', 'FingerprintTemplate')
+    batch = []
+    for template in FingerprintTemplate.objects.only('id', 'template').iterator(chunk_size=500):
+        template.template_hex = bytes(template.template).hex()
+        batch.append(template)
+        if len(batch) >= 500:
+            FingerprintTemplate.objects.bulk_update(batch, ['template_hex'])
+            batch = []
+    if batch:
+        FingerprintTemplate.objects.bulk_update(batch, ['template_hex'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0012_remove_scantrigger_voting_scan_is_used_37ad9e_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fingerprinttemplate',
+            name='template',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='fingerprinttemplate',
+            name='template_hex',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(hex_to_binary, binary_to_hex),
+        migrations.RemoveField(
+            model_name='fingerprinttemplate',
+            name='template_hex',
+        ),
+    ]
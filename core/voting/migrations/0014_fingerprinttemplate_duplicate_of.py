@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0013_fingerprinttemplate_template_binary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fingerprinttemplate',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicate_templates', to='voting.voter'),
+        ),
+        migrations.AddField(
+            model_name='fingerprinttemplate',
+            name='duplicate_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
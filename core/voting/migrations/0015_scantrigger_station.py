@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0014_fingerprinttemplate_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scantrigger',
+            name='station',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='scantrigger',
+            index=models.Index(fields=['station', 'used', 'created_at'], name='voting_scan_station_29925e_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_votes(apps, schema_editor):
+    Candidate = apps.get_model('voting', 'Candidate')
+    CandidateTally = apps.get_model('voting', 'CandidateTally')
+    CandidateTally.objects.bulk_create(
+        [CandidateTally(candidate_id=pk, votes=votes)
+         for pk, votes in Candidate.objects.annotate(votes=Count('vote')).values_list('pk', 'votes')],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0016_scantrigger_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateTally',
+            fields=[
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='voting.candidate')),
+                ('votes', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing_votes, migrations.RunPython.noop),
+    ]
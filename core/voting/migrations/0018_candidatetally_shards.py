@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_votes(apps, schema_editor):
+    # The tallies are derived data: recount them into shard 0
+    Candidate = apps.get_model('voting', 'Candidate')
+    CandidateTally = apps.get_model('voting', 'CandidateTally')
+    CandidateTally.objects.bulk_create(
+        [CandidateTally(candidate_id=pk, shard=0, votes=votes)
+         for pk, votes in Candidate.objects.annotate(votes=Count('vote')).values_list('pk', 'votes')],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0017_candidatetally'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='CandidateTally',
+        ),
+        migrations.CreateModel(
+            name='CandidateTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='voting.candidate')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('candidate', 'shard'), name='unique_candidate_tally_shard')],
+            },
+        ),
+        migrations.RunPython(count_existing_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# (pattern, event_type, outcome) for the messages views have logged so far.
+# Named groups: pk (Voter primary key), voter_id (Voter.voter_id), score, station.
+LOG_PATTERNS = [
+    (r'Successful vote by voter_id=(?P<pk>\d+)', 'vote', 'success'),
+    (r'Vote cast successfully by voter: .* \(ID: (?P<voter_id>[^)]+)\)', 'vote', 'success'),
+    (r'Double voting attempt by voter_id=(?P<pk>\d+)', 'vote', 'already_voted'),
+    (r'Vote attempt by already voted voter: .* \(ID: (?P<voter_id>[^)]+)\)', 'vote', 'already_voted'),
+    (r'Vote attempt without authentication', 'vote', 'rejected'),
+    (r'Vote attempt outside session by voter_id=(?P<pk>\d+)', 'vote', 'rejected'),
+    (r'Vote attempt by non-existent voter', 'vote', 'rejected'),
+    (r'Invalid vote data by voter_id=(?P<pk>\d+)', 'vote', 'rejected'),
+    (r'Invalid JSON in vote by voter_id=(?P<pk>\d+)', 'vote', 'rejected'),
+    (r'Vote error for voter_id=(?P<pk>\d+)', 'vote', 'error'),
+    (r'Vote casting error', 'vote', 'error'),
+    (r'Authentication attempt by already voted voter_id=(?P<pk>\d+)', 'authentication', 'already_voted'),
+    (r'Authentication attempt by already voted voter: .* \(ID: (?P<voter_id>[^)]+)\)', 'authentication', 'already_voted'),
+    (r'Authentication success for voter_id=(?P<pk>\d+)', 'authentication', 'success'),
+    (r'Authentication attempt with invalid fingerprint_id', 'authentication', 'failure'),
+    (r'Fingerprint authentication successful: .* \(ID: (?P<voter_id>[^)]+)\) - Score: (?P<score>[\d.]+)',
+     'authentication', 'success'),
+    (r'Fingerprint authentication failed - Best score: (?P<score>[\d.]+)', 'authentication', 'failure'),
+    (r'Fingerprint authentication error', 'authentication', 'error'),
+    (r'Fingerprint match successful: .* \(ID: (?P<voter_id>[^)]+)\) - Score: (?P<score>[\d.]+)', 'match', 'success'),
+    (r'Fingerprint match failed - Best score: (?P<score>[\d.]+)', 'match', 'failure'),
+    (r'Fingerprint (batch )?matching error', 'match', 'error'),
+    (r'Fingerprint verification attempt by already voted voter: .* \(ID: (?P<voter_id>[^)]+)\)',
+     'verification', 'already_voted'),
+    (r'Fingerprint verification successful for voter: .* \(ID: (?P<voter_id>[^)]+)\)', 'verification', 'success'),
+    (r'Fingerprint verification failed', 'verification', 'failure'),
+    (r'Fingerprint verification error', 'verification', 'error'),
+    (r'Fingerprint template for voter (?P<voter_id>\S+) flagged as possible duplicate .* - Score: (?P<score>[\d.]+)',
+     'enrollment', 'duplicate'),
+    (r'Fingerprint template created for voter (?P<voter_id>\S+)', 'enrollment', 'success'),
+    (r'Fingerprint enrollment( for voter (?P<voter_id>\S+))? rejected: .* - Score: (?P<score>[\d.]+)',
+     'enrollment', 'duplicate'),
+    (r'Scan trigger created for voter ID (?P<voter_id>\S+) \(\w+\)( at station (?P<station>.+))?', 'scan_trigger', 'success'),
+]
+
+
+def parse_action(action):
+    """(event_type, outcome, groups) for a logged message, or None."""
+    for pattern, event_type, outcome in LOG_PATTERNS:
+        match = re.match(pattern, action)
+        if match:
+            return event_type, outcome, match.groupdict()
+    return None
+
+
+def backfill_structured_fields(apps, schema_editor):
+    ActivityLog = apps.get_model('voting', 'ActivityLog')
+    Voter = apps.get_model('voting', 'Voter')
+    voter_pks = dict(Voter.objects.values_list('voter_id', 'pk'))
+    existing_pks = set(voter_pks.values())
+
+    batch = []
+    for log in ActivityLog.objects.only('id', 'action').iterator(chunk_size=2000):
+        parsed = parse_action(log.action)
+        if parsed is None:
+            continue
+        log.event_type, log.outcome, groups = parsed
+        pk = int(groups['pk']) if groups.get('pk') else voter_pks.get(groups.get('voter_id'))
+        # Messages may name voters that have since been deleted
+        log.voter_id = pk if pk in existing_pks else None
+        log.score = float(groups['score'].rstrip('.')) if groups.get('score') else None
+        log.station = (groups.get('station') or '')[:50]
+        batch.append(log)
+        if len(batch) >= 2000:
+            ActivityLog.objects.bulk_update(batch, ['event_type', 'outcome', 'voter', 'score', 'station'])
+            batch = []
+    if batch:
+        ActivityLog.objects.bulk_update(batch, ['event_type', 'outcome', 'voter', 'score', 'station'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0019_activitylog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='event_type',
+            field=models.CharField(choices=[('vote', 'Vote'), ('authentication', 'Authentication'), ('match', 'Fingerprint match'), ('verification', 'Fingerprint verification'), ('enrollment', 'Fingerprint enrollment'), ('scan_trigger', 'Scan trigger'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='outcome',
+            field=models.CharField(blank=True, choices=[('success', 'Success'), ('failure', 'Failure'), ('already_voted', 'Already Voted'), ('duplicate', 'Duplicate'), ('rejected', 'Rejected'), ('error', 'Error')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='station',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='voter',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_logs', to='voting.voter'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['event_type', 'timestamp'], name='voting_acti_event_t_1c1bed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['voter', 'timestamp'], name='voting_acti_voter_i_1907f3_idx'),
+        ),
+        migrations.RunPython(backfill_structured_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:13
+
+import hashlib
+import json
+from datetime import timezone as dt_timezone
+
+import django.utils.timezone
+from django.db import migrations, models
+
+GENESIS = '0' * 64
+
+# Same fields and hash as voting/chain.py at the time of this migration
+CHAINS = {
+    'vote': ('Vote', ('voter_id', 'post_id', 'candidate_id', 'timestamp')),
+    'activity': ('ActivityLog', ('timestamp', 'action', 'event_type', 'outcome', 'voter_id', 'station', 'score')),
+}
+
+
+def link_hash(previous, values):
+    values = [
+        value.astimezone(dt_timezone.utc).isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ]
+    content = json.dumps(values, separators=(',', ':'))
+    return hashlib.sha256(f"{previous}\n{content}".encode()).hexdigest()
+
+
+def chain_existing_rows(apps, schema_editor):
+    ChainHead = apps.get_model('voting', 'ChainHead')
+    for chain, (model_name, fields) in CHAINS.items():
+        model = apps.get_model('voting', model_name)
+        previous = GENESIS
+        batch = []
+        for obj in model.objects.order_by('pk').iterator(chunk_size=2000):
+            previous = obj.chain_hash = link_hash(previous, [getattr(obj, field) for field in fields])
+            batch.append(obj)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['chain_hash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['chain_hash'])
+        ChainHead.objects.create(chain=chain, last_hash=previous, base_hash=GENESIS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0020_activitylog_structured'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainHead',
+            fields=[
+                ('chain', models.CharField(choices=[('vote', 'Votes'), ('activity', 'Activity log')], max_length=20, primary_key=True, serialize=False)),
+                ('last_hash', models.CharField(max_length=64)),
+                ('base_id', models.BigIntegerField(default=0)),
+                ('base_hash', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='chain_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='chain_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='ChainCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain', models.CharField(choices=[('vote', 'Votes'), ('activity', 'Activity log')], max_length=20)),
+                ('last_id', models.BigIntegerField()),
+                ('last_hash', models.CharField(max_length=64)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('verified_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-verified_at'],
+                'indexes': [models.Index(fields=['chain', 'last_id'], name='voting_chai_chain_09f99b_idx')],
+            },
+        ),
+        migrations.RunPython(chain_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:37
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_chained_rows(apps, schema_editor):
+    # Rows chained so far were chained in primary key order
+    ChainHead = apps.get_model('voting', 'ChainHead')
+    for chain, model_name in (('vote', 'Vote'), ('activity', 'ActivityLog')):
+        model = apps.get_model('voting', model_name)
+        model.objects.update(chain_seq=F('pk'))
+        last_seq = model.objects.aggregate(last=Max('chain_seq'))['last'] or 0
+        ChainHead.objects.filter(chain=chain).update(last_seq=last_seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0021_chain_hashes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chaincheckpoint',
+            name='voting_chai_chain_09f99b_idx',
+        ),
+        migrations.RenameField(
+            model_name='chaincheckpoint',
+            old_name='last_id',
+            new_name='last_seq',
+        ),
+        migrations.RenameField(
+            model_name='chainhead',
+            old_name='base_id',
+            new_name='base_seq',
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='chain_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='chainhead',
+            name='last_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='chain_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='chaincheckpoint',
+            index=models.Index(fields=['chain', 'last_seq'], name='voting_chai_chain_bc113b_idx'),
+        ),
+        migrations.RunPython(number_chained_rows, migrations.RunPython.noop),
+    ]
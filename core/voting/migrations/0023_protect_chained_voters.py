@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0022_chain_sealing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='voter',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='activity_logs', to='voting.voter'),
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='voter',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='voting.voter'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:43
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_digests(apps, schema_editor):
+    # Same hash as voting.models.template_digest at the time of this migration
+    FingerprintTemplate = apps.get_model('voting', 'FingerprintTemplate')
+    batch = []
+    for template in FingerprintTemplate.objects.only('id', 'template').iterator(chunk_size=500):
+        template.digest = int.from_bytes(
+            hashlib.blake2b(bytes(template.template), digest_size=8).digest(), 'little', signed=True
+        )
+        batch.append(template)
+        if len(batch) >= 500:
+            FingerprintTemplate.objects.bulk_update(batch, ['digest'])
+            batch = []
+    if batch:
+        FingerprintTemplate.objects.bulk_update(batch, ['digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0023_protect_chained_voters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fingerprinttemplate',
+            name='digest',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_digests, migrations.RunPython.noop),
+    ]
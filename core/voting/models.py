@@ -1,6 +1,13 @@
+import hashlib
+
 from django.db import models
 from django.utils import timezone
 
+
+def template_digest(template) -> int:
+    """64-bit content hash of a template, as stored in FingerprintTemplate.digest."""
+    return int.from_bytes(hashlib.blake2b(bytes(template), digest_size=8).digest(), 'little', signed=True)
+
 class VotingSession(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
@@ -64,10 +71,16 @@ class Candidate(models.Model):
 
 
 class Vote(models.Model):
-    voter = models.ForeignKey(Voter, on_delete=models.CASCADE)
+    # Votes are part of the vote hash chain, so their voter can't be deleted
+    voter = models.ForeignKey(Voter, on_delete=models.PROTECT)
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set before insert, as it is part of chain_hash
+    timestamp = models.DateTimeField(default=timezone.now)
+    # Position on the vote hash chain and the SHA-256 linking this vote to
+    # the one before it, both set when the vote is sealed (voting/chain.py)
+    chain_seq = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+    chain_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"{self.voter.name} voted for {self.candidate.name} ({self.post.title})"
@@ -77,21 +90,149 @@ class Vote(models.Model):
         ordering = ['-timestamp']
 
 
+class CandidateTally(models.Model):
+    """
+    One shard of a candidate's running vote count, kept in step with Vote
+    (see voting/tally.py). A candidate's votes are the sum of its shards.
+    """
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='tallies')
+    shard = models.PositiveSmallIntegerField(default=0)
+    votes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.candidate.name} (shard {self.shard}): {self.votes} votes"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['candidate', 'shard'], name='unique_candidate_tally_shard'),
+        ]
+
+
 class ActivityLog(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    EVENT_TYPES = [
+        ('vote', 'Vote'),
+        ('authentication', 'Authentication'),
+        ('match', 'Fingerprint match'),
+        ('verification', 'Fingerprint verification'),
+        ('enrollment', 'Fingerprint enrollment'),
+        ('scan_trigger', 'Scan trigger'),
+        ('other', 'Other'),
+    ]
+    OUTCOMES = [
+        ('success', 'Success'),
+        ('failure', 'Failure'),
+        ('already_voted', 'Already Voted'),
+        ('duplicate', 'Duplicate'),
+        ('rejected', 'Rejected'),
+        ('error', 'Error'),
+    ]
+
+    # Set when the entry is logged; it may be written later (voting/audit.py)
+    timestamp = models.DateTimeField(default=timezone.now)
     action = models.CharField(max_length=255)
+    # Structured copy of what `action` describes, for filtering without text search
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES, default='other')
+    outcome = models.CharField(max_length=20, choices=OUTCOMES, blank=True, default='')
+    # Entries are part of the activity log hash chain, so their voter can
+    # only be deleted once they have been archived (voting/audit_archive.py)
+    voter = models.ForeignKey(
+        Voter,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='activity_logs'
+    )
+    station = models.CharField(max_length=50, blank=True, default='')
+    score = models.FloatField(null=True, blank=True)
+    # Position on the activity log hash chain and the SHA-256 linking this
+    # entry to the one before it, both set when it is sealed (voting/chain.py)
+    chain_seq = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+    chain_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"{self.timestamp}: {self.action}"
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['event_type', 'timestamp']),
+            models.Index(fields=['voter', 'timestamp']),
+        ]
+
+
+class ChainHead(models.Model):
+    """
+    Tip of a hash chain (votes or activity log). Only the sealer locks and
+    moves it; inserting votes and log entries never touches it.
+    """
+    CHAINS = [
+        ('vote', 'Votes'),
+        ('activity', 'Activity log'),
+    ]
+
+    chain = models.CharField(max_length=20, choices=CHAINS, primary_key=True)
+    last_hash = models.CharField(max_length=64)
+    last_seq = models.BigIntegerField(default=0)
+    # Rows up to base_seq were archived out of the table; the rows left
+    # continue the chain from base_hash
+    base_seq = models.BigIntegerField(default=0)
+    base_hash = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"{self.get_chain_display()}: {self.last_hash}"
+
+
+class ChainCheckpoint(models.Model):
+    """A point up to which a chain was verified; the next verification starts here."""
+    chain = models.CharField(max_length=20, choices=ChainHead.CHAINS)
+    last_seq = models.BigIntegerField()
+    last_hash = models.CharField(max_length=64)
+    # Rows verified since the previous checkpoint
+    rows = models.PositiveIntegerField(default=0)
+    verified_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.get_chain_display()} verified up to #{self.last_seq} at {self.verified_at}"
+
+    class Meta:
+        ordering = ['-verified_at']
+        indexes = [
+            models.Index(fields=['chain', 'last_seq']),
+        ]
 
 
 class FingerprintTemplate(models.Model):
     voter = models.ForeignKey(Voter, on_delete=models.CASCADE, null=True, blank=True)
-    template_hex = models.TextField()
+    # Raw sensor template (512 bytes for the AS608)
+    template = models.BinaryField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set when enrollment found this finger already enrolled to another voter
+    duplicate_of = models.ForeignKey(
+        Voter,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='duplicate_templates'
+    )
+    duplicate_score = models.FloatField(null=True, blank=True)
+    # template_digest(template), kept up to date by save(), so the gallery
+    # cache can tell which rows of an exported gallery file changed since
+    digest = models.BigIntegerField(default=0, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.digest = template_digest(self.template)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'template' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'digest'}
+        super().save(*args, **kwargs)
+
+    @property
+    def template_hex(self):
+        return bytes(self.template).hex()
+
+    @template_hex.setter
+    def template_hex(self, value):
+        self.template = bytes.fromhex(value)
 
     def __str__(self):
         if self.voter:
@@ -107,6 +248,8 @@ from django.db import models
 
 class ScanTrigger(models.Model):
     voter_id = models.CharField(max_length=50, null=True, blank=True)
+    # Polling booth / ESP32 device the trigger is meant for ('' = default station)
+    station = models.CharField(max_length=50, blank=True, default='')
     action = models.CharField(
         max_length=20, 
         choices=[("register", "Register"), ("match", "Match")]
@@ -138,6 +281,11 @@ class ScanTrigger(models.Model):
 
     match_message = models.TextField(null=True, blank=True)
 
+    # Device that fetched the trigger and until when no other device gets it
+    # (see voting/triggers.py)
+    claimed_by = models.CharField(max_length=100, blank=True, default='')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         status = 'used' if self.used else 'pending'
         return f"Trigger for voter_id={self.voter_id} - {self.action} ({status}, match: {self.match_status})"
@@ -148,4 +296,6 @@ class ScanTrigger(models.Model):
             models.Index(fields=['used']),
             models.Index(fields=['created_at']),
             models.Index(fields=['match_status']),
+            # Each station's queue of pending triggers
+            models.Index(fields=['station', 'used', 'created_at']),
         ]
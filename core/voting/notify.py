@@ -0,0 +1,137 @@
+"""
+In-process wake-ups for requests that wait for something to happen.
+
+A Notifier is a version counter guarded by a threading.Condition. Waiters
+read ``version`` *before* checking the database and then wait for it to
+change, so a notification that lands between the check and the wait is
+never lost.
+
+Notifications only reach waiters in the same process. Deployments running
+several worker processes should set SCAN_TRIGGER_RECHECK_INTERVAL so
+waiting requests also re-check the database now and then.
+
+Async views wait with ``wait_async``, which parks a future on the event
+loop instead of holding a thread per waiting client.
+"""
+import asyncio
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+
+class Notifier:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._version = 0
+        # (event loop, future) of the coroutines in wait_async
+        self._async_waiters = set()
+
+    @property
+    def version(self):
+        with self._condition:
+            return self._version
+
+    def notify(self):
+        """Wake every waiter."""
+        with self._condition:
+            self._version += 1
+            self._condition.notify_all()
+            async_waiters, self._async_waiters = self._async_waiters, set()
+        for loop, future in async_waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # The waiter's event loop has been closed
+                pass
+
+    def wait(self, version, timeout):
+        """
+        Block until ``notify`` is called after ``version`` was read, or
+        ``timeout`` seconds pass. Returns True if notified.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._version != version, timeout)
+
+    async def wait_async(self, version, timeout):
+        """Coroutine version of ``wait``."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._condition:
+            if self._version != version:
+                return True
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class NotifierGroup:
+    """
+    One Notifier per key, created on first use.
+
+    Indexing keeps a key's Notifier for the life of the process, which
+    suits a small fixed set of keys such as stations. For short-lived keys
+    use ``subscribe`` and ``notify`` instead: the Notifier is dropped once
+    its last subscriber leaves, and notifying a key nobody waits on is a
+    no-op. Use one style or the other for a given group.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._notifiers = {}
+        self._subscribers = Counter()
+
+    def __getitem__(self, key):
+        with self._lock:
+            notifier = self._notifiers.get(key)
+            if notifier is None:
+                notifier = self._notifiers[key] = Notifier()
+            return notifier
+
+    def __len__(self):
+        with self._lock:
+            return len(self._notifiers)
+
+    @contextmanager
+    def subscribe(self, key):
+        """The key's Notifier, kept while the block runs."""
+        with self._lock:
+            notifier = self._notifiers.get(key)
+            if notifier is None:
+                notifier = self._notifiers[key] = Notifier()
+            self._subscribers[key] += 1
+        try:
+            yield notifier
+        finally:
+            with self._lock:
+                self._subscribers[key] -= 1
+                if not self._subscribers[key]:
+                    del self._subscribers[key]
+                    del self._notifiers[key]
+
+    def notify(self, key):
+        """Wake the key's subscribers, if it has any."""
+        with self._lock:
+            notifier = self._notifiers.get(key)
+        if notifier is not None:
+            notifier.notify()
+
+
+# Per station: notified (on commit) whenever a ScanTrigger for it is created,
+# so a new trigger only wakes the station it is meant for
+scan_triggers = NotifierGroup()
+# Per trigger id: notified (on commit) whenever an existing ScanTrigger is
+# updated, e.g. when match_template records its result, so a result only
+# wakes the streams waiting for that trigger
+scan_results = NotifierGroup()
@@ -0,0 +1,254 @@
+"""
+Parallel 1:N fingerprint matching on a persistent process pool.
+
+The gallery is split into shards and every shard is copied once into a
+``multiprocessing.shared_memory`` segment. Worker processes attach to the
+segments the first time they see them and keep them attached, so a match
+request only sends the incoming template and the shard names to the pool.
+Up to MAX_PUBLISHED_GALLERIES galleries stay published at once.
+Each worker returns the best row of its shard and the results are merged.
+
+Like voting/matching.py this module does not import Django, so the
+(spawned) worker processes start quickly.
+"""
+import atexit
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .matching import TemplateGallery, find_best_match
+
+# Galleries smaller than this are matched in-process; the pool round trip
+# costs more than it saves.
+MIN_ROWS_PER_SHARD = 2048
+# Galleries kept in shared memory at once, least recently used go first
+MAX_PUBLISHED_GALLERIES = 4
+
+_ALIGN = 8
+
+
+def _layout(rows, length):
+    """Byte offsets of the templates, histograms, ids and active flags inside a segment."""
+    histograms_at = -(-rows * length // _ALIGN) * _ALIGN
+    ids_at = histograms_at + rows * 256 * 2
+    active_at = ids_at + rows * 8
+    return histograms_at, ids_at, active_at, active_at + rows
+
+
+def _shard_gallery(buffer, rows, length):
+    histograms_at, ids_at, active_at, _ = _layout(rows, length)
+    templates = np.ndarray((rows, length), dtype=np.uint8, buffer=buffer)
+    histograms = np.ndarray((rows, 256), dtype=np.uint16, buffer=buffer, offset=histograms_at)
+    template_ids = np.ndarray((rows,), dtype=np.int64, buffer=buffer, offset=ids_at)
+    active = np.ndarray((rows,), dtype=np.bool_, buffer=buffer, offset=active_at)
+    return TemplateGallery(templates, template_ids, [None] * rows, histograms=histograms, active=active)
+
+
+def _attach(name):
+    """Attach to an existing segment without taking over its cleanup."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment, but spawned workers share
+        # the parent's resource tracker, where it is already registered.
+        return shared_memory.SharedMemory(name=name)
+
+
+# Worker process state: segment name -> (generation, SharedMemory, TemplateGallery)
+_worker_shards = {}
+
+
+def _worker_gallery(spec, live_generations):
+    name, generation, rows, length = spec
+    shard = _worker_shards.get(name)
+    if shard is None:
+        # Drop segments of galleries that the parent has released since
+        for stale in [key for key, value in _worker_shards.items() if value[0] not in live_generations]:
+            _, segment, _ = _worker_shards.pop(stale)
+            try:
+                segment.close()
+            except BufferError:
+                pass
+        segment = _attach(name)
+        shard = (generation, segment, _shard_gallery(segment.buf, rows, length))
+        _worker_shards[name] = shard
+    return shard[2]
+
+
+def _match_shard(spec, live_generations, incoming_template, top_k, metric):
+    gallery = _worker_gallery(spec, live_generations)
+    row, score = find_best_match(incoming_template, gallery, top_k=top_k, metric=metric)
+    if row is None:
+        return None, 0.0, 0
+    return row, score, int(gallery.template_ids[row])
+
+
+class _Published:
+    """A gallery copied into shared memory, and the requests currently using it."""
+
+    def __init__(self, gallery, generation, shards, segments):
+        # Held so the id() the entry is keyed by can't be reused meanwhile
+        self.gallery = gallery
+        self.generation = generation
+        # [(first row, (segment name, generation, rows, length))]
+        self.shards = shards
+        self.segments = segments
+        self.in_flight = 0
+        self.last_used = 0
+        self.evicted = False
+
+
+class ParallelMatcher:
+    """
+    Shards galleries across a ProcessPoolExecutor with ``workers`` processes.
+
+    Each TemplateGallery object is published once and stays in shared
+    memory while it is among the ``max_galleries`` most recently used, so
+    callers that match against several galleries in turn (a gallery file
+    plus the in-database overlay) don't copy them again on every request.
+    The gallery cache builds a new object per change; superseded ones age
+    out. A gallery pushed out while requests still run against it is only
+    released when the last of them has finished.
+    """
+
+    def __init__(self, workers, max_galleries=MAX_PUBLISHED_GALLERIES):
+        self.workers = workers
+        self.max_galleries = max(1, max_galleries)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._generation = itertools.count(1)
+        self._uses = itertools.count(1)
+        # id(gallery) -> _Published
+        self._published = {}
+        # Pushed out but still in use by a running request
+        self._evicted = []
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._executor
+
+    def _publish(self, gallery):
+        generation = next(self._generation)
+        length = gallery.template_length
+        shard_count = max(1, min(self.workers, len(gallery) // MIN_ROWS_PER_SHARD))
+        bounds = np.linspace(0, len(gallery), shard_count + 1).astype(int)
+
+        shards, segments = [], []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            rows = int(stop - start)
+            size = _layout(rows, length)[3]
+            segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            shard = _shard_gallery(segment.buf, rows, length)
+            shard.templates[:] = gallery.templates[start:stop]
+            shard.histograms[:] = gallery.histograms[start:stop]
+            shard.template_ids[:] = gallery.template_ids[start:stop]
+            shard.active[:] = True if gallery.active is None else gallery.active[start:stop]
+            del shard
+            segments.append(segment)
+            shards.append((int(start), (segment.name, generation, rows, length)))
+        return _Published(gallery, generation, shards, segments)
+
+    def _acquire(self, gallery):
+        """The published copy of ``gallery`` (publishing it if needed), marked in use."""
+        with self._lock:
+            entry = self._published.get(id(gallery))
+            if entry is None:
+                entry = self._published[id(gallery)] = self._publish(gallery)
+            entry.in_flight += 1
+            entry.last_used = next(self._uses)
+            self._evict()
+            return entry
+
+    def _done(self, entry):
+        with self._lock:
+            entry.in_flight -= 1
+            if entry.evicted and entry.in_flight == 0:
+                self._evicted.remove(entry)
+                self._release(entry.segments)
+
+    def _evict(self):
+        """Push out the least recently used galleries beyond max_galleries."""
+        excess = len(self._published) - self.max_galleries
+        if excess <= 0:
+            return
+        for entry in sorted(self._published.values(), key=lambda entry: entry.last_used)[:excess]:
+            del self._published[id(entry.gallery)]
+            entry.evicted = True
+            if entry.in_flight:
+                self._evicted.append(entry)
+            else:
+                self._release(entry.segments)
+
+    def _live_generations(self):
+        return frozenset(entry.generation for entry in list(self._published.values()) + self._evicted)
+
+    @staticmethod
+    def _release(segments):
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    def find_best_match(self, incoming_template: bytes, gallery: TemplateGallery,
+                        top_k: int = 0, metric: str = 'byte_hamming') -> tuple:
+        """Same contract as matching.find_best_match, scored shard by shard."""
+        if len(gallery) == 0:
+            return None, 0.0
+
+        entry = self._acquire(gallery)
+        try:
+            with self._lock:
+                executor = self._get_executor()
+                live_generations = self._live_generations()
+            futures = [
+                (start, executor.submit(_match_shard, spec, live_generations, incoming_template, top_k, metric))
+                for start, spec in entry.shards
+            ]
+
+            best_row, best_score, best_id = None, 0.0, None
+            for start, future in futures:
+                row, score, template_id = future.result()
+                if row is None:
+                    continue
+                if score > best_score or (score == best_score and template_id > best_id):
+                    best_row, best_score, best_id = start + row, score, template_id
+        finally:
+            self._done(entry)
+        return best_row, best_score
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+            for entry in list(self._published.values()) + self._evicted:
+                self._release(entry.segments)
+            self._published, self._evicted = {}, []
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_parallel_matcher(workers):
+    """Return the process-wide ParallelMatcher, (re)creating it for ``workers``."""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None or _matcher.workers != workers:
+            if _matcher is not None:
+                _matcher.close()
+            _matcher = ParallelMatcher(workers)
+        return _matcher
+
+
+@atexit.register
+def _shutdown():
+    if _matcher is not None:
+        _matcher.close()
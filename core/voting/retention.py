@@ -0,0 +1,119 @@
+"""
+Retention for rows that only matter for a short time.
+
+Used ScanTriggers and temporary FingerprintTemplates (uploaded without a
+voter, see upload_template) are kept forever otherwise, and every station
+poll and template lookup has to work around them.
+
+Rows are deleted in batches of primary keys, each batch in its own short
+transaction, so a purge never holds a lock on the whole table while
+stations keep polling. With an archive file each batch is first appended
+to it as JSON lines (Django's ``jsonl`` serializer, so ``loaddata`` can
+restore it) and only deleted once written.
+
+``python manage.py purge_expired`` runs a purge by hand, or every
+RETENTION_PURGE_INTERVAL seconds with ``--loop``. Setting
+RETENTION_PURGE_INTERVAL also runs it from a background thread in server
+processes: core/asgi.py and core/wsgi.py call ``start_purge_thread``, so
+migrations, other management commands and the tests never start one.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import serializers
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import FingerprintTemplate, ScanTrigger
+
+
+def expired_querysets(trigger_hours=None, template_hours=None):
+    """{name: queryset} of the rows older than their retention period."""
+    if trigger_hours is None:
+        trigger_hours = getattr(settings, 'SCAN_TRIGGER_RETENTION_HOURS', 24)
+    if template_hours is None:
+        template_hours = getattr(settings, 'TEMPORARY_TEMPLATE_RETENTION_HOURS', 24)
+
+    now = timezone.now()
+    return {
+        'scan_triggers': ScanTrigger.objects.filter(
+            used=True, created_at__lt=now - timedelta(hours=trigger_hours)
+        ),
+        'temporary_templates': FingerprintTemplate.objects.filter(
+            voter__isnull=True, created_at__lt=now - timedelta(hours=template_hours)
+        ),
+    }
+
+
+def purge_queryset(queryset, batch_size=500, archive=None, pause=0.0, dry_run=False):
+    """
+    Delete the rows of ``queryset`` ``batch_size`` at a time and return how
+    many were deleted (or would be, with ``dry_run``). ``archive`` is an
+    open text file the rows are written to before they are deleted.
+    """
+    if dry_run:
+        return queryset.count()
+
+    purged = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            # Walk the primary key so rows that can't be deleted aren't re-read
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1]
+            rows = queryset.model.objects.filter(pk__in=batch)
+            if archive is not None:
+                serializers.serialize('jsonl', rows.order_by('pk'), stream=archive)
+                archive.flush()
+            rows.delete()
+        purged += len(batch)
+        if pause:
+            time.sleep(pause)
+    return purged
+
+
+def purge_expired(batch_size=None, archive=None, pause=0.0, dry_run=False, **hours):
+    """Purge every kind of expired row. Returns {name: rows purged}."""
+    if batch_size is None:
+        batch_size = getattr(settings, 'RETENTION_BATCH_SIZE', 500)
+    return {
+        name: purge_queryset(queryset, batch_size, archive, pause, dry_run)
+        for name, queryset in expired_querysets(**hours).items()
+    }
+
+
+_purge_thread = None
+_purge_thread_lock = threading.Lock()
+
+
+def _purge_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            close_old_connections()
+            purged = purge_expired()
+            if any(purged.values()):
+                print(f"🧹 Retention purge: {purged}")
+        except Exception as e:
+            print(f"❌ Retention purge failed: {str(e)}")
+        finally:
+            close_old_connections()
+
+
+def start_purge_thread():
+    """Start the background purge if RETENTION_PURGE_INTERVAL is set (once per process)."""
+    global _purge_thread
+    interval = getattr(settings, 'RETENTION_PURGE_INTERVAL', None)
+    if not interval:
+        return None
+    with _purge_thread_lock:
+        if _purge_thread is None:
+            _purge_thread = threading.Thread(
+                target=_purge_forever, args=(interval,), name='retention-purge', daemon=True
+            )
+            _purge_thread.start()
+    return _purge_thread
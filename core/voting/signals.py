@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ballot import ballot_cache
+from .gallery import gallery_cache
+from .models import Candidate, FingerprintTemplate, Post, ScanTrigger, Vote
+from .notify import scan_results, scan_triggers
+from .tally import create_tallies, remove_vote
+
+
+# Cache updates run on commit so rolled back changes never reach the gallery.
+
+@receiver(post_save, sender=FingerprintTemplate)
+def cache_saved_template(sender, instance, **kwargs):
+    template_id, voter_pk, template = instance.pk, instance.voter_id, instance.template
+    transaction.on_commit(lambda: gallery_cache.put_template(template_id, voter_pk, template))
+
+
+@receiver(post_delete, sender=FingerprintTemplate)
+def uncache_deleted_template(sender, instance, **kwargs):
+    template_id = instance.pk
+    transaction.on_commit(lambda: gallery_cache.remove_template(template_id))
+
+
+@receiver(post_save, sender=ScanTrigger)
+def wake_trigger_pollers(sender, instance, created, **kwargs):
+    # Stations long-polling /api/scan-trigger/ re-check once the trigger is
+    # visible, and scan result streams once a result is saved
+    if created:
+        transaction.on_commit(scan_triggers[instance.station].notify)
+    else:
+        trigger_id = instance.pk
+        transaction.on_commit(lambda: scan_results.notify(trigger_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def invalidate_ballot(sender, **kwargs):
+    # The next request reloads the posts and candidates
+    transaction.on_commit(ballot_cache.invalidate)
+
+
+@receiver(post_save, sender=Candidate)
+def create_candidate_tally(sender, instance, created, **kwargs):
+    if created:
+        create_tallies([instance.pk])
+
+
+@receiver(post_delete, sender=Vote)
+def uncount_deleted_vote(sender, instance, **kwargs):
+    remove_vote(instance.candidate_id)
@@ -0,0 +1,113 @@
+"""
+Live vote tallies.
+
+CandidateTally holds TALLY_SHARDS counter rows per candidate. commit_ballot
+adds the ballot's votes with an F() increment in the same transaction as
+the Vote inserts, so results and the dashboard read a few small rows per
+candidate instead of counting the votes table.
+
+Each ballot increments one shard, picked at random, so concurrent ballots
+for the same front-runner mostly update different rows instead of queueing
+on one row lock; reads sum the shards. Changing TALLY_SHARDS is safe:
+missing shard rows are created on first use and reads sum whatever rows
+exist.
+
+Votes deleted through the ORM are subtracted by a signal handler; anything
+else (raw SQL, restores) can be repaired with ``python manage.py tally_votes``.
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Candidate, CandidateTally
+
+
+def shard_count():
+    return max(1, getattr(settings, 'TALLY_SHARDS', 1))
+
+
+def add_votes(candidate_ids, shard=None):
+    """
+    Count one more vote for each candidate in ``candidate_ids`` (each at
+    most once), all in the same ``shard`` (random if None). One UPDATE
+    when the shard rows exist; missing rows are created first.
+    """
+    candidate_ids = set(candidate_ids)
+    if not candidate_ids:
+        return
+    if shard is None:
+        shard = random.randrange(shard_count())
+    tallies = CandidateTally.objects.filter(candidate_id__in=candidate_ids, shard=shard)
+    if tallies.update(votes=F('votes') + 1) < len(candidate_ids):
+        # Candidates without this shard row yet (the update skipped them)
+        existing = set(tallies.values_list('candidate_id', flat=True))
+        missing = candidate_ids - existing
+        CandidateTally.objects.bulk_create(
+            [CandidateTally(candidate_id=candidate_id, shard=shard) for candidate_id in missing],
+            ignore_conflicts=True
+        )
+        CandidateTally.objects.filter(candidate_id__in=missing, shard=shard).update(votes=F('votes') + 1)
+
+
+def create_tallies(candidate_ids):
+    """Create every shard row of ``candidate_ids`` up front, so ballots never have to."""
+    CandidateTally.objects.bulk_create(
+        [CandidateTally(candidate_id=candidate_id, shard=shard)
+         for candidate_id in candidate_ids for shard in range(shard_count())],
+        ignore_conflicts=True,
+        batch_size=500
+    )
+
+
+def remove_vote(candidate_id):
+    """Take back one vote of ``candidate_id``, e.g. when a Vote is deleted."""
+    shard = (
+        CandidateTally.objects.filter(candidate_id=candidate_id, votes__gt=0)
+        .order_by('-votes').values_list('pk', flat=True).first()
+    )
+    if shard is not None:
+        CandidateTally.objects.filter(pk=shard, votes__gt=0).update(votes=F('votes') - 1)
+
+
+def tally_counts():
+    """{candidate id: votes} summed over the tally shards."""
+    return dict(
+        CandidateTally.objects.order_by().values('candidate_id')
+        .annotate(total=Sum('votes')).values_list('candidate_id', 'total')
+    )
+
+
+def count_votes():
+    """{candidate id: votes} counted from the Vote table (every candidate, zeros included)."""
+    return dict(Candidate.objects.annotate(votes=Count('vote')).values_list('pk', 'votes'))
+
+
+def tally_mismatches():
+    """[(candidate id, tally, counted)] for every candidate whose tally is off."""
+    tallies = tally_counts()
+    return [
+        (candidate_id, tallies.get(candidate_id), counted)
+        for candidate_id, counted in sorted(count_votes().items())
+        if tallies.get(candidate_id) != counted
+    ]
+
+
+def rebuild_tallies():
+    """
+    Recount every tally from Vote. Existing tally rows are locked first so
+    ballots committed meanwhile wait instead of being overwritten. A
+    corrected candidate gets its count in shard 0 and empty other shards.
+    Returns the mismatches that were fixed.
+    """
+    with transaction.atomic():
+        list(CandidateTally.objects.select_for_update().values_list('pk', flat=True))
+        mismatches = tally_mismatches()
+        CandidateTally.objects.filter(candidate_id__in=[pk for pk, _, _ in mismatches]).delete()
+        CandidateTally.objects.bulk_create(
+            [CandidateTally(candidate_id=candidate_id, shard=shard, votes=counted if shard == 0 else 0)
+             for candidate_id, _, counted in mismatches for shard in range(shard_count())],
+            batch_size=500
+        )
+    return mismatches
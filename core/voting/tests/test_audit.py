@@ -0,0 +1,104 @@
+import time
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from voting import audit
+from voting.audit import AuditLogWriter, log_activity
+from voting.models import ActivityLog
+
+
+def entry(action, **fields):
+    return ActivityLog(action=action, timestamp=timezone.now(), **fields)
+
+
+@override_settings(AUDIT_LOG_BATCH_SIZE=5, AUDIT_LOG_FLUSH_INTERVAL_MS=10000)
+class AuditLogWriterTests(TransactionTestCase):
+    def setUp(self):
+        self.writer = AuditLogWriter()
+        self.addCleanup(self.writer.close)
+        bulk_create = mock.patch.object(
+            ActivityLog.objects, 'bulk_create', wraps=ActivityLog.objects.bulk_create
+        )
+        self.bulk_create = bulk_create.start()
+        self.addCleanup(bulk_create.stop)
+
+    def actions(self):
+        return list(ActivityLog.objects.order_by('chain_seq').values_list('action', flat=True))
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while ActivityLog.objects.count() < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_full_batch_is_written_at_once(self):
+        for number in range(5):
+            self.writer.enqueue(entry(f'entry {number}'))
+        # Well before the 10s interval
+        self.wait_for(5)
+        self.assertTrue(self.writer.flush())
+
+        self.assertEqual(self.actions(), [f'entry {number}' for number in range(5)])
+        self.assertEqual(self.bulk_create.call_count, 1)
+        self.assertFalse(ActivityLog.objects.filter(chain_seq__isnull=True).exists())
+
+    @override_settings(AUDIT_LOG_FLUSH_INTERVAL_MS=50)
+    def test_partial_batch_is_written_after_the_interval(self):
+        self.writer.enqueue(entry('first'))
+        self.writer.enqueue(entry('second'))
+        self.wait_for(2)
+        self.assertEqual(self.actions(), ['first', 'second'])
+        self.assertEqual(self.bulk_create.call_count, 1)
+
+    def test_flush_and_close_write_what_is_queued(self):
+        self.writer.enqueue(entry('flushed'))
+        self.assertTrue(self.writer.flush())
+        self.assertEqual(self.actions(), ['flushed'])
+
+        self.writer.enqueue(entry('closed'))
+        self.writer.close()
+        self.assertEqual(self.actions(), ['flushed', 'closed'])
+        self.assertFalse(self.writer._thread.is_alive())
+
+    def test_bad_entry_does_not_hold_back_the_batch(self):
+        self.writer.enqueue(entry('kept'))
+        self.writer.enqueue(entry('dropped', voter_id=999999))
+        self.writer.enqueue(entry('also kept'))
+        self.assertTrue(self.writer.flush())
+        self.assertEqual(self.actions(), ['kept', 'also kept'])
+
+    def test_log_activity_queues_on_commit(self):
+        with mock.patch.object(audit, 'audit_log', self.writer):
+            with transaction.atomic():
+                log_activity('committed', event_type='vote', outcome='success', station='booth-1')
+                self.assertEqual(self.writer._queue, [])
+            with self.assertRaises(ValueError), transaction.atomic():
+                log_activity('rolled back')
+                raise ValueError
+            self.assertTrue(self.writer.flush())
+
+        self.assertEqual(
+            list(ActivityLog.objects.values_list('action', 'event_type', 'outcome', 'station')),
+            [('committed', 'vote', 'success', 'booth-1')]
+        )
+
+
+@override_settings(AUDIT_LOG_MODE='sync')
+class SyncAuditLogTests(TestCase):
+    def test_entry_is_written_at_once_and_sealed_on_commit(self):
+        with mock.patch.object(audit.audit_log, 'enqueue') as enqueue:
+            with self.captureOnCommitCallbacks() as callbacks:
+                log_activity('x' * 300, event_type='match', score=91.5)
+            enqueue.assert_not_called()
+
+        logged = ActivityLog.objects.get()
+        self.assertEqual((len(logged.action), logged.event_type, logged.score), (255, 'match', 91.5))
+        self.assertIsNone(logged.chain_seq)
+
+        for callback in callbacks:
+            callback()
+        logged.refresh_from_db()
+        self.assertIsNotNone(logged.chain_seq)
+        self.assertNotEqual(logged.chain_hash, '')
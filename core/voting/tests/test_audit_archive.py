@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import skipIf
+
+from django.test import TestCase
+from django.utils.dateparse import parse_datetime
+
+from voting import audit_archive
+from voting.audit_archive import archive_activity, read_archive
+from voting.chain import CHAINS, GENESIS, link_hash, verify_chain
+from voting.models import ActivityLog, ChainHead, Voter
+
+DAY_1 = datetime(2026, 10, 16, 9, tzinfo=dt_timezone.utc)
+DAY_2 = datetime(2026, 10, 17, 9, tzinfo=dt_timezone.utc)
+CUT_OFF = datetime(2026, 10, 18, tzinfo=dt_timezone.utc)
+
+
+class ArchiveRoundTripTests(TestCase):
+    """Archived entries read back unchanged and still carry the hash chain."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voter = Voter.objects.create(voter_id='V000001', name='Voter', fingerprint_id='1')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for number, (timestamp, event_type) in enumerate([
+            (DAY_1, 'vote'), (DAY_1 + timedelta(hours=1), 'match'), (DAY_2, 'vote'), (DAY_2, 'other'),
+        ]):
+            ActivityLog.objects.create(
+                action=f'Entry {number}', timestamp=timestamp, event_type=event_type, outcome='success',
+                voter=self.voter if event_type == 'vote' else None, station='booth-1', score=number + 0.5,
+            )
+        # Still too recent to archive
+        ActivityLog.objects.create(action='Today', timestamp=CUT_OFF + timedelta(hours=1))
+        verify_chain('activity')
+        self.logged = list(ActivityLog.objects.order_by('chain_seq').values())
+
+    def archive(self, **options):
+        return archive_activity(CUT_OFF, self.directory, batch_size=3, **options)
+
+    def test_round_trip_keeps_the_chain_verifiable(self):
+        archived = self.archive()
+        self.assertEqual(
+            {os.path.basename(path): count for path, count in archived.items()},
+            {'activity-2026-10-16.jsonl.gz': 2, 'activity-2026-10-17.jsonl.gz': 2},
+        )
+        self.assertEqual(list(ActivityLog.objects.values_list('action', flat=True)), ['Today'])
+
+        records = list(read_archive(self.directory))
+        self.assertEqual(len(records), 4)
+        for record, logged in zip(records, self.logged):
+            self.assertEqual(parse_datetime(record['timestamp']), logged['timestamp'])
+            for field in ('id', 'action', 'event_type', 'outcome', 'voter_id', 'station', 'score', 'chain_seq',
+                          'chain_hash'):
+                self.assertEqual(record[field], logged[field], field)
+        self.assertEqual([record['voter'] for record in records], ['V000001', None, 'V000001', None])
+
+        # The archive re-hashes from the genesis to the base of the rows left ...
+        _, fields = CHAINS['activity']
+        previous = GENESIS
+        for record in records:
+            record['timestamp'] = parse_datetime(record['timestamp'])
+            previous = link_hash(previous, [record[field] for field in fields])
+            self.assertEqual(previous, record['chain_hash'])
+        head = ChainHead.objects.get(chain='activity')
+        self.assertEqual((head.base_seq, head.base_hash), (4, previous))
+        # ... and the rows left link on from there
+        report = verify_chain('activity', full=True)
+        self.assertTrue(report.ok)
+        self.assertEqual((report.start_seq, report.rows), (4, 1))
+
+    def test_read_archive_filters(self):
+        self.archive()
+        actions = lambda **filters: [record['action'] for record in read_archive(self.directory, **filters)]
+
+        self.assertEqual(actions(start=DAY_2), ['Entry 2', 'Entry 3'])
+        self.assertEqual(actions(end=DAY_1 + timedelta(hours=1)), ['Entry 0'])
+        self.assertEqual(actions(event_type='vote'), ['Entry 0', 'Entry 2'])
+        self.assertEqual(actions(voter='V000001', start=DAY_2), ['Entry 2'])
+
+    def test_later_runs_append_to_the_partition(self):
+        archive_activity(DAY_1 + timedelta(minutes=30), self.directory)
+        self.assertEqual([record['action'] for record in read_archive(self.directory)], ['Entry 0'])
+
+        self.archive()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertEqual([record['chain_seq'] for record in read_archive(self.directory)], [1, 2, 3, 4])
+
+    def test_dry_run_leaves_the_table_alone(self):
+        counts = self.archive(dry_run=True)
+        self.assertEqual(sum(counts.values()), 4)
+        self.assertEqual(ActivityLog.objects.count(), 5)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @skipIf(audit_archive.zstandard is None, 'zstandard is not installed')
+    def test_zstd_round_trip(self):
+        archived = self.archive(compression='zstd', partition='hour')
+        self.assertEqual(len(archived), 3)
+        self.assertEqual(len(list(read_archive(self.directory))), 4)
@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from voting.ballot import BALLOT_COMMIT_QUERIES, AlreadyVotedError, BallotDefinition, ballot_cache, commit_ballot
+from voting.models import Candidate, Post, Vote, Voter
+from voting.tally import tally_counts
+
+
+class CommitBallotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.posts = [Post.objects.create(title=f'Post {number}') for number in range(5)]
+        cls.candidates = [
+            Candidate.objects.create(name=f'Candidate {post.pk}-{number}', post=post)
+            for post in cls.posts for number in range(2)
+        ]
+        cls.voter = Voter.objects.create(voter_id='V000001', name='Voter', fingerprint_id='1')
+
+    def setUp(self):
+        ballot_cache.invalidate()
+        self.addCleanup(ballot_cache.invalidate)
+
+    def ballot(self):
+        return [
+            {'post': post.pk, 'candidate': Candidate.objects.filter(post=post).first().pk}
+            for post in self.posts
+        ]
+
+    def test_ballot_query_count_does_not_grow_with_posts(self):
+        ballot = self.ballot()
+        # Loaded once per process, as the ballot page would have done
+        ballot_cache.get()
+        # commit_ballot's atomic block is a savepoint inside the test's
+        # transaction: SAVEPOINT and RELEASE come on top of the real work
+        with self.assertNumQueries(BALLOT_COMMIT_QUERIES + 2):
+            voter, created, rejected = commit_ballot(self.voter, ballot)
+
+        self.assertEqual((len(created), rejected), (len(self.posts), []))
+        self.assertTrue(voter.has_voted)
+        self.assertEqual(sum(tally_counts().values()), len(self.posts))
+
+    def test_second_ballot_is_refused(self):
+        commit_ballot(self.voter, self.ballot())
+        with self.assertRaises(AlreadyVotedError):
+            commit_ballot(self.voter, self.ballot())
+        self.assertEqual(Vote.objects.filter(voter=self.voter).count(), len(self.posts))
+
+    def test_invalid_items_are_rejected(self):
+        post, other_post = self.posts[:2]
+        candidate = Candidate.objects.filter(post=other_post).first()
+        _, created, rejected = commit_ballot(self.voter, [
+            {'post': post.pk, 'candidate': candidate.pk},
+            {'post': 'x', 'candidate': candidate.pk},
+        ])
+        self.assertEqual(created, [])
+        self.assertEqual(len(rejected), 2)
+
+
+class BallotCacheTests(TestCase):
+    """The cached ballot is reloaded after posts or candidates change and commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(title='President')
+        cls.candidate = Candidate.objects.create(name='First', post=cls.post)
+
+    def setUp(self):
+        ballot_cache.invalidate()
+        self.addCleanup(ballot_cache.invalidate)
+
+    def names(self):
+        return sorted(candidate['name'] for candidate in ballot_cache.get().candidates_data)
+
+    def test_served_from_memory_until_changed(self):
+        definition = ballot_cache.get()
+        with self.assertNumQueries(0):
+            self.assertIs(ballot_cache.get(), definition)
+
+    def test_candidate_save_and_delete_reload_the_ballot(self):
+        self.assertEqual(self.names(), ['First'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Candidate.objects.create(name='Second', post=self.post)
+        self.assertEqual(self.names(), ['First', 'Second'])
+        self.assertEqual(ballot_cache.get().candidate_posts[second.pk], self.post.pk)
+
+        second.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        self.assertEqual(self.names(), ['First', 'Renamed'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.names(), ['First'])
+        self.assertNotIn(second.pk, ballot_cache.get().candidate_posts)
+
+    def test_post_save_and_delete_reload_the_ballot(self):
+        titles = lambda: [post['title'] for post in ballot_cache.get().posts_data]
+        self.assertEqual(titles(), ['President'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Secretary')
+        self.assertEqual(sorted(titles()), ['President', 'Secretary'])
+
+        post.title = 'Treasurer'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertEqual(sorted(titles()), ['President', 'Treasurer'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertEqual(titles(), ['President'])
+
+    def test_uncommitted_change_keeps_the_cached_ballot(self):
+        definition = ballot_cache.get()
+        Candidate.objects.create(name='Second', post=self.post)
+        # on_commit never ran inside the test's transaction
+        self.assertIs(ballot_cache.get(), definition)
+
+    def test_load_raced_by_an_invalidation_is_not_kept(self):
+        def invalidated_while_loading(*args):
+            ballot_cache.invalidate()
+            return BallotDefinition(*args)
+
+        with mock.patch('voting.ballot.BallotDefinition', side_effect=invalidated_while_loading):
+            stale = ballot_cache.get()
+        self.assertIsNot(ballot_cache.get(), stale)
+        self.assertIs(ballot_cache.get(), ballot_cache.get())
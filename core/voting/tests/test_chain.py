@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.db.models import ProtectedError
+from django.test import TestCase
+from django.utils import timezone
+
+from voting.audit_archive import archive_activity
+from voting.chain import CHAINS, GENESIS, link_hash, seal, verify_chain
+from voting.models import ActivityLog, Candidate, ChainCheckpoint, ChainHead, Post, Vote, Voter
+
+
+class ChainTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.voter = Voter.objects.create(voter_id='V000001', name='Voter', fingerprint_id='1')
+
+    def log(self, count, **fields):
+        return ActivityLog.objects.bulk_create([
+            ActivityLog(action=f'Entry {number}', voter=self.voter, station='booth-1', score=number, **fields)
+            for number in range(count)
+        ])
+
+    def chained(self):
+        return list(ActivityLog.objects.order_by('chain_seq'))
+
+    def test_rows_are_inserted_unsealed_and_sealed_in_order(self):
+        self.log(5)
+        self.assertEqual(ActivityLog.objects.filter(chain_seq__isnull=True).count(), 5)
+
+        self.assertEqual(seal('activity', batch_size=2), 5)
+        _, fields = CHAINS['activity']
+        previous = GENESIS
+        for seq, entry in enumerate(self.chained(), 1):
+            previous = link_hash(previous, [getattr(entry, field) for field in fields])
+            self.assertEqual((entry.chain_seq, entry.chain_hash), (seq, previous))
+        head = ChainHead.objects.get(chain='activity')
+        self.assertEqual((head.last_seq, head.last_hash), (5, previous))
+        self.assertEqual(seal('activity'), 0)
+
+    def test_row_committed_late_is_sealed_further_along(self):
+        ActivityLog.objects.bulk_create([ActivityLog(pk=pk, action=f'Entry {pk}') for pk in (10, 11)])
+        seal('activity')
+        # A lower primary key committing after 10 and 11 were sealed
+        ActivityLog.objects.create(pk=5, action='Entry 5')
+        seal('activity')
+
+        self.assertEqual([(entry.pk, entry.chain_seq) for entry in self.chained()], [(10, 1), (11, 2), (5, 3)])
+        self.assertTrue(verify_chain('activity').ok)
+
+    def test_verify_seals_pending_rows_and_resumes_from_checkpoint(self):
+        self.log(3)
+        report = verify_chain('activity')
+        self.assertTrue(report.ok)
+        self.assertEqual((report.start_seq, report.rows, report.checkpoint.last_seq), (0, 3, 3))
+
+        self.log(2)
+        report = verify_chain('activity')
+        self.assertTrue(report.ok)
+        self.assertEqual((report.start_seq, report.rows, report.last_seq), (3, 2, 5))
+        self.assertEqual(ChainCheckpoint.objects.filter(chain='activity').count(), 2)
+
+        # Nothing new: nothing read, no checkpoint
+        report = verify_chain('activity')
+        self.assertEqual((report.rows, report.checkpoint), (0, None))
+        self.assertTrue(report.ok)
+
+    def test_edited_row_is_reported(self):
+        self.log(5)
+        seal('activity')
+        ActivityLog.objects.filter(chain_seq=3).update(outcome='success')
+
+        report = verify_chain('activity')
+        self.assertEqual([seq for seq, _, _ in report.breaks], [3])
+        self.assertIsNone(report.checkpoint)
+        self.assertFalse(ChainCheckpoint.objects.exists())
+
+    def test_deleted_row_breaks_the_next_link(self):
+        self.log(5)
+        seal('activity')
+        ActivityLog.objects.filter(chain_seq=2).delete()
+
+        self.assertEqual([seq for seq, _, _ in verify_chain('activity').breaks], [3])
+
+    def test_rows_cut_off_the_end_are_reported(self):
+        self.log(5)
+        seal('activity')
+        ActivityLog.objects.filter(chain_seq__gte=4).delete()
+
+        report = verify_chain('activity')
+        self.assertEqual(len(report.breaks), 1)
+        seq, expected, stored = report.breaks[0]
+        self.assertIsNone(seq)
+        self.assertEqual(expected, ChainHead.objects.get(chain='activity').last_hash)
+
+    def test_rewritten_checkpointed_row_is_reported(self):
+        self.log(3)
+        verify_chain('activity')
+        # Rewrite the chain from the checkpointed row, consistently from there on
+        ActivityLog.objects.filter(chain_seq=3).update(chain_hash='f' * 64)
+        ChainHead.objects.filter(chain='activity').update(last_hash='f' * 64)
+
+        report = verify_chain('activity')
+        self.assertEqual(report.breaks[0], (3, ChainCheckpoint.objects.get().last_hash, 'f' * 64))
+        # Full verification walks the rows themselves
+        self.assertEqual([seq for seq, _, _ in verify_chain('activity', full=True).breaks], [3])
+
+    def test_archiving_moves_the_chain_base(self):
+        self.log(5, timestamp=timezone.now() - timedelta(days=2))
+        self.log(2)
+        verify_chain('activity')
+        archived_tip = ActivityLog.objects.get(chain_seq=5).chain_hash
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        archived = archive_activity(timezone.now() - timedelta(days=1), directory, batch_size=2)
+        self.assertEqual(sum(archived.values()), 5)
+
+        head = ChainHead.objects.get(chain='activity')
+        self.assertEqual((head.base_seq, head.base_hash), (5, archived_tip))
+        remaining = self.chained()
+        self.assertEqual([entry.chain_seq for entry in remaining], [6, 7])
+        report = verify_chain('activity', full=True, save_checkpoint=False)
+        self.assertTrue(report.ok)
+        self.assertEqual((report.start_seq, report.rows), (5, 2))
+
+        # The first row left must still link to the archived tip
+        ActivityLog.objects.filter(chain_seq=6).update(action='Edited')
+        self.assertEqual([seq for seq, _, _ in verify_chain('activity', full=True).breaks], [6])
+
+    def test_voters_on_the_chains_cannot_be_deleted(self):
+        post = Post.objects.create(title='Post')
+        candidate = Candidate.objects.create(name='Candidate', post=post)
+        Vote.objects.create(voter=self.voter, post=post, candidate=candidate)
+        with self.assertRaises(ProtectedError):
+            self.voter.delete()
+
+        other = Voter.objects.create(voter_id='V000002', name='Other', fingerprint_id='2')
+        ActivityLog.objects.create(action='Enrolled', voter=other)
+        with self.assertRaises(ProtectedError):
+            other.delete()
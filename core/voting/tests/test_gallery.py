@@ -0,0 +1,144 @@
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from voting.gallery import NO_VOTER, gallery_cache
+from voting.gallery_file import GalleryFile
+from voting.models import FingerprintTemplate, Voter
+from voting.views import advanced_fingerprint_match
+
+TEMPLATE_LENGTH = 512
+
+
+class GalleryCacheTests(TestCase):
+    """The in-memory gallery follows template and voter changes once they commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voter = Voter.objects.create(voter_id='V000001', name='Voter', fingerprint_id='1')
+
+    def setUp(self):
+        self.rng = np.random.default_rng(11)
+        gallery_cache.clear()
+        self.addCleanup(gallery_cache.clear)
+
+    def template(self):
+        return self.rng.integers(0, 256, TEMPLATE_LENGTH, dtype=np.uint8).tobytes()
+
+    def enroll(self, voter=None, template=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return FingerprintTemplate.objects.create(voter=voter, template=template or self.template())
+
+    def cached(self):
+        """{template id: (voter pk, template bytes)} as the matcher sees them."""
+        rows = {}
+        for gallery in gallery_cache.galleries(TEMPLATE_LENGTH):
+            for row, template_id in enumerate(gallery.template_ids):
+                if gallery.active is None or gallery.active[row]:
+                    self.assertNotIn(int(template_id), rows, 'served twice')
+                    rows[int(template_id)] = (int(gallery.voters[row]), gallery.templates[row].tobytes())
+        return rows
+
+    def test_saved_template_is_added(self):
+        first = self.enroll(self.voter)
+        self.assertEqual(self.cached(), {first.pk: (self.voter.pk, bytes(first.template))})
+
+        # Loaded now; later saves go straight into the cache
+        second = self.enroll()
+        self.assertEqual(self.cached()[second.pk], (NO_VOTER, bytes(second.template)))
+
+    def test_changed_template_replaces_the_cached_one(self):
+        template = self.enroll()
+        self.cached()
+
+        template.voter = self.voter
+        template.template = self.template()
+        with self.captureOnCommitCallbacks(execute=True):
+            template.save()
+        self.assertEqual(self.cached(), {template.pk: (self.voter.pk, bytes(template.template))})
+
+    def test_deleted_template_is_removed(self):
+        kept, deleted = self.enroll(self.voter), self.enroll(self.voter)
+        self.cached()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        self.assertEqual(set(self.cached()), {kept.pk})
+
+    def test_rolled_back_change_is_not_cached(self):
+        self.cached()
+        FingerprintTemplate.objects.create(voter=self.voter, template=self.template())
+        # No commit: the on_commit update never ran
+        self.assertEqual(self.cached(), {})
+
+    def test_deleted_voter_takes_their_templates_along(self):
+        voter = Voter.objects.create(voter_id='V000002', name='Other', fingerprint_id='2')
+        kept, deleted = self.enroll(self.voter), self.enroll(voter)
+        self.cached()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            voter.delete()
+        self.assertEqual(set(self.cached()), {kept.pk})
+
+    def test_match_reads_the_current_voter(self):
+        template = self.enroll(self.voter)
+        matched, _, match_type = advanced_fingerprint_match(bytes(template.template))
+        self.assertEqual((matched, matched.has_voted, match_type), (self.voter, False, 'exact_match'))
+
+        # A voter saved after the gallery was loaded is not served stale
+        voter = Voter.objects.get(pk=self.voter.pk)
+        voter.has_voted = True
+        with self.captureOnCommitCallbacks(execute=True):
+            voter.save()
+        matched, _, _ = advanced_fingerprint_match(bytes(template.template))
+        self.assertTrue(matched.has_voted)
+
+
+class GalleryFileCacheTests(GalleryCacheTests):
+    """The same, with most templates memory-mapped from an exported gallery file."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'gallery.bin')
+        settings = override_settings(FINGERPRINT_GALLERY_FILE=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def export(self, append=False):
+        call_command('export_gallery', append=append, stdout=io.StringIO())
+
+    def test_changed_template_is_not_served_from_the_file(self):
+        exported = self.enroll(self.voter)
+        self.export()
+        appended = self.enroll(self.voter)
+        self.export(append=True)
+        self.assertEqual(list(GalleryFile(self.path).template_ids), [exported.pk, appended.pk])
+
+        # Changed in the database behind the file's back (e.g. by another
+        # process), then loaded afresh
+        for template in (exported, appended):
+            template.template = self.template()
+            template.save()
+        gallery_cache.clear()
+
+        self.assertEqual(self.cached(), {
+            exported.pk: (self.voter.pk, bytes(exported.template)),
+            appended.pk: (self.voter.pk, bytes(appended.template)),
+        })
+
+    def test_unchanged_templates_stay_mapped(self):
+        exported = self.enroll(self.voter)
+        self.export()
+        gallery_cache.clear()
+
+        # Only the file's gallery, nothing read into memory
+        file_gallery, = gallery_cache.galleries(TEMPLATE_LENGTH)
+        self.assertIsNotNone(file_gallery.active)
+        self.assertEqual(self.cached(), {exported.pk: (self.voter.pk, bytes(exported.template))})
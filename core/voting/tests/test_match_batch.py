@@ -0,0 +1,109 @@
+import base64
+import json
+
+import numpy as np
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from voting.gallery import gallery_cache
+from voting.models import ActivityLog, FingerprintTemplate, ScanTrigger, Voter
+
+
+@override_settings(AUDIT_LOG_MODE='sync')
+class MatchTemplateBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = np.random.default_rng(3)
+        cls.enrolled = rng.integers(0, 256, 512, dtype=np.uint8).tobytes()
+        cls.unknown = rng.integers(0, 256, 512, dtype=np.uint8).tobytes()
+        cls.voter = Voter.objects.create(voter_id='V000001', name='Voter', fingerprint_id='1')
+        FingerprintTemplate.objects.create(voter=cls.voter, template=cls.enrolled)
+
+    def setUp(self):
+        gallery_cache.clear()
+        self.addCleanup(gallery_cache.clear)
+
+    def trigger(self, **fields):
+        return ScanTrigger.objects.create(action=fields.pop('action', 'match'), station='booth-1', **fields)
+
+    def post(self, scans):
+        response = self.client.post(
+            reverse('voting:match_template_batch'), json.dumps({'scans': scans}), content_type='application/json'
+        )
+        return response.status_code, response.json()
+
+    def scan(self, trigger, template):
+        return {'trigger_id': trigger.pk, 'template': base64.b64encode(template).decode()}
+
+    def test_matches_are_saved_with_one_bulk_update(self):
+        matched, unmatched = self.trigger(), self.trigger()
+
+        with CaptureQueriesContext(connection) as queries:
+            status, body = self.post([self.scan(matched, self.enrolled), self.scan(unmatched, self.unknown)])
+
+        self.assertEqual((status, body['processed']), (200, 2))
+        self.assertEqual([result['status'] for result in body['results']], ['success', 'not_found'])
+        self.assertEqual(body['results'][0]['voter_id'], self.voter.voter_id)
+        trigger_updates = [
+            query for query in queries.captured_queries if query['sql'].startswith('UPDATE "voting_scantrigger"')
+        ]
+        self.assertEqual(len(trigger_updates), 1)
+
+        matched.refresh_from_db()
+        unmatched.refresh_from_db()
+        self.assertEqual(
+            (matched.used, matched.match_status, matched.matched_voter_id), (True, 'success', self.voter.pk)
+        )
+        self.assertIn('Matched voter Voter', matched.match_message)
+        self.assertEqual((unmatched.used, unmatched.match_status, unmatched.matched_voter_id), (True, 'not_found', None))
+        self.assertEqual(
+            list(ActivityLog.objects.filter(event_type='match').order_by('pk').values_list('outcome', 'station')),
+            [('success', 'booth-1'), ('failure', 'booth-1')],
+        )
+
+    def test_bad_items_get_their_own_errors(self):
+        good = self.trigger()
+        used = self.trigger(used=True)
+        register = self.trigger(action='register')
+
+        status, body = self.post([
+            'not an object',
+            {'trigger_id': good.pk},
+            {'trigger_id': 999999, 'template': base64.b64encode(self.enrolled).decode()},
+            self.scan(used, self.enrolled),
+            self.scan(register, self.enrolled),
+            {'trigger_id': good.pk, 'template': 'abc'},
+            self.scan(good, self.enrolled),
+        ])
+
+        self.assertEqual((status, body['processed']), (200, 1))
+        results = body['results']
+        self.assertEqual(results[0]['message'], 'Missing trigger_id or template')
+        self.assertEqual(results[1]['message'], 'Missing trigger_id or template')
+        for result in results[2:5]:
+            self.assertEqual(result['message'], 'Trigger not found or already used')
+        self.assertEqual(results[5]['message'], 'Invalid template encoding')
+        self.assertEqual(results[6]['status'], 'success')
+        register.refresh_from_db()
+        self.assertFalse(register.used)
+
+    def test_trigger_repeated_in_a_batch_is_matched_once(self):
+        trigger = self.trigger()
+
+        status, body = self.post([self.scan(trigger, self.enrolled), self.scan(trigger, self.unknown)])
+
+        self.assertEqual((status, body['processed']), (200, 1))
+        self.assertEqual(body['results'][0]['status'], 'success')
+        self.assertEqual(body['results'][1]['message'], 'Trigger not found or already used')
+        trigger.refresh_from_db()
+        self.assertEqual(trigger.match_status, 'success')
+        self.assertEqual(ActivityLog.objects.filter(event_type='match').count(), 1)
+
+    def test_batch_limit(self):
+        trigger = self.trigger()
+        with self.settings(FINGERPRINT_MATCH_BATCH_LIMIT=1):
+            status, body = self.post([self.scan(trigger, self.enrolled)] * 2)
+        self.assertEqual(status, 400)
+        self.assertEqual(self.post([])[0], 400)
@@ -0,0 +1,111 @@
+import io
+import json
+from types import SimpleNamespace
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from voting.management.commands.benchmark_matching import add_noise, synthetic_gallery
+from voting.matching import find_best_match, round_scores, score_gallery
+from voting.views import calculate_similarity, python_fingerprint_match
+
+SMALL_GALLERY = 64
+LARGE_GALLERY = 2048
+
+
+def reference_score(incoming, template):
+    """advanced_fingerprint_match's score, one pair at a time in plain Python."""
+    byte_similarity = sum(a == b for a, b in zip(incoming, template)) / len(incoming) * 100
+    return calculate_similarity(incoming, template) * 0.8 + byte_similarity * 0.2
+
+
+class MatchingEquivalenceTests(SimpleTestCase):
+    """The NumPy matcher gives the same scores and best matches as the pure-Python reference."""
+
+    def probes(self, rng, gallery, count=6):
+        genuine = add_noise(rng, gallery.templates[rng.choice(len(gallery), count // 2)], 0.1)
+        impostors = rng.integers(0, 256, (count - count // 2, gallery.template_length), dtype=np.uint8)
+        return [probe.tobytes() for probe in np.concatenate([genuine, impostors])]
+
+    def test_scores_match_reference(self):
+        rng = np.random.default_rng(1)
+        gallery = synthetic_gallery(rng, SMALL_GALLERY)
+        for probe in self.probes(rng, gallery):
+            expected = [reference_score(probe, template.tobytes()) for template in gallery.templates]
+            np.testing.assert_allclose(score_gallery(probe, gallery), expected, rtol=0, atol=1e-9)
+            np.testing.assert_array_equal(
+                round_scores(score_gallery(probe, gallery)),
+                [round(score, 2) for score in expected]
+            )
+
+    def assert_best_matches_agree(self, size):
+        rng = np.random.default_rng(size)
+        gallery = synthetic_gallery(rng, size)
+        records = [
+            SimpleNamespace(template=gallery.templates[row].tobytes(), voter=int(gallery.template_ids[row]))
+            for row in reversed(range(size))
+        ]
+        for probe in self.probes(rng, gallery):
+            voter, score, _ = python_fingerprint_match(probe, records)
+            row, numpy_score = find_best_match(probe, gallery)
+            self.assertEqual(int(gallery.template_ids[row]), voter)
+            self.assertEqual(round(numpy_score, 2), score)
+
+    def test_best_match_small_gallery(self):
+        self.assert_best_matches_agree(SMALL_GALLERY)
+
+    def test_best_match_large_gallery(self):
+        self.assert_best_matches_agree(LARGE_GALLERY)
+
+    def test_ties_go_to_the_newest_template(self):
+        rng = np.random.default_rng(2)
+        gallery = synthetic_gallery(rng, SMALL_GALLERY)
+        # Rows 3, 10 and 40 hold the same template (e.g. a re-enrolment)
+        gallery.templates[[10, 40]] = gallery.templates[3]
+        gallery.histograms[[10, 40]] = gallery.histograms[3]
+        probe = add_noise(rng, gallery.templates[3:4], 0.1)[0].tobytes()
+
+        row, score = find_best_match(probe, gallery)
+        self.assertEqual(row, 40)
+
+        # The reference loop keeps the first best record, which is also the
+        # newest in FingerprintTemplate's default ordering
+        newest_first = [
+            SimpleNamespace(template=gallery.templates[row].tobytes(), voter=int(gallery.template_ids[row]))
+            for row in reversed(range(SMALL_GALLERY))
+        ]
+        voter, python_score, _ = python_fingerprint_match(probe, newest_first)
+        self.assertEqual((voter, python_score), (int(gallery.template_ids[40]), round(score, 2)))
+        voter, _, _ = python_fingerprint_match(probe, newest_first[::-1])
+        self.assertEqual(voter, int(gallery.template_ids[3]))
+
+
+class MatchingBenchmarkTests(SimpleTestCase):
+    """
+    Runs of benchmark_matching on small and large synthetic galleries. The
+    timings are not asserted; the runs check that both engines see the same
+    data and reach the same decisions.
+    """
+
+    def benchmark(self, engine, sizes, queries=8):
+        out = io.StringIO()
+        call_command(
+            'benchmark_matching', sizes=sizes, queries=queries, engine=engine,
+            top_k=0, workers=0, stdout=out, stderr=io.StringIO()
+        )
+        return {result['gallery_size']: result for result in json.loads(out.getvalue())['results']}
+
+    def test_numpy_benchmark(self):
+        results = self.benchmark('numpy', f'{SMALL_GALLERY},{LARGE_GALLERY}')
+        for size in (SMALL_GALLERY, LARGE_GALLERY):
+            result = results[size]
+            self.assertEqual((result['far'], result['frr']), (0.0, 0.0))
+            self.assertGreater(result['throughput_qps'], 0)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['max'])
+
+    def test_python_and_numpy_benchmarks_agree(self):
+        python = self.benchmark('python', str(SMALL_GALLERY))[SMALL_GALLERY]
+        numpy = self.benchmark('numpy', str(SMALL_GALLERY))[SMALL_GALLERY]
+        for key in ('far', 'frr', 'genuine_score', 'impostor_score'):
+            self.assertEqual(python[key], numpy[key], key)
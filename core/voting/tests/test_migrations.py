@@ -0,0 +1,49 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class StructuredActivityLogMigrationTests(TransactionTestCase):
+    """0020 fills the structured ActivityLog columns from the logged messages."""
+
+    before = [('voting', '0019_activitylog_timestamp_default')]
+    after = [('voting', '0020_activitylog_structured')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        apps = self.migrate(self.before)
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes('voting'))
+        Voter = apps.get_model('voting', 'Voter')
+        ActivityLog = apps.get_model('voting', 'ActivityLog')
+
+        self.voter = Voter.objects.create(voter_id='V000001', name='Voter One', fingerprint_id='1')
+        actions = [
+            f'Successful vote by voter_id={self.voter.pk}',
+            'Fingerprint match successful: Voter One (ID: V000001) - Score: 91.25, Type: exact_match',
+            'Fingerprint authentication failed - Best score: 42.5.',
+            'Scan trigger created for voter ID V000001 (register) at station booth-2',
+            # Names a voter that has since been deleted
+            'Double voting attempt by voter_id=999999',
+            'Something nobody parses',
+        ]
+        self.log_ids = [ActivityLog.objects.create(action=action).pk for action in actions]
+
+    def test_backfill(self):
+        apps = self.migrate(self.after)
+        ActivityLog = apps.get_model('voting', 'ActivityLog')
+        rows = ActivityLog.objects.in_bulk(self.log_ids)
+        fields = lambda log: (log.event_type, log.outcome, log.voter_id, log.score, log.station)
+
+        self.assertEqual([fields(rows[pk]) for pk in self.log_ids], [
+            ('vote', 'success', self.voter.pk, None, ''),
+            ('match', 'success', self.voter.pk, 91.25, ''),
+            ('authentication', 'failure', None, 42.5, ''),
+            ('scan_trigger', 'success', self.voter.pk, None, 'booth-2'),
+            ('vote', 'already_voted', None, None, ''),
+            ('other', '', None, None, ''),
+        ])
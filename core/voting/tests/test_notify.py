@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from voting.models import ScanTrigger
+from voting.notify import NotifierGroup, scan_results
+
+
+class NotifierGroupTests(SimpleTestCase):
+    def test_notify_only_wakes_the_key(self):
+        group = NotifierGroup()
+        with group.subscribe(1) as first, group.subscribe(2) as second:
+            first_version, second_version = first.version, second.version
+            group.notify(2)
+            self.assertFalse(first.wait(first_version, 0))
+            self.assertTrue(second.wait(second_version, 0))
+
+    def test_key_is_dropped_after_its_last_subscriber(self):
+        group = NotifierGroup()
+        with group.subscribe(1) as notifier:
+            with group.subscribe(1) as again:
+                self.assertIs(again, notifier)
+            self.assertEqual(len(group), 1)
+        self.assertEqual(len(group), 0)
+
+        # Nobody waiting: nothing is created
+        group.notify(1)
+        self.assertEqual(len(group), 0)
+
+    def test_wait_async_is_woken_by_its_key(self):
+        group = NotifierGroup()
+
+        async def wait():
+            with group.subscribe(7) as notifier:
+                version = notifier.version
+                asyncio.get_running_loop().call_later(0.01, group.notify, 7)
+                return await notifier.wait_async(version, 5)
+
+        self.assertTrue(asyncio.run(wait()))
+
+
+class ScanResultStreamTests(TestCase):
+    async def stream(self, trigger):
+        response = await self.async_client.get(reverse('voting:scan-result-stream'), {'trigger_id': trigger.pk})
+        return [chunk.decode() async for chunk in response.streaming_content]
+
+    async def test_used_trigger_gets_its_result_and_the_key_is_dropped(self):
+        trigger = await ScanTrigger.objects.acreate(
+            action='match', station='booth-1', used=True, match_status='not_found'
+        )
+
+        chunks = await self.stream(trigger)
+
+        self.assertTrue(chunks[-1].startswith('event: result\n'))
+        payload = json.loads(chunks[-1].split('data: ', 1)[1])
+        self.assertEqual(payload['status'], 'error')
+        self.assertEqual(len(scan_results), 0)
+
+    async def test_timed_out_stream_drops_its_key(self):
+        trigger = await ScanTrigger.objects.acreate(action='match', station='booth-1')
+
+        with self.settings(SCAN_RESULT_STREAM_TIMEOUT=0.05, SCAN_RESULT_KEEPALIVE=0.01):
+            chunks = await self.stream(trigger)
+
+        self.assertEqual(chunks[-1], 'event: timeout\ndata: {}\n\n')
+        self.assertEqual(len(scan_results), 0)
@@ -0,0 +1,60 @@
+from multiprocessing import shared_memory
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from voting.matching import TemplateGallery, byte_histograms, find_best_match
+from voting.parallel import MIN_ROWS_PER_SHARD, ParallelMatcher
+
+
+def random_gallery(rng, rows, first_id=1):
+    templates = rng.integers(0, 256, (rows, 512), dtype=np.uint8)
+    template_ids = np.arange(first_id, first_id + rows, dtype=np.int64)
+    return TemplateGallery(templates, template_ids, list(template_ids), histograms=byte_histograms(templates))
+
+
+def segment_exists(name):
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    return True
+
+
+class ParallelMatcherTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        # Two shards each with two workers
+        self.file_gallery = random_gallery(rng, 2 * MIN_ROWS_PER_SHARD)
+        self.overlay_gallery = random_gallery(rng, 2 * MIN_ROWS_PER_SHARD, first_id=100000)
+        self.matcher = ParallelMatcher(workers=2)
+        self.addCleanup(self.matcher.close)
+
+    def probe(self, gallery, row):
+        return gallery.templates[row].tobytes()
+
+    def test_alternating_galleries_are_published_once(self):
+        with mock.patch.object(self.matcher, '_publish', wraps=self.matcher._publish) as publish:
+            for row in (3, 2500, 4000):
+                for gallery in (self.file_gallery, self.overlay_gallery):
+                    probe = self.probe(gallery, row)
+                    self.assertEqual(
+                        self.matcher.find_best_match(probe, gallery),
+                        find_best_match(probe, gallery)
+                    )
+        self.assertEqual(publish.call_count, 2)
+
+    def test_evicted_gallery_is_released_after_in_flight_requests(self):
+        self.matcher.max_galleries = 1
+        in_flight = self.matcher._acquire(self.file_gallery)
+        names = [spec[0] for _, spec in in_flight.shards]
+
+        # Pushes the file gallery out while a request still holds it
+        probe = self.probe(self.overlay_gallery, 10)
+        self.assertEqual(self.matcher.find_best_match(probe, self.overlay_gallery)[0], 10)
+        self.assertTrue(all(segment_exists(name) for name in names))
+
+        self.matcher._done(in_flight)
+        self.assertFalse(any(segment_exists(name) for name in names))
@@ -0,0 +1,38 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from voting import retention
+from voting.models import ScanTrigger
+
+
+@override_settings(RETENTION_PURGE_INTERVAL=60)
+class PurgeEntryPointTests(TestCase):
+    def test_loading_the_app_does_not_start_the_purge_thread(self):
+        with mock.patch.object(retention, 'start_purge_thread') as start:
+            apps.get_app_config('voting').ready()
+        start.assert_not_called()
+
+    def test_loop_purges_until_interrupted(self):
+        trigger = ScanTrigger.objects.create(action='match', station='booth-1', used=True)
+        ScanTrigger.objects.filter(pk=trigger.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        # The second sleep stops the loop
+        patch_sleep = mock.patch(
+            'voting.management.commands.purge_expired.time.sleep', side_effect=[None, KeyboardInterrupt]
+        )
+        with patch_sleep as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('purge_expired', loop=True, interval=5, stdout=io.StringIO())
+        self.assertEqual([call.args for call in sleep.call_args_list], [(5,), (5,)])
+        self.assertFalse(ScanTrigger.objects.exists())
+
+    @override_settings(RETENTION_PURGE_INTERVAL=None)
+    def test_loop_needs_an_interval(self):
+        with self.assertRaises(CommandError):
+            call_command('purge_expired', loop=True, interval=None, stdout=io.StringIO())
@@ -0,0 +1,61 @@
+import json
+import re
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from voting.models import ScanTrigger
+
+SKETCH = settings.BASE_DIR.parent / 'Hardware' / 'sketch_jul29a' / 'sketch_jul29a.ino'
+KIOSK_SCRIPTS = [settings.BASE_DIR / 'static' / 'js' / name for name in ('scanner.js', 'scriptreg.js')]
+
+
+class StationDefaultTests(SimpleTestCase):
+    """An out-of-the-box ESP32 and kiosk use the same (default) station."""
+
+    def test_sketch_polls_the_default_station(self):
+        sketch = SKETCH.read_text()
+        self.assertEqual(re.search(r'const char\* STATION = "(.*)";', sketch).group(1), '')
+        self.assertRegex(sketch, r'TRIGGER_URL = .*station="\) \+ STATION;')
+
+    def test_kiosks_fall_back_to_the_default_station(self):
+        for script in KIOSK_SCRIPTS:
+            with self.subTest(script=script.name):
+                self.assertRegex(script.read_text(), r"getItem\('scanStation'\) \?\? '';")
+
+
+class StationQueueTests(TestCase):
+    def trigger_scan(self, **data):
+        response = self.client.post(
+            reverse('voting:trigger_scan'), json.dumps({'action': 'match', **data}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['trigger_id']
+
+    def poll(self, **params):
+        return self.client.get(reverse('voting:get_scan_trigger'), params).json()['id']
+
+    def test_trigger_without_a_station_reaches_the_default_poll(self):
+        trigger_id = self.trigger_scan()
+        self.assertEqual(ScanTrigger.objects.get(pk=trigger_id).station, '')
+        self.assertIsNone(self.poll(station='booth-1'))
+        self.assertEqual(self.poll(), trigger_id)
+
+    def test_new_trigger_only_replaces_its_own_station_pending_scan(self):
+        booth_1 = self.trigger_scan(station='booth-1')
+        booth_2 = self.trigger_scan(station='booth-2')
+        replacement = self.trigger_scan(station='booth-1')
+
+        pending = ScanTrigger.objects.filter(used=False).values_list('pk', flat=True)
+        self.assertEqual(set(pending), {booth_2, replacement})
+        self.assertNotIn(booth_1, pending)
+        self.assertEqual(self.poll(station='booth-2'), booth_2)
+        self.assertEqual(self.poll(station='booth-1'), replacement)
+
+    def test_station_length_is_checked(self):
+        response = self.client.post(
+            reverse('voting:trigger_scan'), json.dumps({'action': 'match', 'station': 'x' * 51}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
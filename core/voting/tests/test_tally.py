@@ -0,0 +1,123 @@
+import io
+import threading
+
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from voting.models import Candidate, CandidateTally, Post, Vote, Voter
+from voting.tally import add_votes, rebuild_tallies, tally_counts, tally_mismatches
+
+
+class TallyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(title='President')
+        cls.first, cls.second = [Candidate.objects.create(name=name, post=cls.post) for name in ('First', 'Second')]
+        cls.voters = [
+            Voter.objects.create(voter_id=f'V{number:06}', name=f'Voter {number}', fingerprint_id=str(number))
+            for number in range(3)
+        ]
+
+    def vote(self, voter, candidate):
+        vote = Vote.objects.create(voter=voter, candidate=candidate, post=self.post)
+        add_votes([candidate.pk])
+        return vote
+
+    def test_new_candidates_start_at_zero(self):
+        self.assertEqual(tally_counts(), {self.first.pk: 0, self.second.pk: 0})
+        self.assertEqual(tally_mismatches(), [])
+
+    def test_votes_increment_and_deleted_votes_decrement(self):
+        self.vote(self.voters[0], self.first)
+        deleted = self.vote(self.voters[1], self.first)
+        self.vote(self.voters[2], self.second)
+        self.assertEqual(tally_counts(), {self.first.pk: 2, self.second.pk: 1})
+
+        deleted.delete()
+        self.assertEqual(tally_counts(), {self.first.pk: 1, self.second.pk: 1})
+        self.assertEqual(tally_mismatches(), [])
+
+    def test_one_update_when_the_shard_rows_exist(self):
+        with self.assertNumQueries(1):
+            add_votes([self.first.pk, self.second.pk, self.first.pk], shard=0)
+        self.assertEqual(tally_counts(), {self.first.pk: 1, self.second.pk: 1})
+
+    @override_settings(TALLY_SHARDS=4)
+    def test_missing_shard_rows_are_created(self):
+        add_votes([self.first.pk], shard=3)
+        add_votes([self.first.pk], shard=3)
+        self.assertEqual(CandidateTally.objects.get(candidate=self.first, shard=3).votes, 2)
+        self.assertEqual(tally_counts()[self.first.pk], 2)
+
+    def test_mismatches_are_reported_and_rebuilt(self):
+        self.vote(self.voters[0], self.first)
+        # Votes written behind the tallies' back, e.g. by a restore
+        Vote.objects.create(voter=self.voters[1], candidate=self.second, post=self.post)
+        CandidateTally.objects.filter(candidate=self.first).delete()
+
+        expected = [(self.first.pk, None, 1), (self.second.pk, 0, 1)]
+        self.assertEqual(tally_mismatches(), expected)
+        self.assertEqual(rebuild_tallies(), expected)
+        self.assertEqual(tally_counts(), {self.first.pk: 1, self.second.pk: 1})
+        self.assertEqual(tally_mismatches(), [])
+        self.assertEqual(rebuild_tallies(), [])
+
+    @override_settings(TALLY_SHARDS=3)
+    def test_rebuilt_candidate_gets_every_shard(self):
+        Vote.objects.create(voter=self.voters[0], candidate=self.first, post=self.post)
+        rebuild_tallies()
+        self.assertEqual(
+            list(CandidateTally.objects.filter(candidate=self.first).order_by('shard').values_list('shard', 'votes')),
+            [(0, 1), (1, 0), (2, 0)]
+        )
+
+    def test_tally_votes_command(self):
+        Vote.objects.create(voter=self.voters[0], candidate=self.first, post=self.post)
+        with self.assertRaisesMessage(CommandError, '1 tallies do not match the votes'):
+            call_command('tally_votes', verify=True, stdout=io.StringIO())
+
+        out = io.StringIO()
+        call_command('tally_votes', stdout=out)
+        self.assertIn('1 corrected', out.getvalue())
+        call_command('tally_votes', verify=True, stdout=io.StringIO())
+
+
+@override_settings(TALLY_SHARDS=4)
+class ShardedTallyTests(TransactionTestCase):
+    """Concurrent ballots spread over the shards and none of their votes are lost."""
+
+    THREADS = 8
+    BALLOTS_PER_THREAD = 25
+
+    def setUp(self):
+        post = Post.objects.create(title='President')
+        self.candidates = [Candidate.objects.create(name=name, post=post).pk for name in ('First', 'Second')]
+
+    def test_concurrent_ballots_sum_to_the_votes_cast(self):
+        errors = []
+        start = threading.Barrier(self.THREADS)
+
+        def cast():
+            try:
+                start.wait()
+                for _ in range(self.BALLOTS_PER_THREAD):
+                    with transaction.atomic():
+                        add_votes(self.candidates)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=cast) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        ballots = self.THREADS * self.BALLOTS_PER_THREAD
+        self.assertEqual(tally_counts(), {candidate_id: ballots for candidate_id in self.candidates})
+        used_shards = set(CandidateTally.objects.filter(votes__gt=0).values_list('shard', flat=True))
+        self.assertGreater(len(used_shards), 1)
+        self.assertLessEqual(used_shards, set(range(4)))
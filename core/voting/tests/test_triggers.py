@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from voting import websocket
+from voting.models import ScanTrigger
+from voting.notify import scan_triggers
+from voting.triggers import claim_scan_trigger, until_next_expiry
+
+
+class ClaimScanTriggerTests(TestCase):
+    def setUp(self):
+        self.trigger = ScanTrigger.objects.create(action='match', station='booth-1')
+
+    def expire(self, trigger):
+        ScanTrigger.objects.filter(pk=trigger.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_competing_devices_get_different_triggers(self):
+        older = self.trigger
+        newer = ScanTrigger.objects.create(action='match', station='booth-1')
+
+        self.assertEqual(claim_scan_trigger('booth-1', 'esp-a').pk, newer.pk)
+        self.assertEqual(claim_scan_trigger('booth-1', 'esp-b').pk, older.pk)
+        self.assertIsNone(claim_scan_trigger('booth-1', 'esp-c'))
+        self.assertEqual(
+            dict(ScanTrigger.objects.values_list('pk', 'claimed_by')), {newer.pk: 'esp-a', older.pk: 'esp-b'}
+        )
+
+    def test_other_stations_are_not_claimed(self):
+        self.assertIsNone(claim_scan_trigger('booth-2', 'esp-a'))
+        self.assertIsNone(claim_scan_trigger('', 'esp-a'))
+
+    def test_holder_gets_its_trigger_back_with_a_renewed_lease(self):
+        claimed = claim_scan_trigger('booth-1', 'esp-a', lease=10)
+        again = claim_scan_trigger('booth-1', 'esp-a', lease=60)
+        self.assertEqual(again.pk, claimed.pk)
+        self.assertGreater(again.lease_expires_at, claimed.lease_expires_at)
+
+    def test_without_renew_the_holder_waits_for_the_lease(self):
+        claimed = claim_scan_trigger('booth-1', 'esp-a', renew=False)
+        self.assertIsNone(claim_scan_trigger('booth-1', 'esp-a', renew=False))
+        self.assertEqual(ScanTrigger.objects.get(pk=claimed.pk).lease_expires_at, claimed.lease_expires_at)
+
+        self.expire(claimed)
+        self.assertEqual(claim_scan_trigger('booth-1', 'esp-a', renew=False).pk, claimed.pk)
+
+    def test_expired_lease_is_reclaimed_by_another_device(self):
+        claim_scan_trigger('booth-1', 'esp-a')
+        self.assertIsNone(claim_scan_trigger('booth-1', 'esp-b'))
+
+        self.expire(self.trigger)
+        reclaimed = claim_scan_trigger('booth-1', 'esp-b')
+        self.assertEqual((reclaimed.pk, reclaimed.claimed_by), (self.trigger.pk, 'esp-b'))
+        self.assertIsNone(claim_scan_trigger('booth-1', 'esp-a', renew=False))
+
+    def test_used_triggers_are_not_claimed(self):
+        ScanTrigger.objects.filter(pk=self.trigger.pk).update(used=True)
+        self.assertIsNone(claim_scan_trigger('booth-1', 'esp-a'))
+
+    def test_wait_is_cut_short_by_the_next_lease_expiry(self):
+        self.assertEqual(until_next_expiry('booth-1', 30), 30)
+        claim_scan_trigger('booth-1', 'esp-a', lease=5)
+        self.assertLess(until_next_expiry('booth-1', 30), 5.1)
+
+
+@override_settings(SCAN_TRIGGER_LEASE_SECONDS=0.5, SCAN_TRIGGER_RECHECK_INTERVAL=5)
+class PushedTriggerLeaseTests(TransactionTestCase):
+    """The WebSocket pusher sends a trigger once per lease and never renews it."""
+
+    def push_for(self, seconds, device='esp-a'):
+        sent = []
+
+        async def send(message):
+            sent.append(json.loads(message['text'])['id'])
+
+        async def run():
+            task = asyncio.ensure_future(websocket._push_triggers('booth-1', device, send))
+            await asyncio.sleep(seconds)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run(run())
+        return sent
+
+    def test_unused_trigger_is_pushed_again_after_its_lease(self):
+        trigger = ScanTrigger.objects.create(action='match', station='booth-1')
+
+        # Sent at once and again when the 0.5s lease runs out; a renewed
+        # lease would have kept it from ever going out again
+        self.assertEqual(self.push_for(0.8), [trigger.pk, trigger.pk])
+
+    def test_pushed_trigger_is_leased_to_the_connection(self):
+        trigger = ScanTrigger.objects.create(action='match', station='booth-1')
+        self.assertEqual(self.push_for(0.1), [trigger.pk])
+        self.assertIsNone(claim_scan_trigger('booth-1', 'esp-b'))
+        self.assertEqual(ScanTrigger.objects.get(pk=trigger.pk).claimed_by, 'esp-a')
+
+    def test_expired_push_can_be_claimed_by_another_device(self):
+        trigger = ScanTrigger.objects.create(action='match', station='booth-1')
+        self.assertEqual(self.push_for(0.1), [trigger.pk])
+
+        ScanTrigger.objects.filter(pk=trigger.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_scan_trigger('booth-1', 'esp-b').claimed_by, 'esp-b')
+        self.assertEqual(self.push_for(0.1), [])
+
+
+@override_settings(SCAN_TRIGGER_RECHECK_INTERVAL=None)
+class LongPollTests(TransactionTestCase):
+    """/api/scan-trigger/?wait=N is woken by a trigger for its own station only."""
+
+    def poll(self, station, wait):
+        started = time.monotonic()
+        response = self.client.get(reverse('voting:get_scan_trigger'), {'station': station, 'wait': wait})
+        return response.json()['id'], time.monotonic() - started
+
+    def create_later(self, station, delay=0.2):
+        def create():
+            try:
+                ScanTrigger.objects.create(action='match', station=station)
+            finally:
+                connection.close()
+        timer = threading.Timer(delay, create)
+        timer.start()
+        self.addCleanup(timer.join)
+        return timer
+
+    def test_pending_trigger_is_returned_at_once(self):
+        trigger = ScanTrigger.objects.create(action='match', station='booth-1')
+        trigger_id, elapsed = self.poll('booth-1', 5)
+        self.assertEqual(trigger_id, trigger.pk)
+        self.assertLess(elapsed, 1)
+
+    def test_new_trigger_wakes_the_waiting_request(self):
+        self.create_later('booth-1')
+        trigger_id, elapsed = self.poll('booth-1', 5)
+
+        self.assertEqual(trigger_id, ScanTrigger.objects.get().pk)
+        self.assertLess(elapsed, 2)
+
+    def test_wait_times_out_without_a_trigger(self):
+        trigger_id, elapsed = self.poll('booth-1', 0.3)
+        self.assertIsNone(trigger_id)
+        self.assertGreaterEqual(elapsed, 0.3)
+
+    def test_other_stations_do_not_wake_the_request(self):
+        version = scan_triggers['booth-1'].version
+        self.create_later('booth-2').join()
+        self.assertEqual(scan_triggers['booth-1'].version, version)
+
+        self.create_later('booth-2', delay=0.1)
+        trigger_id, elapsed = self.poll('booth-1', 0.5)
+        self.assertIsNone(trigger_id)
+        self.assertGreaterEqual(elapsed, 0.5)
+        self.assertEqual(ScanTrigger.objects.filter(station='booth-2', claimed_by='').count(), 2)
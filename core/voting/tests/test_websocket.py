@@ -0,0 +1,85 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase
+
+from voting import websocket
+
+
+class PushTriggersTests(SimpleTestCase):
+    def run_pusher(self, claim, stop_after_sends=None):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def wait_timeout(station, timeout):
+            return 0.01
+
+        async def run():
+            task = asyncio.ensure_future(websocket._push_triggers('booth-9', 'esp-1', send))
+            for _ in range(200):
+                await asyncio.sleep(0.01)
+                if task.done() or (stop_after_sends and len(sent) >= stop_after_sends):
+                    break
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        with mock.patch.object(websocket, '_claim_trigger', side_effect=claim), \
+                mock.patch.object(websocket, '_wait_timeout', wait_timeout), \
+                mock.patch.object(websocket, 'PUSH_RETRY_DELAYS', (0, 0)):
+            asyncio.run(run())
+        return sent
+
+    def test_retries_after_a_failure(self):
+        trigger = {'type': 'trigger', 'id': 7, 'action': 'match', 'voter_id': None}
+        calls = []
+
+        async def claim(station, device):
+            calls.append(station)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return trigger if len(calls) == 2 else None
+
+        sent = self.run_pusher(claim, stop_after_sends=1)
+        self.assertEqual([json.loads(message['text']) for message in sent], [trigger])
+
+    def test_closes_the_socket_when_failures_persist(self):
+        async def claim(station, device):
+            raise OperationalError('database is locked')
+
+        sent = self.run_pusher(claim)
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 1011}])
+
+
+class StationWebsocketTests(SimpleTestCase):
+    def connect(self, query_string=b'station=booth-9'):
+        devices = []
+
+        def push_triggers(station, device, send):
+            devices.append(device)
+            return asyncio.sleep(0)
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            pass
+
+        messages = [{'type': 'websocket.connect'}, {'type': 'websocket.disconnect'}]
+        scope = {'type': 'websocket', 'query_string': query_string, 'client': ('10.0.0.7', 51234)}
+        with mock.patch.object(websocket, '_push_triggers', push_triggers):
+            asyncio.run(websocket.station_websocket(scope, receive, send))
+        return devices
+
+    def test_device_defaults_to_the_client_address_without_port(self):
+        # A reconnect comes from a new port but must claim as the same device
+        self.assertEqual(self.connect(), ['10.0.0.7'])
+
+    def test_device_parameter_wins(self):
+        self.assertEqual(self.connect(b'station=booth-9&device=esp-1'), ['esp-1'])
@@ -0,0 +1,79 @@
+"""
+Claiming scan triggers with a lease.
+
+A station that fetches a trigger claims it: the row gets ``claimed_by`` and
+``lease_expires_at`` and stays invisible to other devices until it is used
+or the lease runs out, after which it is handed out again.
+
+The claim is a conditional UPDATE (compare-and-set on the lease column the
+poller just read), so it needs no row locks and behaves the same on SQLite
+and PostgreSQL: when two devices race for the same row exactly one UPDATE
+matches and the other retries with the next candidate.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import ScanTrigger
+
+# Candidates tried before giving up on a poll that keeps losing races
+CLAIM_ATTEMPTS = 5
+
+
+def lease_seconds():
+    return getattr(settings, 'SCAN_TRIGGER_LEASE_SECONDS', 60)
+
+
+def claim_scan_trigger(station: str, device: str, lease: float = None, renew: bool = True):
+    """
+    Claim the newest unused trigger of ``station`` for ``device``.
+
+    Triggers already claimed by ``device`` are returned again (with the
+    lease renewed), so a device that lost a response does not lock itself
+    out. With ``renew=False`` they are not: a caller that already has them
+    lets the lease run out, after which they can be claimed again by any
+    device. Returns the claimed ScanTrigger or None.
+    """
+    lease = lease_seconds() if lease is None else lease
+    for _ in range(CLAIM_ATTEMPTS):
+        now = timezone.now()
+        claimable = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+        if renew:
+            claimable |= Q(claimed_by=device)
+        candidate = (
+            ScanTrigger.objects
+            .filter(station=station, used=False)
+            .filter(claimable)
+            .order_by('-created_at')
+            .values_list('id', 'lease_expires_at')
+            .first()
+        )
+        if candidate is None:
+            return None
+
+        trigger_id, seen_lease = candidate
+        expires_at = now + timedelta(seconds=lease)
+        unchanged = Q(lease_expires_at__isnull=True) if seen_lease is None else Q(lease_expires_at=seen_lease)
+        claimed = ScanTrigger.objects.filter(unchanged, pk=trigger_id, used=False).update(
+            claimed_by=device, lease_expires_at=expires_at
+        )
+        if claimed:
+            return ScanTrigger.objects.get(pk=trigger_id)
+    return None
+
+
+def until_next_expiry(station: str, timeout: float) -> float:
+    """
+    ``timeout`` shortened to when the earliest active lease of ``station``
+    runs out, so waiting pollers pick up re-queued triggers on time.
+    """
+    expires = (
+        ScanTrigger.objects
+        .filter(station=station, used=False, lease_expires_at__gt=timezone.now())
+        .aggregate(expires=Min('lease_expires_at'))['expires']
+    )
+    if expires is None:
+        return timeout
+    return min(timeout, max((expires - timezone.now()).total_seconds(), 0.0) + 0.01)
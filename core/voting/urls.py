@@ -23,11 +23,13 @@ urlpatterns = [
     path('register-voter/', views.register_voter, name='register_voter'),
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('register-voter/new/', views.new_voter, name='new_voter'),
+    path('export/<str:name>.<str:fmt>', views.export_data, name='export_data'),  # Streaming CSV/JSON export
 
     # ESP32 & Fingerprint Sensor API Endpoints
     
     path("api/upload-template/", views.upload_template, name="upload_template"),  # Receive fingerprint template from ESP32
     path("api/match-template/", views.match_template, name="match_template"),     # Match incoming fingerprint template
+    path("api/match-template/batch/", views.match_template_batch, name="match_template_batch"),  # Match scans buffered by a station
     path('api/trigger-scan/', views.trigger_scan, name='trigger_scan'),           # Create scan trigger (admin)
     path('api/scan-trigger/', views.get_scan_trigger, name='get_scan_trigger'),   # ESP32 polls this for scan trigger
     path('api/latest-scanned-template/', views.get_latest_scanned_template, name='get_latest_scanned_template'),  # Get latest scanned template
@@ -36,6 +38,7 @@ urlpatterns = [
     path('api/match-template/', views.match_template, name='match_template'),
     path('voter-home/<str:voter_id>/', views.voter_home_with_id, name='voter_home_with_id'),
     path('api/scan-result/',views.scan_result, name='scan-result'),
+    path('api/scan-result/stream/', views.scan_result_stream, name='scan-result-stream'),  # SSE push of the scan result
 
     # ==========================
     # Voting API Endpoints
@@ -1,10 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils.timezone import now
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods, require_GET
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
 from .forms import VoterRegistrationForm
 from rest_framework import status, permissions, generics, views
 from rest_framework.response import Response
@@ -21,11 +22,23 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 from .models import FingerprintTemplate, ActivityLog, ScanTrigger
+from .audit import log_activity
 import base64
+import time
+import numpy as np
 from django.db import transaction
 from django.views.decorators.csrf import csrf_protect
 from .models import Voter, Candidate, Vote, Post, VotingSession
 from django.utils import timezone
+from django.conf import settings
+from .gallery import NO_VOTER, find_duplicates, gallery_cache, match_gallery, match_gallery_batch
+from .matching import PATTERN_LENGTH, TemplateGallery, classify_match
+from .notify import scan_results, scan_triggers
+from .triggers import claim_scan_trigger, until_next_expiry
+from .ballot import AlreadyVotedError, ballot_cache, commit_ballot
+from .tally import tally_counts
+from .export import EXPORTS, FORMATS, async_stream, export_stream
+from django.core.handlers.asgi import ASGIRequest
 
 
 from django.shortcuts import render, redirect, get_object_or_404
@@ -91,9 +104,12 @@ def register_voter(request):
 @staff_member_required
 def admin_dashboard(request):
     total_voters = Voter.objects.count()
-    total_candidates = Candidate.objects.count()
-    total_votes = Vote.objects.count()
-    vote_counts = Candidate.objects.annotate(num_votes=Count('vote')).order_by('-num_votes')
+    # Live tallies (voting/tally.py): a few shard rows per candidate, no scan of the votes table
+    vote_counts = list(
+        Candidate.objects.annotate(num_votes=Coalesce(Sum('tallies__votes'), 0)).order_by('-num_votes')
+    )
+    total_candidates = len(vote_counts)
+    total_votes = sum(candidate.num_votes for candidate in vote_counts)
     context = {
         'total_voters': total_voters,
         'total_candidates': total_candidates,
@@ -103,6 +119,26 @@ def admin_dashboard(request):
     return render(request, 'voting/admin_dashboard.html', context)
 
 
+@staff_member_required
+@require_GET
+def export_data(request, name, fmt):
+    """
+    Stream an export (votes, tallies, voters, activity) as CSV or JSON,
+    e.g. /export/votes.csv; see voting/export.py.
+    """
+    if name not in EXPORTS or fmt not in FORMATS:
+        return JsonResponse({'error': f'Unknown export {name}.{fmt}'}, status=404)
+    print(f"📤 Exporting {name} as {fmt} for {request.user}")
+    stream = export_stream(name, fmt)
+    if isinstance(request, ASGIRequest):
+        stream = async_stream(stream)
+    response = StreamingHttpResponse(stream, content_type=f'{FORMATS[fmt]}; charset=utf-8')
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def home(request):
     return render(request, 'voting/home.html')
 
@@ -122,25 +158,28 @@ def voter_home(request):
     return render(request, 'voting/voter_home.html', {'voter': voter})
 
 def candidate_list(request):
-    posts = Post.objects.prefetch_related('candidates').all()
+    posts = ballot_cache.get().posts
     return render(request, 'voting/candidate_list.html', {'posts': posts})
 
 
 @api_view(['GET'])
 def posts_list(request):
-    posts = Post.objects.all()
-    serializer = PostSerializer(posts, many=True)
-    return Response(serializer.data)
+    return Response(ballot_cache.get().posts_data)
 
 
 @api_view(['GET'])
 def candidates_list(request):
     post_id = request.GET.get('post_id')
-    candidates = Candidate.objects.select_related('post').all()
+    candidates = ballot_cache.get().candidates_data
     if post_id:
-        candidates = candidates.filter(post_id=post_id)
-    serializer = CandidateSerializer(candidates, many=True)
-    return Response(serializer.data)
+        candidates = [candidate for candidate in candidates if str(candidate['post']['id']) == post_id]
+    return Response(candidates)
+
+
+def log_rejected_votes(voter_id, rejected):
+    """One ActivityLog entry per ballot item commit_ballot skipped."""
+    for _, reason in rejected:
+        log_activity(f'Vote error for voter_id={voter_id}: {reason}', event_type='vote', outcome='rejected', voter=voter_id)
 
 
 @api_view(['POST'])
@@ -148,13 +187,13 @@ def vote_view(request):
     """Accepts selected candidate IDs, stores vote. Requires session-based authentication."""
     voter_id = request.session.get('authenticated_voter_id')
     if not voter_id:
-        ActivityLog.objects.create(action='Vote attempt without authentication')
+        log_activity('Vote attempt without authentication', event_type='vote', outcome='rejected')
         return Response({'detail': 'Authentication required.'}, status=401)
     
     try:
         voter = Voter.objects.get(id=voter_id)
         if voter.has_voted:
-            ActivityLog.objects.create(action=f'Double voting attempt by voter_id={voter_id}')
+            log_activity(f'Double voting attempt by voter_id={voter_id}', event_type='vote', outcome='already_voted', voter=voter_id)
             return Response({'detail': 'Already voted.'}, status=400)
         
         votes = request.data.get('votes', [])
@@ -163,54 +202,42 @@ def vote_view(request):
         
         session = VotingSession.objects.filter(is_active=True).first()
         if not session:
-            ActivityLog.objects.create(action=f'Vote attempt outside session by voter_id={voter_id}')
+            log_activity(f'Vote attempt outside session by voter_id={voter_id}', event_type='vote', outcome='rejected', voter=voter_id)
             return Response({'detail': 'Voting is not active.'}, status=403)
         
-        for vote_item in votes:
-            post_id = vote_item.get('post')
-            candidate_id = vote_item.get('candidate')
-            if not post_id or not candidate_id:
-                continue
-            try:
-                post = Post.objects.get(id=post_id)
-                candidate = Candidate.objects.get(id=candidate_id, post=post)
-                Vote.objects.create(voter=voter, candidate=candidate, post=post)
-            except (Post.DoesNotExist, Candidate.DoesNotExist) as e:
-                ActivityLog.objects.create(action=f'Vote error for voter_id={voter_id}: {str(e)}')
-                continue
-        
-        voter.has_voted = True
-        voter.last_vote_attempt = timezone.now()
-        voter.save()
-        ActivityLog.objects.create(action=f'Successful vote by voter_id={voter_id}')
+        voter, _, rejected = commit_ballot(voter, votes)
+        log_rejected_votes(voter_id, rejected)
+        log_activity(f'Successful vote by voter_id={voter_id}', event_type='vote', outcome='success', voter=voter)
         
         return Response({'detail': 'Vote cast successfully.', 'name': voter.name, 'timestamp': voter.last_vote_attempt})
         
+    except AlreadyVotedError:
+        log_activity(f'Double voting attempt by voter_id={voter_id}', event_type='vote', outcome='already_voted', voter=voter_id)
+        return Response({'detail': 'Already voted.'}, status=400)
     except Voter.DoesNotExist:
-        ActivityLog.objects.create(action=f'Vote attempt by non-existent voter_id={voter_id}')
+        log_activity(f'Vote attempt by non-existent voter_id={voter_id}', event_type='vote', outcome='rejected')
         return Response({'detail': 'Voter not found.', 'voter_id': voter_id}, status=404)
     except Exception as e:
-        ActivityLog.objects.create(action=f'Vote error for voter_id={voter_id}: {str(e)}')
+        log_activity(f'Vote error for voter_id={voter_id}: {str(e)}', event_type='vote', outcome='error')
         return Response({'detail': f'Vote error: {str(e)}', 'voter_id': voter_id}, status=400)
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def results_view(request):
-    posts = Post.objects.prefetch_related('candidates__vote_set').all()
+    ballot = ballot_cache.get()
+    tallies = tally_counts()
+    candidates_by_post = {}
+    for candidate in ballot.candidates_data:
+        candidates_by_post.setdefault(candidate['post']['id'], []).append({
+            'candidate': candidate,
+            'votes': tallies.get(candidate['id'], 0)
+        })
     results = []
-    for post in posts:
-        candidates = post.candidates.all()
-        candidate_results = []
-        for candidate in candidates:
-            votes = candidate.vote_set.count()  # uses prefetched vote_set
-            candidate_results.append({
-                'candidate': CandidateSerializer(candidate).data,
-                'votes': votes
-            })
+    for post in ballot.posts_data:
         results.append({
-            'post': PostSerializer(post).data,
-            'candidates': candidate_results
+            'post': post,
+            'candidates': candidates_by_post.get(post['id'], [])
         })
     return Response(results)
 
@@ -226,7 +253,7 @@ def register_candidate(request):
 @permission_classes([IsAdminUser])
 def dashboard_view(request):
     total_voters = Voter.objects.count()
-    total_votes = Vote.objects.count()
+    total_votes = sum(tally_counts().values())
     total_candidates = Candidate.objects.count()
     session = VotingSession.objects.filter(is_active=True).first()
     data = {
@@ -253,8 +280,7 @@ def authenticate_fingerprint(request):
             return Response({'error': 'Invalid template_hex format'}, status=400)
         
         # Use simplified fingerprint matching algorithm
-        templates = FingerprintTemplate.objects.select_related('voter').all()
-        matched_voter, confidence_score, match_type = advanced_fingerprint_match(incoming_template, templates)
+        matched_voter, confidence_score, match_type = advanced_fingerprint_match(incoming_template)
         
         # Balanced threshold for security while maintaining usability
         MINIMUM_CONFIDENCE_THRESHOLD = 65.0
@@ -262,8 +288,9 @@ def authenticate_fingerprint(request):
         if matched_voter and confidence_score >= MINIMUM_CONFIDENCE_THRESHOLD:
             # Check if voter has already voted
             if matched_voter.has_voted:
-                ActivityLog.objects.create(
-                    action=f'Authentication attempt by already voted voter: {matched_voter.name} (ID: {matched_voter.voter_id})'
+                log_activity(
+                    f'Authentication attempt by already voted voter: {matched_voter.name} (ID: {matched_voter.voter_id})',
+                    event_type='authentication', outcome='already_voted', voter=matched_voter, score=confidence_score
                 )
                 return Response({
                     'status': 'already_voted',
@@ -274,8 +301,9 @@ def authenticate_fingerprint(request):
                 })
             
             # Log successful authentication
-            ActivityLog.objects.create(
-                action=f'Fingerprint authentication successful: {matched_voter.name} (ID: {matched_voter.voter_id}) - Score: {confidence_score:.2f}'
+            log_activity(
+                f'Fingerprint authentication successful: {matched_voter.name} (ID: {matched_voter.voter_id}) - Score: {confidence_score:.2f}',
+                event_type='authentication', outcome='success', voter=matched_voter, score=confidence_score
             )
             
             return Response({
@@ -288,8 +316,9 @@ def authenticate_fingerprint(request):
             })
         else:
             # Log failed authentication attempt
-            ActivityLog.objects.create(
-                action=f'Fingerprint authentication failed - Best score: {confidence_score:.2f}, Match type: {match_type}'
+            log_activity(
+                f'Fingerprint authentication failed - Best score: {confidence_score:.2f}, Match type: {match_type}',
+                event_type='authentication', outcome='failure', score=confidence_score
             )
             
             return Response({
@@ -300,7 +329,7 @@ def authenticate_fingerprint(request):
             }, status=404)
           
     except Exception as e:
-        ActivityLog.objects.create(action=f'Fingerprint authentication error: {str(e)}')
+        log_activity(f'Fingerprint authentication error: {str(e)}', event_type='authentication', outcome='error')
         print(f"❌ Error in authenticate_fingerprint: {e}")
         return Response({'error': str(e)}, status=500)
 
@@ -407,7 +436,7 @@ def scanner(request):
 
 
 def election_view(request):
-    posts = Post.objects.prefetch_related('candidates').all()
+    posts = ballot_cache.get().posts
     if request.method == 'POST':
         return redirect('voting:thankyou')
     return render(request, 'voting/election.html', {'posts': posts})
@@ -435,8 +464,7 @@ def already_voted(request):
 
 
 def dashboard(request):
-    from .models import Post
-    posts = Post.objects.prefetch_related('candidates').all()
+    posts = ballot_cache.get().posts
     session_countdown = 300
     return render(request, 'voting/election.html', {'posts': posts, 'session_countdown': session_countdown})
 
@@ -452,7 +480,10 @@ def authenticate_voter(request):
         try:
             voter = Voter.objects.get(fingerprint_id=fingerprint_id)
             if voter.has_voted:
-                ActivityLog.objects.create(action=f'Authentication attempt by already voted voter_id={voter.id}')
+                log_activity(
+                    f'Authentication attempt by already voted voter_id={voter.id}',
+                    event_type='authentication', outcome='already_voted', voter=voter
+                )
                 return JsonResponse({
                     'status': 'already_voted',
                     'message': 'You have already voted',
@@ -461,7 +492,7 @@ def authenticate_voter(request):
             # Create session for authenticated voter
             request.session['authenticated_voter_id'] = voter.id
             request.session.modified = True
-            ActivityLog.objects.create(action=f'Authentication success for voter_id={voter.id}')
+            log_activity(f'Authentication success for voter_id={voter.id}', event_type='authentication', outcome='success', voter=voter)
             return JsonResponse({
                 'status': 'authenticated',
                 'message': 'Authentication successful',
@@ -470,7 +501,10 @@ def authenticate_voter(request):
                 'redirect_url': '/vote/'
             })
         except Voter.DoesNotExist:
-            ActivityLog.objects.create(action=f'Authentication attempt with invalid fingerprint_id={fingerprint_id}')
+            log_activity(
+                f'Authentication attempt with invalid fingerprint_id={fingerprint_id}',
+                event_type='authentication', outcome='failure'
+            )
             return JsonResponse({
                 'status': 'not_found',
                 'message': 'Voter not found with this fingerprint ID',
@@ -490,40 +524,29 @@ def submit_vote(request):
         return JsonResponse({'error': 'POST method required'}, status=405)
     voter_id = request.session.get('authenticated_voter_id')
     if not voter_id:
-        ActivityLog.objects.create(action='Vote attempt without authentication')
+        log_activity('Vote attempt without authentication', event_type='vote', outcome='rejected')
         return JsonResponse({'error': 'Authentication required. No authenticated_voter_id in session.'}, status=401)
     try:
         serializer = VoteRequestSerializer(data=json.loads(request.body))
         if not serializer.is_valid():
-            ActivityLog.objects.create(action=f'Invalid vote data by voter_id={voter_id}: {serializer.errors}')
+            log_activity(
+                f'Invalid vote data by voter_id={voter_id}: {serializer.errors}',
+                event_type='vote', outcome='rejected', voter=voter_id
+            )
             return JsonResponse({'error': 'Invalid vote data', 'errors': serializer.errors}, status=400)
-        with transaction.atomic():
-            voter = Voter.objects.select_for_update().get(id=voter_id)
-            if voter.has_voted:
-                ActivityLog.objects.create(action=f'Double voting attempt by voter_id={voter_id}')
-                return JsonResponse({'error': 'Already voted.'}, status=400)
-            votes = serializer.validated_data['votes']
-            # Check voting session
-            session = VotingSession.objects.filter(is_active=True).first()
-            if not session:
-                ActivityLog.objects.create(action=f'Vote attempt outside session by voter_id={voter_id}')
-                return JsonResponse({'error': 'Voting is not active.'}, status=403)
-            for vote_item in votes:
-                post_id = vote_item.get('post')
-                candidate_id = vote_item.get('candidate')
-                if not post_id or not candidate_id:
-                    continue
-                try:
-                    post = Post.objects.get(id=post_id)
-                    candidate = Candidate.objects.get(id=candidate_id, post=post)
-                    Vote.objects.create(voter=voter, candidate=candidate, post=post)
-                except (Post.DoesNotExist, Candidate.DoesNotExist) as e:
-                    ActivityLog.objects.create(action=f'Vote error for voter_id={voter_id}: {str(e)}')
-                    continue
-            voter.has_voted = True
-            voter.last_vote_attempt = timezone.now()
-            voter.save()
-            ActivityLog.objects.create(action=f'Successful vote by voter_id={voter_id}')
+        votes = serializer.validated_data['votes']
+        # Check voting session
+        session = VotingSession.objects.filter(is_active=True).first()
+        if not session:
+            log_activity(f'Vote attempt outside session by voter_id={voter_id}', event_type='vote', outcome='rejected', voter=voter_id)
+            return JsonResponse({'error': 'Voting is not active.'}, status=403)
+        try:
+            voter, _, rejected = commit_ballot(Voter(id=voter_id), votes)
+        except AlreadyVotedError:
+            log_activity(f'Double voting attempt by voter_id={voter_id}', event_type='vote', outcome='already_voted', voter=voter_id)
+            return JsonResponse({'error': 'Already voted.'}, status=400)
+        log_rejected_votes(voter_id, rejected)
+        log_activity(f'Successful vote by voter_id={voter_id}', event_type='vote', outcome='success', voter=voter)
         # Clear session after voting
         request.session.pop('authenticated_voter_id', None)
         return JsonResponse({
@@ -532,13 +555,13 @@ def submit_vote(request):
             'voter_name': voter.name
         })
     except Voter.DoesNotExist:
-        ActivityLog.objects.create(action=f'Vote attempt by non-existent voter_id={voter_id}')
+        log_activity(f'Vote attempt by non-existent voter_id={voter_id}', event_type='vote', outcome='rejected')
         return JsonResponse({'error': 'Voter not found.', 'voter_id': voter_id}, status=404)
     except json.JSONDecodeError:
-        ActivityLog.objects.create(action=f'Invalid JSON in vote by voter_id={voter_id}')
+        log_activity(f'Invalid JSON in vote by voter_id={voter_id}', event_type='vote', outcome='rejected', voter=voter_id)
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        ActivityLog.objects.create(action=f'Vote error for voter_id={voter_id}: {str(e)}')
+        log_activity(f'Vote error for voter_id={voter_id}: {str(e)}', event_type='vote', outcome='error')
         return JsonResponse({'error': f'Vote error: {str(e)}', 'voter_id': voter_id}, status=500)
 
 
@@ -560,36 +583,47 @@ def trigger_scan(request):
         data = json.loads(request.body)
         voter_id = data.get("voter_id")
         action = data.get("action")
+        station = (data.get("station") or "").strip()
         
-        print(f"🔍 Parsed data - voter_id: {voter_id}, action: {action}")
+        print(f"🔍 Parsed data - voter_id: {voter_id}, action: {action}, station: {station!r}")
+
+        if len(station) > 50:
+            return JsonResponse({"error": "station must be at most 50 characters"}, status=400)
 
         if action not in ["register", "match"]:
             print(f"❌ Invalid action: {action}")
             return JsonResponse({"error": "Invalid action"}, status=400)
 
+        voter = None
         if action == "register":
             if not voter_id:
                 print(f"❌ Missing voter_id for register action")
                 return JsonResponse({"error": "voter_id required for registration"}, status=400)
             # New check: voter must exist before allowing registration trigger
-            if not Voter.objects.filter(voter_id=voter_id).exists():
+            voter = Voter.objects.filter(voter_id=voter_id).first()
+            if voter is None:
                 print(f"❌ Voter ID {voter_id} does not exist, cannot create register trigger")
                 return JsonResponse({"error": "Voter does not exist for this voter_id"}, status=400)
 
-        # Mark any previous unused triggers as used to prevent duplicates
-        print(f"🔄 Marking previous unused triggers as used...")
-        ScanTrigger.objects.filter(used=False).update(used=True)
+        # Mark this station's previous unused triggers as used to prevent duplicates;
+        # other stations keep their pending scans
+        print(f"🔄 Marking previous unused triggers of station {station!r} as used...")
+        ScanTrigger.objects.filter(station=station, used=False).update(used=True)
         
         # Create new scan trigger
-        print(f"✅ Creating new trigger with voter_id={voter_id}, action={action}")
+        print(f"✅ Creating new trigger with voter_id={voter_id}, action={action}, station={station!r}")
         trigger = ScanTrigger.objects.create(
             voter_id=voter_id if voter_id else None,
             action=action,
+            station=station,
             used=False
         )
 
         # Log the scan trigger action (optional)
-        ActivityLog.objects.create(action=f"Scan trigger created for voter ID {voter_id} ({action})")
+        log_activity(
+            f"Scan trigger created for voter ID {voter_id} ({action})" + (f" at station {station}" if station else ""),
+            event_type='scan_trigger', outcome='success', voter=voter, station=station
+        )
 
         print(f"✅ Trigger created successfully with ID: {trigger.id}")
         return JsonResponse({
@@ -606,12 +640,45 @@ def trigger_scan(request):
  
 @require_GET
 def get_scan_trigger(request):
-    """ESP32 polls this endpoint to check for scan triggers"""
+    """
+    ESP32 polls this endpoint to check for scan triggers.
+
+    ?station=<id> selects the station's own queue (default: the unnamed
+    station), so several booths can have scans pending at once.
+
+    The returned trigger is claimed for the polling device (?device=<id>,
+    else its IP address) for SCAN_TRIGGER_LEASE_SECONDS: other devices
+    don't see it until it is used or the lease expires (voting/triggers.py).
+
+    With ?wait=N the request is held for up to N seconds (capped by
+    SCAN_TRIGGER_MAX_WAIT) until a trigger is created, instead of the
+    station polling every few seconds. The wait is woken by trigger
+    creation in this process (voting/notify.py), not by re-querying.
+    """
     try:
-        print(f"🔍 ESP32 polling for scan trigger...")
+        station = request.GET.get('station', '').strip()
+        device = (request.GET.get('device') or request.META.get('REMOTE_ADDR') or '').strip()[:100]
+        notifier = scan_triggers[station]
 
-        # Get the latest unused trigger
-        trigger = ScanTrigger.objects.filter(used=False).order_by('-created_at').first()
+        try:
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            return JsonResponse({"error": "wait must be a number of seconds"}, status=400)
+        wait = max(0.0, min(wait, getattr(settings, 'SCAN_TRIGGER_MAX_WAIT', 30)))
+        recheck = getattr(settings, 'SCAN_TRIGGER_RECHECK_INTERVAL', None)
+        deadline = time.monotonic() + wait
+
+        while True:
+            # Read the version before querying so a trigger created in between still wakes us
+            version = notifier.version
+
+            # Claim the station's latest unused trigger
+            trigger = claim_scan_trigger(station, device)
+            remaining = deadline - time.monotonic()
+            if trigger or remaining <= 0:
+                break
+            timeout = min(remaining, recheck) if recheck else remaining
+            notifier.wait(version, until_next_expiry(station, timeout))
 
         if trigger:
             print(f"✅ Found trigger: voter_id={trigger.voter_id}, action={trigger.action}, id={trigger.id}")
@@ -620,14 +687,10 @@ def get_scan_trigger(request):
             return JsonResponse({
                 "id": trigger.id,
                 "action": trigger.action,
-                "voter_id": trigger.voter_id
+                "voter_id": trigger.voter_id,
+                "lease_expires_at": trigger.lease_expires_at.isoformat()
             })
         else:
-            print(f"❌ No unused triggers found")
-            # Show recent triggers for debugging
-            all_triggers = ScanTrigger.objects.all().order_by('-created_at')[:5]
-            print(f"🔍 Recent triggers: {[f'ID:{t.id}, voter_id:{t.voter_id}, action:{t.action}, used:{t.used}' for t in all_triggers]}")
-
             return JsonResponse({"action": None, "voter_id": None, "id": None})
     except Exception as e:
         print(f"❌ Error in get_scan_trigger: {str(e)}")
@@ -677,22 +740,26 @@ def upload_template(request):
 
         if template_b64 and not template_hex:
             try:
-                template_hex = base64.b64decode(template_b64).hex()
+                template_bytes = base64.b64decode(template_b64)
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': 'Invalid base64 data'}, status=400)
-
-        if not template_hex:
+        elif template_hex:
+            try:
+                template_bytes = bytes.fromhex(template_hex)
+            except ValueError:
+                template_bytes = b''
+        else:
             return JsonResponse({'status': 'error', 'message': 'No template provided'}, status=400)
 
         # Validate template quality
-        if not validate_fingerprint_template(template_hex):
+        if not validate_fingerprint_template(template_bytes):
             return JsonResponse({
                 'status': 'error', 
                 'message': 'Invalid or low-quality fingerprint template. Please scan again.'
             }, status=400)
         
         # Calculate template quality score
-        quality_score = calculate_template_quality(template_hex)
+        quality_score = calculate_template_quality(template_bytes)
         if quality_score < 30.0:
             return JsonResponse({
                 'status': 'error', 
@@ -703,6 +770,11 @@ def upload_template(request):
             try:
                 print(f"🔍 Looking for voter_id: {voter_id}")
                 voter = Voter.objects.get(voter_id__iexact=voter_id)
+
+                # Make sure this finger is not enrolled to another voter already
+                duplicate_voter, duplicate_score = find_enrollment_duplicate(template_bytes, voter)
+                if duplicate_voter and settings.FINGERPRINT_DUPLICATE_ACTION == 'reject':
+                    return duplicate_enrollment_response(duplicate_voter, duplicate_score, voter_id, voter)
                 
                 # Delete old templates for this voter
                 FingerprintTemplate.objects.filter(voter=voter).delete()
@@ -710,12 +782,20 @@ def upload_template(request):
                 # Create new template with quality info
                 template = FingerprintTemplate.objects.create(
                     voter=voter, 
-                    template_hex=template_hex
+                    template=template_bytes,
+                    duplicate_of=duplicate_voter,
+                    duplicate_score=duplicate_score if duplicate_voter else None
                 )
+                if duplicate_voter:
+                    log_activity(
+                        f'Fingerprint template for voter {voter_id} flagged as possible duplicate of voter {duplicate_voter.voter_id} - Score: {duplicate_score:.2f}',
+                        event_type='enrollment', outcome='duplicate', voter=voter, score=duplicate_score
+                    )
                 
                 # Log template creation with quality score
-                ActivityLog.objects.create(
-                    action=f'Fingerprint template created for voter {voter_id} - Quality: {quality_score:.1f}/100'
+                log_activity(
+                    f'Fingerprint template created for voter {voter_id} - Quality: {quality_score:.1f}/100',
+                    event_type='enrollment', outcome='success', voter=voter
                 )
                 
                 print(f"✅ Created FingerprintTemplate for voter {voter_id} (Quality: {quality_score:.1f})")
@@ -726,31 +806,80 @@ def upload_template(request):
                     trigger.save()
                     print(f"✅ Marked trigger as used for voter_id={voter_id}")
 
-                return JsonResponse({
+                response = {
                     'status': 'success',
                     'quality_score': quality_score,
                     'message': f'Template stored successfully (Quality: {quality_score:.1f}/100)'
-                })
+                }
+                if duplicate_voter:
+                    response['duplicate_of'] = duplicate_voter.voter_id
+                    response['duplicate_score'] = duplicate_score
+                return JsonResponse(response)
             except Voter.DoesNotExist:
                 return JsonResponse({'status': 'error', 'message': 'Voter not found'}, status=400)
         else:
+            duplicate_voter, duplicate_score = find_enrollment_duplicate(template_bytes)
+            if duplicate_voter and settings.FINGERPRINT_DUPLICATE_ACTION == 'reject':
+                return duplicate_enrollment_response(duplicate_voter, duplicate_score)
+
             temp_template = FingerprintTemplate.objects.create(
                 voter=None,
-                template_hex=template_hex
+                template=template_bytes,
+                duplicate_of=duplicate_voter,
+                duplicate_score=duplicate_score if duplicate_voter else None
             )
             print(f"🗃️ Created temporary FingerprintTemplate with id {temp_template.id} (Quality: {quality_score:.1f})")
-            return JsonResponse({
+            response = {
                 'status': 'success',
                 'template_id': temp_template.id,
                 'quality_score': quality_score,
                 'message': f'Template stored successfully (Quality: {quality_score:.1f}/100)'
-            })
+            }
+            if duplicate_voter:
+                response['duplicate_of'] = duplicate_voter.voter_id
+                response['duplicate_score'] = duplicate_score
+            return JsonResponse(response)
 
     except Exception as e:
         print("❌ Error:", str(e))
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
 
+def find_enrollment_duplicate(template_bytes: bytes, voter=None) -> tuple:
+    """
+    1:N search of an enrollment template against the cached gallery.
+    Returns (duplicate_voter, score) for the best match at or above
+    FINGERPRINT_DUPLICATE_THRESHOLD that is enrolled to a voter other than
+    ``voter``, or (None, 0.0).
+    """
+    threshold = getattr(settings, 'FINGERPRINT_DUPLICATE_THRESHOLD', None)
+    if threshold is None:
+        return None, 0.0
+
+    galleries = gallery_cache.galleries(len(template_bytes))
+    exclude_voters = [voter.pk] if voter is not None else []
+    for voter_pk, template_id, score in find_duplicates(template_bytes, galleries, threshold, exclude_voters):
+        duplicate_voter = Voter.objects.filter(pk=voter_pk).first()
+        if duplicate_voter:
+            print(f"⚠️ Enrollment template matches template {template_id} of voter {duplicate_voter.voter_id} (score {score:.2f})")
+            return duplicate_voter, score
+    return None, 0.0
+
+
+def duplicate_enrollment_response(duplicate_voter, duplicate_score: float, voter_id: str = None, voter=None):
+    """Log a rejected duplicate enrollment and build the 409 response."""
+    log_activity(
+        f'Fingerprint enrollment{f" for voter {voter_id}" if voter_id else ""} rejected: matches voter {duplicate_voter.voter_id} - Score: {duplicate_score:.2f}',
+        event_type='enrollment', outcome='duplicate', voter=voter, score=duplicate_score
+    )
+    return JsonResponse({
+        'status': 'duplicate',
+        'message': 'This fingerprint is already enrolled to another voter.',
+        'duplicate_of': duplicate_voter.voter_id,
+        'duplicate_score': duplicate_score
+    }, status=409)
+
+
 @csrf_protect
 @require_http_methods(["POST"])
 def register_voter_with_fingerprint(request):
@@ -788,16 +917,16 @@ def fingerprint_authenticate(request):
             return JsonResponse({'error': 'Invalid template_hex format.'}, status=400)
         
         # Use simplified fingerprint matching algorithm
-        templates = FingerprintTemplate.objects.select_related('voter').all()
-        matched_voter, confidence_score, match_type = advanced_fingerprint_match(incoming_template, templates)
+        matched_voter, confidence_score, match_type = advanced_fingerprint_match(incoming_template)
         
         # Balanced threshold for security while maintaining usability
         MINIMUM_CONFIDENCE_THRESHOLD = 65.0
         
         if matched_voter and confidence_score >= MINIMUM_CONFIDENCE_THRESHOLD:
             if matched_voter.has_voted:
-                ActivityLog.objects.create(
-                    action=f'Authentication attempt by already voted voter: {matched_voter.name} (ID: {matched_voter.voter_id})'
+                log_activity(
+                    f'Authentication attempt by already voted voter: {matched_voter.name} (ID: {matched_voter.voter_id})',
+                    event_type='authentication', outcome='already_voted', voter=matched_voter, score=confidence_score
                 )
                 return JsonResponse({
                     'status': 'already_voted', 
@@ -811,8 +940,9 @@ def fingerprint_authenticate(request):
             request.session.modified = True
             
             # Log successful authentication
-            ActivityLog.objects.create(
-                action=f'Fingerprint authentication successful: {matched_voter.name} (ID: {matched_voter.voter_id}) - Score: {confidence_score:.2f}'
+            log_activity(
+                f'Fingerprint authentication successful: {matched_voter.name} (ID: {matched_voter.voter_id}) - Score: {confidence_score:.2f}',
+                event_type='authentication', outcome='success', voter=matched_voter, score=confidence_score
             )
             
             return JsonResponse({
@@ -825,8 +955,9 @@ def fingerprint_authenticate(request):
             })
         else:
             # Log failed authentication attempt
-            ActivityLog.objects.create(
-                action=f'Fingerprint authentication failed - Best score: {confidence_score:.2f}, Match type: {match_type}'
+            log_activity(
+                f'Fingerprint authentication failed - Best score: {confidence_score:.2f}, Match type: {match_type}',
+                event_type='authentication', outcome='failure', score=confidence_score
             )
             
             return JsonResponse({
@@ -836,7 +967,7 @@ def fingerprint_authenticate(request):
             }, status=404)
             
     except Exception as e:
-        ActivityLog.objects.create(action=f'Fingerprint authentication error: {str(e)}')
+        log_activity(f'Fingerprint authentication error: {str(e)}', event_type='authentication', outcome='error')
         return JsonResponse({'error': str(e)}, status=500)
 
 
@@ -910,10 +1041,95 @@ def calculate_similarity(template1: bytes, template2: bytes) -> float:
     return round(final_score, 2)
 
 
-def advanced_fingerprint_match(incoming_template: bytes, db_templates: list) -> tuple:
+def advanced_fingerprint_match(incoming_template: bytes, db_templates: list = None) -> tuple:
     """
     Simple but effective fingerprint matching.
     Returns (matched_voter, confidence_score, match_type)
+
+    Scores every template in one vectorized pass (see voting.matching).
+    Without ``db_templates`` the enrolled templates come from the in-memory
+    gallery cache, so no template rows are read from the database, and large
+    galleries can be split across FINGERPRINT_MATCH_WORKERS processes.
+    Set FINGERPRINT_MATCH_ENGINE = 'python' to use the reference loop instead.
+    """
+    if not incoming_template:
+        return None, 0.0, "no_template"
+
+    engine = getattr(settings, 'FINGERPRINT_MATCH_ENGINE', 'numpy')
+    if engine == 'python' or len(incoming_template) < PATTERN_LENGTH:
+        if db_templates is None:
+            db_templates = FingerprintTemplate.objects.select_related('voter').all()
+        return python_fingerprint_match(incoming_template, db_templates)
+
+    if db_templates is None:
+        galleries = gallery_cache.galleries(len(incoming_template))
+    else:
+        galleries = TemplateGallery.from_records(db_templates, len(incoming_template))
+    gallery, row, best_score = match_gallery(incoming_template, galleries, use_pool=db_templates is None)
+    if gallery is None:
+        return None, 0.0, "no_match"
+
+    matched_voter = gallery.voters[row]
+    if db_templates is None:
+        # The cached galleries only keep voter primary keys
+        matched_voter = Voter.objects.filter(pk=int(matched_voter)).first() if matched_voter != NO_VOTER else None
+
+    return matched_voter, round(best_score, 2), classify_match(best_score)
+
+
+def advanced_fingerprint_match_batch(incoming_templates: list) -> list:
+    """
+    advanced_fingerprint_match for many templates at once.
+    Returns one (matched_voter, confidence_score, match_type) per template.
+
+    Templates of the same length are stacked and scored against the cached
+    gallery in one matrix pass, and all matched voters are fetched with a
+    single query.
+    """
+    results = [None] * len(incoming_templates)
+    engine = getattr(settings, 'FINGERPRINT_MATCH_ENGINE', 'numpy')
+
+    by_length = {}
+    for index, incoming_template in enumerate(incoming_templates):
+        if engine == 'python' or len(incoming_template) < PATTERN_LENGTH:
+            results[index] = advanced_fingerprint_match(incoming_template)
+        else:
+            by_length.setdefault(len(incoming_template), []).append(index)
+
+    matches = {}
+    for length, indexes in by_length.items():
+        incoming = np.frombuffer(
+            b''.join(incoming_templates[index] for index in indexes), dtype=np.uint8
+        ).reshape(len(indexes), length)
+        galleries = gallery_cache.galleries(length)
+        for index, match in zip(indexes, match_gallery_batch(incoming, galleries)):
+            matches[index] = match
+
+    # The cached galleries only keep voter primary keys
+    voter_pks = {
+        int(gallery.voters[row]) for gallery, row, _ in matches.values()
+        if gallery is not None and gallery.voters[row] != NO_VOTER
+    }
+    voters = Voter.objects.in_bulk(voter_pks) if voter_pks else {}
+
+    for index, (gallery, row, best_score) in matches.items():
+        if gallery is None:
+            results[index] = (None, 0.0, "no_match")
+            continue
+        matched_voter = voters.get(int(gallery.voters[row]))
+        results[index] = (matched_voter, round(best_score, 2), classify_match(best_score))
+    return results
+
+
+def python_fingerprint_match(incoming_template: bytes, db_templates: list) -> tuple:
+    """
+    Reference implementation of advanced_fingerprint_match that scores one
+    template at a time with calculate_similarity.
+    Returns (matched_voter, confidence_score, match_type)
+
+    Ties go to the first best record in ``db_templates``; pass them newest
+    first (FingerprintTemplate's default ordering) to break ties like the
+    vectorized matcher.
     """
     if not incoming_template:
         return None, 0.0, "no_template"
@@ -924,7 +1140,7 @@ def advanced_fingerprint_match(incoming_template: bytes, db_templates: list) ->
     
     for record in db_templates:
         try:
-            db_template = bytes.fromhex(record.template_hex)
+            db_template = bytes(record.template)
             if len(db_template) != len(incoming_template):
                 continue
                 
@@ -980,8 +1196,7 @@ def match_template(request):
         incoming_template = base64.b64decode(template_b64)
 
         # Use simplified fingerprint matching algorithm
-        templates = FingerprintTemplate.objects.select_related('voter').all()
-        matched_voter, confidence_score, match_type = advanced_fingerprint_match(incoming_template, templates)
+        matched_voter, confidence_score, match_type = advanced_fingerprint_match(incoming_template)
 
         # Balanced threshold for security while maintaining usability
         MINIMUM_CONFIDENCE_THRESHOLD = 65.0  # Balanced for security and usability
@@ -1008,8 +1223,9 @@ def match_template(request):
                 })
 
             # Log successful match for audit
-            ActivityLog.objects.create(
-                action=f'Fingerprint match successful: {matched_voter.name} (ID: {matched_voter.voter_id}) - Score: {confidence_score:.2f}, Type: {match_type}'
+            log_activity(
+                f'Fingerprint match successful: {matched_voter.name} (ID: {matched_voter.voter_id}) - Score: {confidence_score:.2f}, Type: {match_type}',
+                event_type='match', outcome='success', voter=matched_voter, station=trigger.station, score=confidence_score
             )
 
             trigger.used = True
@@ -1036,8 +1252,9 @@ def match_template(request):
         trigger.save()
 
         # Log failed match attempt for security monitoring
-        ActivityLog.objects.create(
-            action=f'Fingerprint match failed - Best score: {confidence_score:.2f}, Match type: {match_type}'
+        log_activity(
+            f'Fingerprint match failed - Best score: {confidence_score:.2f}, Match type: {match_type}',
+            event_type='match', outcome='failure', station=trigger.station, score=confidence_score
         )
 
         return JsonResponse({
@@ -1048,10 +1265,144 @@ def match_template(request):
         })
 
     except Exception as e:
-        ActivityLog.objects.create(action=f'Fingerprint matching error: {str(e)}')
+        log_activity(f'Fingerprint matching error: {str(e)}', event_type='match', outcome='error')
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def match_template_batch(request):
+    """
+    Match many buffered scans in one request.
+
+    Body: {"scans": [{"trigger_id": ..., "template": "<base64>"}, ...]}
+    Every scan is handled like a call to match_template, but the templates
+    are scored together and the triggers are saved with one bulk_update.
+    The activity log entries are logged one by one with log_activity, which
+    queues them for the audit log writer's next batch (AUDIT_LOG_MODE
+    'async'). Returns one result per scan, in request order; a trigger
+    listed more than once is only matched the first time.
+    """
+    try:
+        data = json.loads(request.body)
+        scans = data.get('scans')
+        if not isinstance(scans, list) or not scans:
+            return JsonResponse({'status': 'error', 'message': 'Missing scans'}, status=400)
+
+        max_scans = getattr(settings, 'FINGERPRINT_MATCH_BATCH_LIMIT', 200)
+        if len(scans) > max_scans:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'At most {max_scans} scans per batch'
+            }, status=400)
+
+        triggers = ScanTrigger.objects.in_bulk([
+            int(scan['trigger_id']) for scan in scans
+            if isinstance(scan, dict) and str(scan.get('trigger_id')).isdigit()
+        ])
+
+        results = [None] * len(scans)
+        pending = []  # (result index, trigger, template bytes)
+        seen = set()
+        for index, scan in enumerate(scans):
+            if not isinstance(scan, dict) or not scan.get('trigger_id') or not scan.get('template'):
+                results[index] = {'status': 'error', 'message': 'Missing trigger_id or template'}
+                continue
+            trigger_id = scan['trigger_id']
+            results[index] = {'trigger_id': trigger_id}
+            trigger = triggers.get(int(trigger_id)) if str(trigger_id).isdigit() else None
+            if trigger is None or trigger.action != 'match' or trigger.used or trigger.pk in seen:
+                results[index].update({'status': 'error', 'message': 'Trigger not found or already used'})
+                continue
+            try:
+                incoming_template = base64.b64decode(scan['template'])
+            except (ValueError, TypeError):
+                results[index].update({'status': 'error', 'message': 'Invalid template encoding'})
+                continue
+            seen.add(trigger.pk)
+            pending.append((index, trigger, incoming_template))
+
+        matches = advanced_fingerprint_match_batch([template for _, _, template in pending])
+
+        # Balanced threshold for security while maintaining usability
+        MINIMUM_CONFIDENCE_THRESHOLD = 65.0
+
+        updated_triggers = []
+        logs = []
+        for (index, trigger, _), (matched_voter, confidence_score, match_type) in zip(pending, matches):
+            trigger.used = True
+            trigger.score = confidence_score
+            result = results[index]
+
+            if matched_voter and confidence_score >= MINIMUM_CONFIDENCE_THRESHOLD:
+                trigger.matched_voter = matched_voter
+                if matched_voter.has_voted:
+                    trigger.match_status = 'already_voted'
+                    trigger.match_message = f"Matched voter {matched_voter.name} but they have already voted"
+                    result.update({
+                        'status': 'already_voted',
+                        'message': 'Voter has already voted',
+                        'voter_name': matched_voter.name,
+                        'score': confidence_score,
+                        'match_type': match_type
+                    })
+                else:
+                    trigger.match_status = 'success'
+                    trigger.match_message = f"Matched voter {matched_voter.name} with score {confidence_score:.2f} ({match_type})"
+                    logs.append((
+                        f'Fingerprint match successful: {matched_voter.name} (ID: {matched_voter.voter_id}) - Score: {confidence_score:.2f}, Type: {match_type}',
+                        {'outcome': 'success', 'voter': matched_voter, 'station': trigger.station, 'score': confidence_score}
+                    ))
+                    result.update({
+                        'status': 'success',
+                        'voter_id': matched_voter.voter_id,
+                        'voter_name': matched_voter.name,
+                        'score': confidence_score,
+                        'match_type': match_type,
+                        'confidence_level': 'high' if confidence_score >= 70.0 else 'medium'
+                    })
+            else:
+                trigger.match_status = 'not_found'
+                trigger.match_message = f'No matching fingerprint found (best score: {confidence_score:.2f})'
+                logs.append((
+                    f'Fingerprint match failed - Best score: {confidence_score:.2f}, Match type: {match_type}',
+                    {'outcome': 'failure', 'station': trigger.station, 'score': confidence_score}
+                ))
+                result.update({
+                    'status': 'not_found',
+                    'message': 'No matching fingerprint found with sufficient confidence',
+                    'score': confidence_score,
+                    'match_type': match_type
+                })
+            updated_triggers.append(trigger)
+
+        with transaction.atomic():
+            ScanTrigger.objects.bulk_update(
+                updated_triggers, ['used', 'score', 'matched_voter', 'match_status', 'match_message']
+            )
+            for action, fields in logs:
+                log_activity(action, event_type='match', **fields)
+            # bulk_update skips post_save, so wake scan result streams here
+            trigger_ids = [trigger.pk for trigger in updated_triggers]
+
+            def wake_result_streams():
+                for trigger_id in trigger_ids:
+                    scan_results.notify(trigger_id)
+            transaction.on_commit(wake_result_streams)
+
+        print(f"🔍 Batch match: {len(scans)} scans, {len(updated_triggers)} matched against the gallery")
+
+        return JsonResponse({
+            'status': 'success',
+            'processed': len(updated_triggers),
+            'results': results
+        })
+
+    except Exception as e:
+        log_activity(f'Fingerprint batch matching error: {str(e)}', event_type='match', outcome='error')
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_latest_scanned_template(request):
@@ -1065,6 +1416,7 @@ def get_latest_scanned_template(request):
                 'status': 'success',
                 'template_id': latest_template.id,
                 'template_hex': latest_template.template_hex,
+                'template': base64.b64encode(latest_template.template).decode(),
                 'created_at': latest_template.created_at.isoformat(),
                 'voter_id': latest_template.voter.voter_id if latest_template.voter else None,
                 'is_temporary': latest_template.voter is None
@@ -1097,7 +1449,10 @@ def fingerprint_verification(request):
             
             # Check if voter has already voted
             if voter.has_voted:
-                ActivityLog.objects.create(action=f'Fingerprint verification attempt by already voted voter: {voter.name} (ID: {voter.voter_id})')
+                log_activity(
+                    f'Fingerprint verification attempt by already voted voter: {voter.name} (ID: {voter.voter_id})',
+                    event_type='verification', outcome='already_voted', voter=voter
+                )
                 return JsonResponse({
                     'status': 'already_voted',
                     'message': 'You have already voted',
@@ -1118,7 +1473,10 @@ def fingerprint_verification(request):
             request.session.modified = True
             
             # Voter is verified and can vote
-            ActivityLog.objects.create(action=f'Fingerprint verification successful for voter: {voter.name} (ID: {voter.voter_id})')
+            log_activity(
+                f'Fingerprint verification successful for voter: {voter.name} (ID: {voter.voter_id})',
+                event_type='verification', outcome='success', voter=voter
+            )
             return JsonResponse({
                 'status': 'verified',
                 'message': 'Fingerprint verified successfully',
@@ -1128,7 +1486,10 @@ def fingerprint_verification(request):
             })
             
         except Voter.DoesNotExist:
-            ActivityLog.objects.create(action=f'Fingerprint verification failed - voter not found for fingerprint_id: {fingerprint_id}')
+            log_activity(
+                f'Fingerprint verification failed - voter not found for fingerprint_id: {fingerprint_id}',
+                event_type='verification', outcome='failure'
+            )
             return JsonResponse({
                 'status': 'not_found',
                 'message': 'Voter not found with this fingerprint'
@@ -1140,7 +1501,7 @@ def fingerprint_verification(request):
             'message': 'Invalid JSON data'
         }, status=400)
     except Exception as e:
-        ActivityLog.objects.create(action=f'Fingerprint verification error: {str(e)}')
+        log_activity(f'Fingerprint verification error: {str(e)}', event_type='verification', outcome='error')
         return JsonResponse({
             'status': 'error',
             'message': f'Verification error: {str(e)}'
@@ -1179,7 +1540,10 @@ def cast_vote(request):
             
             # Double-check if voter has already voted (race condition protection)
             if voter.has_voted:
-                ActivityLog.objects.create(action=f'Vote attempt by already voted voter: {voter.name} (ID: {voter.voter_id})')
+                log_activity(
+                    f'Vote attempt by already voted voter: {voter.name} (ID: {voter.voter_id})',
+                    event_type='vote', outcome='already_voted', voter=voter
+                )
                 return JsonResponse({
                     'status': 'already_voted',
                     'message': 'You have already voted',
@@ -1196,44 +1560,22 @@ def cast_vote(request):
                     'message': 'Voting is not currently active'
                 })
             
-            # Process votes within a transaction
-            with transaction.atomic():
-                # Re-check has_voted status within transaction
-                voter = Voter.objects.select_for_update().get(voter_id=voter_id)
-                if voter.has_voted:
-                    return JsonResponse({
-                        'status': 'already_voted',
-                        'message': 'You have already voted'
-                    })
-                
-                # Record votes
-                for vote_item in votes:
-                    post_id = vote_item.get('post')
-                    candidate_id = vote_item.get('candidate')
-                    
-                    if not post_id or not candidate_id:
-                        continue
-                    
-                    try:
-                        post = Post.objects.get(id=post_id)
-                        candidate = Candidate.objects.get(id=candidate_id, post=post)
-                        
-                        # Check if voter already voted for this post
-                        existing_vote = Vote.objects.filter(voter=voter, post=post).first()
-                        if existing_vote:
-                            continue  # Skip if already voted for this post
-                        
-                        Vote.objects.create(voter=voter, candidate=candidate, post=post)
-                        
-                    except (Post.DoesNotExist, Candidate.DoesNotExist):
-                        continue
-                
-                # Mark voter as having voted
-                voter.has_voted = True
-                voter.last_vote_attempt = timezone.now()
-                voter.save()
+            # Record the votes and mark the voter in one transaction, with
+            # has_voted re-checked under a row lock
+            try:
+                voter, _, rejected = commit_ballot(voter, votes)
+            except AlreadyVotedError:
+                return JsonResponse({
+                    'status': 'already_voted',
+                    'message': 'You have already voted'
+                })
+            if rejected:
+                print(f"⚠️ Skipped ballot items: {rejected}")
             
-            ActivityLog.objects.create(action=f'Vote cast successfully by voter: {voter.name} (ID: {voter.voter_id})')
+            log_activity(
+                f'Vote cast successfully by voter: {voter.name} (ID: {voter.voter_id})',
+                event_type='vote', outcome='success', voter=voter
+            )
             
             return JsonResponse({
                 'status': 'success',
@@ -1244,7 +1586,7 @@ def cast_vote(request):
             
         except Voter.DoesNotExist:
             print(f"❌ Voter not found with voter_id: {voter_id}")
-            ActivityLog.objects.create(action=f'Vote attempt by non-existent voter with voter_id: {voter_id}')
+            log_activity(f'Vote attempt by non-existent voter with voter_id: {voter_id}', event_type='vote', outcome='rejected')
             return JsonResponse({
                 'status': 'not_found',
                 'message': 'Voter not found'
@@ -1259,7 +1601,7 @@ def cast_vote(request):
         print(f"❌ Exception in cast_vote: {str(e)}")
         import traceback
         traceback.print_exc()
-        ActivityLog.objects.create(action=f'Vote casting error: {str(e)}')
+        log_activity(f'Vote casting error: {str(e)}', event_type='vote', outcome='error')
         return JsonResponse({
             'status': 'error',
             'message': f'Vote error: {str(e)}'
@@ -1277,7 +1619,7 @@ def vote_page(request):
         if voter.has_voted:
             return redirect('/already-voted/')
         
-        posts = Post.objects.prefetch_related('candidates').all()
+        posts = ballot_cache.get().posts
         return render(request, 'voting/vote_page.html', {
             'voter': voter,
             'posts': posts
@@ -1293,7 +1635,7 @@ def vote_page_with_id(request, voter_id):
         if voter.has_voted:
             return redirect('/already-voted/')
         
-        posts = Post.objects.prefetch_related('candidates').all()
+        posts = ballot_cache.get().posts
         return render(request, 'voting/vote_page.html', {
             'voter': voter,
             'posts': posts
@@ -1336,7 +1678,7 @@ def get_pending_templates(request):
     
     data = [{
         'id': t.id,
-        'template_hex': t.template_hex[:10] + '...'  # short preview for dropdown label
+        'template_hex': bytes(t.template[:5]).hex() + '...'  # short preview for dropdown label
     } for t in templates]
     
     return JsonResponse(data, safe=False)
@@ -1362,75 +1704,137 @@ def scan_result(request):
     if not trigger_id:
         return JsonResponse({"status": "error", "message": "Missing trigger_id"}, status=400)
     try:
-        trigger = ScanTrigger.objects.get(id=trigger_id)
-    except ScanTrigger.DoesNotExist:
+        trigger = ScanTrigger.objects.select_related('matched_voter').get(id=trigger_id)
+    except (ScanTrigger.DoesNotExist, ValueError):
         return JsonResponse({"status": "error", "message": "Trigger not found"}, status=404)
 
+    if trigger.used and trigger.match_status == 'already_voted' and trigger.matched_voter:
+        voter = trigger.matched_voter
+        # Set session for the matched voter so already_voted page can display their name
+        request.session['authenticated_voter_id'] = voter.id
+        request.session.modified = True
+
+        # Log for debugging
+        print(f"🔍 Scan result - Already voted: Voter ID {voter.id}, Name: {voter.name}, Voter ID: {voter.voter_id}")
+
+    return JsonResponse(scan_result_payload(trigger))
+
+
+def scan_result_payload(trigger) -> dict:
+    """The scan_result response for a ScanTrigger (with matched_voter loaded)."""
     if not trigger.used:
         # Not used yet, still pending
-        return JsonResponse({"status": "pending"})
+        return {"status": "pending"}
 
     # Check match status first
     if trigger.match_status == 'already_voted':
         # Handle already voted case
         if trigger.matched_voter:
             voter = trigger.matched_voter
-            # Set session for the matched voter so already_voted page can display their name
-            request.session['authenticated_voter_id'] = voter.id
-            request.session.modified = True
-            
-            # Log for debugging
-            print(f"🔍 Scan result - Already voted: Voter ID {voter.id}, Name: {voter.name}, Voter ID: {voter.voter_id}")
-            
-            return JsonResponse({
+            return {
                 "status": "already_voted",
                 "voter_id": voter.voter_id,
                 "voter_name": voter.name,
                 "message": "This voter has already cast their vote",
                 "score": trigger.score or 0
-            })
+            }
         else:
             # If matched_voter is not set but status is already_voted, try to find the voter
             # This handles the case where the trigger was marked as already_voted but voter wasn't saved
-            return JsonResponse({
+            return {
                 "status": "already_voted",
                 "voter_id": None,
                 "voter_name": "Unknown Voter",
                 "message": "This voter has already cast their vote",
                 "score": trigger.score or 0
-            })
+            }
     
     elif trigger.match_status == 'success' and trigger.matched_voter:
         voter = trigger.matched_voter
-        return JsonResponse({
+        return {
             "status": "success",
             "voter_id": voter.voter_id,
             "voter_name": voter.name,
             "score": trigger.score or 0
-        })
+        }
     
     elif trigger.match_status == 'not_found':
-        return JsonResponse({
+        return {
             "status": "error",
             "message": "Fingerprint not matched"
-        })
+        }
     
     else:
         # Fallback for other cases
-        return JsonResponse({
+        return {
             "status": "error",
             "message": "Fingerprint not matched"
-        })
+        }
 
-def validate_fingerprint_template(template_hex: str) -> bool:
+
+@require_GET
+async def scan_result_stream(request):
+    """
+    Server-Sent Events version of scan_result for the kiosk.
+
+    Sends a single ``result`` event (same data as scan_result) once the
+    trigger has been used, then ends. The request waits on an in-process
+    notification from that trigger's save (voting/notify.py) rather than
+    re-querying, with a comment line every SCAN_RESULT_KEEPALIVE seconds to
+    keep proxies from closing the connection (each one also re-checks the
+    database, covering saves made by other worker processes). After
+    SCAN_RESULT_STREAM_TIMEOUT seconds a ``timeout`` event is sent instead.
+
+    Serve the project through core/asgi.py (e.g. uvicorn or daphne) so each
+    waiting kiosk costs a coroutine rather than a worker thread. scan_result
+    must still be called for already_voted results, because the session
+    cannot be updated from a stream.
+    """
+    trigger_id = request.GET.get('trigger_id')
+    if not trigger_id or not trigger_id.isdigit():
+        return JsonResponse({"status": "error", "message": "Missing trigger_id"}, status=400)
+    trigger_id = int(trigger_id)
+    if not await ScanTrigger.objects.filter(id=trigger_id).aexists():
+        return JsonResponse({"status": "error", "message": "Trigger not found"}, status=404)
+
+    timeout = getattr(settings, 'SCAN_RESULT_STREAM_TIMEOUT', 120)
+    keepalive = getattr(settings, 'SCAN_RESULT_KEEPALIVE', 15)
+
+    async def events():
+        deadline = time.monotonic() + timeout
+        # Ask EventSource to wait a bit before reconnecting if the connection drops
+        yield "retry: 2000\n\n"
+        # Held until the stream ends or the client goes away
+        with scan_results.subscribe(trigger_id) as notifier:
+            while True:
+                version = notifier.version
+                trigger = await ScanTrigger.objects.select_related('matched_voter').filter(id=trigger_id).afirst()
+                if trigger is None or trigger.used:
+                    payload = scan_result_payload(trigger) if trigger else {
+                        "status": "error", "message": "Trigger not found"
+                    }
+                    yield f"event: result\ndata: {json.dumps(payload)}\n\n"
+                    return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield "event: timeout\ndata: {}\n\n"
+                    return
+                if not await notifier.wait_async(version, min(remaining, keepalive)):
+                    yield ": keep-alive\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def validate_fingerprint_template(template_bytes: bytes) -> bool:
     """
     Validate fingerprint template format and quality.
     Returns True if template is valid and meets quality standards.
     """
     try:
-        # Check if template_hex is valid hex string
-        template_bytes = bytes.fromhex(template_hex)
-        
         # Check minimum length (typical fingerprint templates are 512+ bytes)
         if len(template_bytes) < 256:
             return False
@@ -1455,14 +1859,12 @@ def validate_fingerprint_template(template_hex: str) -> bool:
         return False
 
 
-def calculate_template_quality(template_hex: str) -> float:
+def calculate_template_quality(template_bytes: bytes) -> float:
     """
     Calculate quality score for fingerprint template (0-100).
     Higher score indicates better template quality.
     """
     try:
-        template_bytes = bytes.fromhex(template_hex)
-        
         # Factor 1: Length (longer templates are generally better)
         length_score = min(len(template_bytes) / 512.0 * 100, 100)
         
@@ -1521,13 +1923,17 @@ def test_fingerprint_matching(request):
             }, status=400)
         
         # Validate template
-        if not validate_fingerprint_template(test_template_hex):
+        try:
+            test_template = bytes.fromhex(test_template_hex)
+        except ValueError:
+            test_template = b''
+        if not validate_fingerprint_template(test_template):
             return JsonResponse({
                 'status': 'error',
                 'message': 'Invalid template format for testing'
             }, status=400)
         
-        quality_score = calculate_template_quality(test_template_hex)
+        quality_score = calculate_template_quality(test_template)
         
         if test_mode == 'quality':
             return JsonResponse({
@@ -1538,15 +1944,12 @@ def test_fingerprint_matching(request):
             })
         
         # Test matching against all stored templates
-        test_template = bytes.fromhex(test_template_hex)
-        templates = FingerprintTemplate.objects.select_related('voter').all()
-        
-        matched_voter, confidence_score, match_type = advanced_fingerprint_match(test_template, templates)
+        matched_voter, confidence_score, match_type = advanced_fingerprint_match(test_template)
         
         results = {
             'status': 'success',
             'test_template_quality': quality_score,
-            'total_templates_tested': len(templates),
+            'total_templates_tested': len(gallery_cache),
             'best_match_score': confidence_score,
             'match_type': match_type,
             'threshold_met': confidence_score >= 55.0
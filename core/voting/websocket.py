@@ -0,0 +1,179 @@
+"""
+WebSocket channel for ESP32 stations, served by core/asgi.py (no Channels).
+
+One persistent connection carries the whole station protocol that otherwise
+takes separate HTTP requests. Every frame is a JSON text message with a
+``type``:
+
+    server -> station
+        {"type": "trigger", "id", "action", "voter_id"}   new unused trigger
+        {"type": "upload_result", ...}   upload_template response
+        {"type": "match_result", ...}    match_template response
+        {"type": "ack_result", ...}      mark_trigger_used response
+        {"type": "pong"}
+        {"type": "error", "message"}
+        close 1011                       trigger pushing failed; reconnect
+
+    station -> server
+        {"type": "upload", "voter_id", "template"}   as /api/upload-template/
+        {"type": "match", "trigger_id", "template"}  as /api/match-template/
+        {"type": "ack", "id"}                        as /api/mark-trigger-used/
+        {"type": "ping"}
+
+Stations identify themselves with ?station=<id> on the URL and only receive
+their own triggers (the unnamed station if omitted). Pushed triggers are
+claimed for the connection (?device=<id>, else the client's IP address) like
+/api/scan-trigger/ does, so two devices never get the same trigger. A pushed
+trigger's lease is not renewed: if the station hasn't used it when the lease
+runs out, it is pushed again, or to whichever device claims it first.
+
+Result messages carry the same fields as the HTTP endpoint plus
+``http_status``, because they are produced by calling those views. Triggers
+are pushed when the station's scan_triggers notifier fires
+(voting/notify.py) and re-checked every SCAN_TRIGGER_RECHECK_INTERVAL
+seconds (30 if unset).
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest
+
+from .notify import scan_triggers
+from .triggers import claim_scan_trigger, until_next_expiry
+
+# Seconds between retries of a failed trigger push before giving up
+PUSH_RETRY_DELAYS = (1, 2, 5, 10)
+
+
+def _station_views():
+    # Imported lazily: views pulls in DRF and the whole app
+    from . import views
+    return {
+        'upload': ('upload_result', views.upload_template),
+        'match': ('match_result', views.match_template),
+        'ack': ('ack_result', views.mark_trigger_used),
+    }
+
+
+def call_view(view, data):
+    """Run a JSON POST view in-process and return (status code, response data)."""
+    close_old_connections()
+    try:
+        request = HttpRequest()
+        request.method = 'POST'
+        request.path = '/ws/station/'
+        request.META['CONTENT_TYPE'] = 'application/json'
+        request._body = json.dumps(data).encode()
+        response = view(request)
+        return response.status_code, json.loads(response.content)
+    finally:
+        close_old_connections()
+
+
+@sync_to_async
+def _claim_trigger(station, device):
+    close_old_connections()
+    trigger = claim_scan_trigger(station, device, renew=False)
+    if trigger is None:
+        return None
+    return {'type': 'trigger', 'id': trigger.id, 'action': trigger.action, 'voter_id': trigger.voter_id}
+
+
+@sync_to_async
+def _wait_timeout(station, timeout):
+    return until_next_expiry(station, timeout)
+
+
+async def _push_triggers(station, device, send):
+    """
+    Claim and send each new unused trigger of the station as it appears.
+
+    A failed round (e.g. the database is locked) is retried after each of
+    PUSH_RETRY_DELAYS in turn; if it still fails the connection is closed
+    with code 1011, so the station reconnects instead of waiting on a
+    socket that no longer gets triggers.
+    """
+    recheck = getattr(settings, 'SCAN_TRIGGER_RECHECK_INTERVAL', None) or 30
+    notifier = scan_triggers[station]
+    failures = 0
+    while True:
+        try:
+            version = notifier.version
+            # Only triggers nobody holds a lease on, so one already pushed
+            # comes back once its lease has run out
+            trigger = await _claim_trigger(station, device)
+            if trigger:
+                await send({'type': 'websocket.send', 'text': json.dumps(trigger)})
+                failures = 0
+                # More may be waiting
+                continue
+            timeout = await _wait_timeout(station, recheck)
+        except Exception as e:
+            if failures >= len(PUSH_RETRY_DELAYS):
+                print(f"❌ Trigger push to station {station!r} failed, closing the connection: {str(e)}")
+                try:
+                    await send({'type': 'websocket.close', 'code': 1011})
+                except Exception:
+                    pass
+                return
+            delay = PUSH_RETRY_DELAYS[failures]
+            failures += 1
+            print(f"❌ Trigger push to station {station!r} failed, retrying in {delay}s: {str(e)}")
+            await asyncio.sleep(delay)
+            continue
+        failures = 0
+        await notifier.wait_async(version, timeout)
+
+
+async def _handle_message(text, send):
+    try:
+        message = json.loads(text)
+        message_type = message.get('type')
+    except (ValueError, AttributeError):
+        message, message_type = None, None
+
+    if message_type == 'ping':
+        reply = {'type': 'pong'}
+    elif message_type in ('upload', 'match', 'ack'):
+        reply_type, view = _station_views()[message_type]
+        data = {key: value for key, value in message.items() if key != 'type'}
+        try:
+            status, payload = await sync_to_async(call_view)(view, data)
+            reply = {'type': reply_type, 'http_status': status, **payload}
+        except Exception as e:
+            print(f"❌ Station {message_type} failed: {str(e)}")
+            reply = {'type': reply_type, 'http_status': 500, 'status': 'error', 'message': str(e)}
+    else:
+        reply = {'type': 'error', 'message': 'Unknown message type'}
+    await send({'type': 'websocket.send', 'text': json.dumps(reply)})
+
+
+async def station_websocket(scope, receive, send):
+    """ASGI application for one station connection."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    query = parse_qs(scope.get('query_string', b'').decode())
+    station = query.get('station', [''])[0].strip()[:50]
+    # Like REMOTE_ADDR on /api/scan-trigger/: without the port, so a station
+    # that reconnects is the same device and gets its leased trigger back
+    client = scope.get('client') or ('', 0)
+    device = (query.get('device', [''])[0].strip() or client[0] or '')[:100]
+    await send({'type': 'websocket.accept'})
+    print(f"📡 Station {station!r} connected: {scope.get('client')}")
+
+    pusher = asyncio.ensure_future(_push_triggers(station, device, send))
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] == 'websocket.receive':
+                await _handle_message(message.get('text') or (message.get('bytes') or b'').decode(errors='replace'), send)
+    finally:
+        pusher.cancel()
+        print(f"📡 Station {station!r} disconnected: {scope.get('client')}")